@@ -10,7 +10,7 @@ from allauth.account.models import (
 )
 from dj_rest_auth.registration.views import ResendEmailVerificationView, RegisterView
 from django.core.exceptions import ObjectDoesNotExist
-from rest_framework_simplejwt.tokens import RefreshToken
+from auth.serializers import CustomTokenObtainPairSerializer
 import logging
 from django.contrib.auth import get_user_model
 
@@ -64,7 +64,7 @@ class CustomConfirmEmailView(APIView):
                 raise ObjectDoesNotExist
             email_confirmation.confirm(request)
             user = email_confirmation.email_address.user
-            refresh = RefreshToken.for_user(user)
+            refresh = CustomTokenObtainPairSerializer.get_token(user)
             user_data = {
                 "username": user.username,
                 "email": user.email,
@@ -9,6 +9,7 @@ from django.contrib.auth.forms import SetPasswordForm
 from dj_rest_auth.registration.serializers import RegisterSerializer
 from allauth.account.adapter import get_adapter
 from allauth.account.utils import setup_user_email
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -168,3 +169,14 @@ class CustomPasswordResetSerializer(serializers.Serializer):
             return self.set_password_form.user
 
         raise serializers.ValidationError("Error resetting password.")
+
+
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Adds the claims websocket auth builds its user from"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["username"] = user.username
+        token["user_type"] = user.user_type
+        return token
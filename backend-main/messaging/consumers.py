@@ -1,22 +1,64 @@
 # messaging/consumers.py
+import asyncio
 import json
 import logging
+import uuid
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import AccessToken
-from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
+from .middleware import ScopeUser
+from .services.chatbot import chatbot_service
+from .services.chatbot_prompt import prompt_builder
+from .services.constants import ERROR_MESSAGES
+from .services.exceptions import ChatbotError
+from .services.membership import conversation_group_name, membership_service
+from .services.presence import presence_service
+from .services.read_state import MAX_RECEIPT_MESSAGE_IDS, read_state_service
+from .outbound import OutboundQueueMixin
 
-User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-class ConversationConsumer(AsyncWebsocketConsumer):
+def merge_read_receipts(previous, receipt):
+    """Fold a queued receipt of the same reader into the newer one"""
+    message_ids = list(dict.fromkeys(previous["message_ids"] + receipt["message_ids"]))
+    # Receipts without ids only carry the watermark, and so does their merge
+    if (
+        not previous["message_ids"]
+        or not receipt["message_ids"]
+        or len(message_ids) > MAX_RECEIPT_MESSAGE_IDS
+    ):
+        message_ids = []
+    return {
+        **receipt,
+        "message_ids": message_ids,
+        "read_count": previous["read_count"] + receipt["read_count"],
+    }
+
+
+def merge_chatbot_deltas(previous, delta):
+    """Join queued chunks of one streamed reply into a single frame"""
+    return {**delta, "delta": previous["delta"] + delta["delta"]}
+
+
+class ConversationConsumer(OutboundQueueMixin, AsyncWebsocketConsumer):
+    """
+    Websocket for one conversation. Conversation ids are only unique per
+    kind, so each kind has its own route, consumer and channel group
+    (dm_<id>, group_<id>, bot_<id>). This base class also serves the legacy
+    untyped route and resolves the kind from the user's memberships.
+    """
+
+    conversation_kind = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chatbot_tasks = set()
+
     async def connect(self):
         try:
             # Get conversation ID from URL route
             self.conversation_id = self.scope["url_route"]["kwargs"]["conversation_id"]
-            self.group_name = f"conversation_{self.conversation_id}"
 
             # Handle authentication
             if self.scope["user"].is_anonymous:
@@ -31,9 +73,14 @@ class ConversationConsumer(AsyncWebsocketConsumer):
                 await self.close(code=4004)
                 return
 
+            self.group_name = conversation_group_name(
+                self.conversation_kind, self.conversation_id
+            )
+
             # Join the group
             await self.channel_layer.group_add(self.group_name, self.channel_name)
             await self.accept()
+            self.init_outbound_queue()
 
             # Send success message
             await self.send(
@@ -41,10 +88,14 @@ class ConversationConsumer(AsyncWebsocketConsumer):
                     {
                         "type": "connection_established",
                         "message": "Connected successfully",
+                        "heartbeat_interval": presence_service.heartbeat_interval,
                     }
                 )
             )
 
+            await self.heartbeat()
+            await self.broadcast_presence(online=True)
+
         except Exception as e:
             logger.error(f"WebSocket connection error: {str(e)}")
             await self.close(code=4000)
@@ -62,8 +113,17 @@ class ConversationConsumer(AsyncWebsocketConsumer):
                     f"with code {close_code}"
                 )
 
+            for task in self.chatbot_tasks:
+                task.cancel()
+            await self.close_outbound_queue()
+
             # Leave conversation group
             if hasattr(self, "group_name") and hasattr(self, "channel_name"):
+                await self.set_typing(False)
+                offline = await sync_to_async(presence_service.disconnect)(
+                    self.scope["user"].id, self.channel_name
+                )
+                await self.broadcast_presence(online=not offline)
                 await self.channel_layer.group_discard(
                     self.group_name, self.channel_name
                 )
@@ -77,21 +137,46 @@ class ConversationConsumer(AsyncWebsocketConsumer):
             data = json.loads(text_data)
             logger.debug(f"Received WebSocket message: {data}")
 
+            # Keep this socket's presence alive
+            if data.get("type") == "heartbeat":
+                await self.heartbeat()
+                await self.send(text_data=json.dumps({"type": "heartbeat_ack"}))
+
+            # Debounced typing indicator, never written to the database
+            elif data.get("type") == "typing" and self.conversation_kind in (
+                "one_to_one",
+                "group",
+            ):
+                await self.set_typing(
+                    presence_service.parse_is_typing(data.get("is_typing", True))
+                )
+
             # Handle read receipts
-            if data.get("type") == "mark_read":
+            elif data.get("type") == "mark_read" and self.conversation_kind in (
+                "one_to_one",
+                "group",
+            ):
                 message_id = data.get("message_id")
                 if message_id:
-                    await self.mark_message_as_read(message_id)
-                    # Notify other participants
-                    await self.channel_layer.group_send(
-                        self.group_name,
-                        {
-                            "type": "read_receipt",
-                            "user_id": str(self.scope["user"].id),
-                            "username": self.scope["user"].username,
-                            "message_id": message_id,
-                        },
-                    )
+                    receipt = await self.mark_message_as_read(message_id)
+                    # Notify other participants with one aggregated receipt
+                    if receipt:
+                        await self.channel_layer.group_send(
+                            self.group_name, {"type": "read_receipt", **receipt}
+                        )
+
+            # Chatbot messages are answered without blocking a worker thread
+            elif (
+                data.get("type") == "chatbot_message"
+                and self.conversation_kind == "chatbot"
+            ):
+                # Run in the background so this consumer keeps dispatching the
+                # group events (e.g. chatbot_delta) produced while it runs
+                task = asyncio.create_task(
+                    self.handle_chatbot_message(data.get("content", ""))
+                )
+                self.chatbot_tasks.add(task)
+                task.add_done_callback(self.chatbot_tasks.discard)
 
         except json.JSONDecodeError:
             logger.warning("Invalid JSON received in WebSocket message")
@@ -104,86 +189,284 @@ class ConversationConsumer(AsyncWebsocketConsumer):
             message_data = event.get("message", {})
 
             # Ensure we're sending the correct event structure
-            await self.send(
-                text_data=json.dumps(
-                    {
-                        "type": "new_message",
-                        "message": {
-                            "id": message_data.get("id"),
-                            "content": message_data.get("content"),
-                            "sender_id": message_data.get("sender_id"),
-                            "sender_name": message_data.get("sender_name"),
-                            "conversation_id": message_data.get("conversation_id"),
-                            "timestamp": message_data.get("timestamp"),
-                            "event_type": message_data.get("event_type", "new_message"),
-                            "message_type": message_data.get("message_type", "text"),
-                        },
-                    }
-                )
+            self.enqueue(
+                {
+                    "type": "new_message",
+                    "message": {
+                        "id": message_data.get("id"),
+                        "content": message_data.get("content"),
+                        "sender_id": message_data.get("sender_id"),
+                        "sender_name": message_data.get("sender_name"),
+                        "conversation_id": message_data.get("conversation_id"),
+                        "timestamp": message_data.get("timestamp"),
+                        "event_type": message_data.get("event_type", "new_message"),
+                        "message_type": message_data.get("message_type", "text"),
+                        "is_bot": message_data.get("is_bot", False),
+                        "is_edited": message_data.get("is_edited", False),
+                        "truncated": message_data.get("truncated", False),
+                    },
+                }
             )
 
-            logger.debug(f"Sent message to client: {message_data.get('id')}")
+            logger.debug(f"Queued message for client: {message_data.get('id')}")
         except Exception as e:
             logger.error(f"Error sending conversation message: {str(e)}", exc_info=True)
 
+    async def resync(self, event):
+        """Message updates were skipped; the client should refetch"""
+        try:
+            self.enqueue(
+                {"type": "resync", "conversation_id": event.get("conversation_id")},
+                compact_key="resync",
+                droppable=False,
+            )
+        except Exception as e:
+            logger.error(f"Error sending resync: {str(e)}", exc_info=True)
+
     async def read_receipt(self, event):
         """Send read receipt to WebSocket"""
         try:
-            await self.send(
-                text_data=json.dumps(
-                    {
-                        "type": "read_receipt",
-                        "user_id": event["user_id"],
-                        "username": event["username"],
-                        "message_id": event["message_id"],
-                    }
-                )
+            self.enqueue(
+                {
+                    "type": "read_receipt",
+                    "user_id": event["user_id"],
+                    "username": event["username"],
+                    "conversation_id": event.get("conversation_id"),
+                    "message_id": event["message_id"],
+                    "message_ids": event.get("message_ids", []),
+                    "read_count": event.get("read_count", 0),
+                },
+                compact_key=("read_receipt", event["user_id"]),
+                merge=merge_read_receipts,
             )
         except Exception as e:
             logger.error(f"Error sending read receipt: {str(e)}", exc_info=True)
 
-    @database_sync_to_async
-    def get_user_from_token(self, token):
-        """Validate JWT token and get user"""
+    async def typing_indicator(self, event):
+        """Send another participant's typing state to WebSocket"""
+        if event["user_id"] == self.scope["user"].id:
+            return
         try:
-            # Validate token and get user
-            access_token = AccessToken(token)
-            user_id = access_token["user_id"]
-            return User.objects.get(id=user_id)
-        except (TokenError, InvalidToken, User.DoesNotExist) as e:
-            logger.warning(f"Invalid token: {str(e)}")
-            return None
+            self.enqueue(
+                {
+                    "type": "typing",
+                    "user_id": event["user_id"],
+                    "username": event["username"],
+                    "conversation_id": event["conversation_id"],
+                    "is_typing": event["is_typing"],
+                    "expires_in": event["expires_in"],
+                },
+                compact_key=("typing", event["user_id"]),
+            )
         except Exception as e:
-            logger.error(f"Error validating token: {str(e)}", exc_info=True)
-            return None
+            logger.error(f"Error sending typing indicator: {str(e)}", exc_info=True)
 
-    @database_sync_to_async
-    def is_conversation_participant(self):
-        """Check if user is a participant in the conversation"""
+    async def presence_update(self, event):
+        """Send another participant's online state to WebSocket"""
+        if event["user_id"] == self.scope["user"].id:
+            return
+        try:
+            self.enqueue(
+                {
+                    "type": "presence",
+                    "user_id": event["user_id"],
+                    "username": event["username"],
+                    "online": event["online"],
+                },
+                compact_key=("presence", event["user_id"]),
+            )
+        except Exception as e:
+            logger.error(f"Error sending presence update: {str(e)}", exc_info=True)
+
+    async def heartbeat(self):
+        await sync_to_async(presence_service.heartbeat)(
+            self.scope["user"].id, self.channel_name
+        )
+
+    async def set_typing(self, is_typing):
+        """Record a typing signal and notify the group when the state changes"""
+        user = self.scope["user"]
+        changed = await sync_to_async(presence_service.set_typing)(
+            user.id, self.conversation_kind, self.conversation_id, is_typing
+        )
+        if changed:
+            await self.channel_layer.group_send(
+                self.group_name,
+                presence_service.typing_event(
+                    user.id,
+                    user.username,
+                    self.conversation_kind,
+                    self.conversation_id,
+                    is_typing,
+                ),
+            )
+
+    async def broadcast_presence(self, online):
         user = self.scope["user"]
+        await self.channel_layer.group_send(
+            self.group_name,
+            presence_service.presence_event(user.id, user.username, online),
+        )
+
+    async def handle_chatbot_message(self, content):
+        """Save the user's message, await the bot reply and save it"""
         try:
-            # Try one-to-one conversation first
-            from messaging.models.one_to_one import OneToOneConversation
+            await self.answer_chatbot_message(content)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error answering chatbot message: {str(e)}", exc_info=True)
 
-            if OneToOneConversation.objects.filter(
-                id=self.conversation_id, participants=user
-            ).exists():
-                return True
+    async def answer_chatbot_message(self, content):
+        user_message = await self.save_chatbot_user_message(content)
+        if user_message is None:
+            await self.send(
+                text_data=json.dumps(
+                    {"type": "error", "message": "Chatbot conversation not found"}
+                )
+            )
+            return
+
+        context = await self.get_chatbot_context(user_message)
+        if chatbot_service.stream_responses:
+            await self.stream_chatbot_reply(user_message, context)
+            return
+
+        bot_response = await chatbot_service.aget_response(
+            message=user_message.content,
+            history=context["history"],
+            summary=context["summary"],
+        )
+        if not bot_response["success"]:
+            logger.error(f"Chatbot service error: {bot_response.get('error')}")
+
+        # Saving broadcasts the reply to the group as a new_message event
+        await self.save_chatbot_reply(user_message, bot_response)
+
+    async def stream_chatbot_reply(self, user_message, context):
+        """
+        Forward the reply to the group as chatbot_delta frames while it is
+        generated, then persist it once as a single ChatbotMessage.
+        """
+        stream_id = str(uuid.uuid4())
+        chunks = []
+        try:
+            async for chunk in chatbot_service.astream_response(
+                user_message.content, context["history"], context["summary"]
+            ):
+                chunks.append(chunk)
+                await self.channel_layer.group_send(
+                    self.group_name,
+                    {
+                        "type": "chatbot_delta",
+                        "stream_id": stream_id,
+                        "delta": chunk,
+                        "done": False,
+                    },
+                )
+            success = bool(chunks)
+        except ChatbotError as e:
+            logger.error(f"Chatbot streaming error: {str(e)}")
+            success = False
+
+        content = "".join(chunks).strip()
+        if not content:
+            content = ERROR_MESSAGES["Service unavailable"]
+        bot_message = await self.save_chatbot_reply(
+            user_message, {"success": success, "response": content}
+        )
+
+        await self.channel_layer.group_send(
+            self.group_name,
+            {
+                "type": "chatbot_delta",
+                "stream_id": stream_id,
+                "delta": "",
+                "done": True,
+                "message_id": str(bot_message.id),
+            },
+        )
+
+    @database_sync_to_async
+    def save_chatbot_user_message(self, content):
+        from messaging.models.chatbot import ChatbotConversation, ChatbotMessage
 
-            # Try group conversation
-            from messaging.models.group import GroupConversation
+        user = self.scope["user"]
+        if not isinstance(content, str) or not content.strip():
+            return None
+        conversation = ChatbotConversation.objects.filter(
+            id=self.conversation_id, user_id=user.id
+        ).first()
+        if conversation is None:
+            return None
+        return ChatbotMessage.objects.create(
+            conversation=conversation, sender_id=user.id, content=content, is_bot=False
+        )
 
-            if GroupConversation.objects.filter(
-                id=self.conversation_id, participants=user
-            ).exists():
-                return True
+    @database_sync_to_async
+    def get_chatbot_context(self, user_message):
+        return prompt_builder.context_for(user_message)
 
-            # Try chatbot conversation
-            from messaging.models.chatbot import ChatbotConversation
+    @database_sync_to_async
+    def save_chatbot_reply(self, user_message, bot_response):
+        from messaging.models.chatbot import ChatbotMessage
+
+        return ChatbotMessage.objects.create(
+            conversation=user_message.conversation,
+            content=bot_response["response"],
+            is_bot=True,
+            metadata={"error": not bot_response["success"]},
+        )
+
+    async def chatbot_delta(self, event):
+        """Send a chunk of a streamed chatbot reply to WebSocket"""
+        try:
+            self.enqueue(
+                {
+                    "type": "chatbot_delta",
+                    "stream_id": event["stream_id"],
+                    "delta": event["delta"],
+                    "done": event["done"],
+                    "message_id": event.get("message_id"),
+                },
+                compact_key=("chatbot_delta", event["stream_id"]),
+                merge=merge_chatbot_deltas,
+                droppable=False,
+            )
+        except Exception as e:
+            logger.error(f"Error sending chatbot delta: {str(e)}", exc_info=True)
+
+    def get_user_model_instance(self):
+        """
+        The full user model for the connection. The auth middleware puts a
+        claims-based ScopeUser in the scope; it is only loaded when needed.
+        """
+        user = self.scope["user"]
+        return user.get_user() if isinstance(user, ScopeUser) else user
 
-            if ChatbotConversation.objects.filter(
-                id=self.conversation_id, user=user
-            ).exists():
+    @database_sync_to_async
+    def is_conversation_participant(self):
+        """Check if user is a participant in the conversation"""
+        user = self.scope["user"]
+        try:
+            if self.conversation_kind is None:
+                # Legacy untyped route: only unambiguous ids are accepted
+                kinds = membership_service.conversation_kinds(
+                    user.id, self.conversation_id
+                )
+                if len(kinds) > 1:
+                    logger.warning(
+                        f"Conversation id {self.conversation_id} of user "
+                        f"{user.username} matches {', '.join(kinds)}; the client "
+                        f"must use the dm/, group/ or bot/ route"
+                    )
+                    return False
+                if kinds:
+                    self.conversation_kind = kinds[0]
+                    return True
+            elif membership_service.is_member(
+                user.id, self.conversation_kind, self.conversation_id
+            ):
                 return True
 
             logger.warning(
@@ -199,45 +482,49 @@ class ConversationConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def mark_message_as_read(self, message_id):
-        """Mark a message as read by the current user"""
+        """
+        Mark the conversation as read by the current user up to a message.
+        Returns the aggregated read receipt, or None when nothing new was read.
+        """
         try:
             user = self.scope["user"]
 
-            # Try to find the message in different message types
             from messaging.models.one_to_one import OneToOneMessage
             from messaging.models.group import GroupMessage
 
-            # Check OneToOneMessage
-            try:
-                message = OneToOneMessage.objects.get(
-                    id=message_id, conversation__participants=user
+            message_model = {
+                "one_to_one": OneToOneMessage,
+                "group": GroupMessage,
+            }[self.conversation_kind]
+            message = (
+                message_model.objects.select_related("conversation")
+                .filter(
+                    id=message_id,
+                    conversation_id=self.conversation_id,
+                    conversation__participants__id=user.id,
                 )
-                if hasattr(message, "read_by") and user not in message.read_by.all():
-                    message.read_by.add(user)
-                    logger.debug(
-                        f"Marked one-to-one message {message_id} as read by {user.username}"
-                    )
-                return True
-            except OneToOneMessage.DoesNotExist:
-                pass
-
-            # Check GroupMessage
-            try:
-                message = GroupMessage.objects.get(
-                    id=message_id, conversation__participants=user
+                .first()
+            )
+            if message:
+                return read_state_service.mark_read(
+                    self.get_user_model_instance(), message.conversation, message
                 )
-                if hasattr(message, "read_by") and user not in message.read_by.all():
-                    message.read_by.add(user)
-                    logger.debug(
-                        f"Marked group message {message_id} as read by {user.username}"
-                    )
-                return True
-            except GroupMessage.DoesNotExist:
-                pass
 
             logger.warning(f"Message {message_id} not found for user {user.username}")
-            return False
+            return None
 
         except Exception as e:
             logger.error(f"Error marking message as read: {str(e)}", exc_info=True)
-            return False
+            return None
+
+
+class OneToOneConsumer(ConversationConsumer):
+    conversation_kind = "one_to_one"
+
+
+class GroupConsumer(ConversationConsumer):
+    conversation_kind = "group"
+
+
+class ChatbotConsumer(ConversationConsumer):
+    conversation_kind = "chatbot"
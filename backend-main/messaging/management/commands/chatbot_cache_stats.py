@@ -0,0 +1,13 @@
+# messaging/management/commands/chatbot_cache_stats.py
+import json
+from django.core.management.base import BaseCommand
+
+from messaging.services.chatbot import chatbot_service
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the chatbot response cache"
+
+    def handle(self, *args, **options):
+        stats = chatbot_service.response_cache.stats()
+        self.stdout.write(json.dumps(stats, indent=2))
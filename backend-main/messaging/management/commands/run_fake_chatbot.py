@@ -0,0 +1,117 @@
+# messaging/management/commands/run_fake_chatbot.py
+import asyncio
+import json
+from aiohttp import web
+from django.core.management.base import BaseCommand
+
+FAKE_REPLY = (
+    "Thank you for sharing that with me. It sounds like a lot to carry. "
+    "Would you like to try a short breathing exercise together?"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local fake of the Gemini generateContent/streamGenerateContent, "
+        "Ollama /api/generate and OpenAI-compatible /v1/completions APIs for "
+        "development and tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--chunk-delay",
+            type=float,
+            default=0.05,
+            help="Seconds between streamed chunks",
+        )
+        parser.add_argument("--reply", default=FAKE_REPLY)
+
+    def handle(self, *args, **options):
+        reply = options["reply"]
+        chunk_delay = options["chunk_delay"]
+
+        def candidate(text):
+            return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+        async def generate(request):
+            await request.json()
+            return web.json_response(candidate(reply))
+
+        async def stream_generate(request):
+            await request.json()
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            words = reply.split(" ")
+            for index, word in enumerate(words):
+                chunk = word if index == len(words) - 1 else f"{word} "
+                await response.write(
+                    f"data: {json.dumps(candidate(chunk))}\r\n\r\n".encode()
+                )
+                await asyncio.sleep(chunk_delay)
+            await response.write_eof()
+            return response
+
+        async def ollama_generate(request):
+            body = await request.json()
+            if not body.get("stream", True):
+                return web.json_response(
+                    {"model": body.get("model"), "response": reply, "done": True}
+                )
+            response = web.StreamResponse(
+                headers={"Content-Type": "application/x-ndjson"}
+            )
+            await response.prepare(request)
+            words = reply.split(" ")
+            for index, word in enumerate(words):
+                chunk = word if index == len(words) - 1 else f"{word} "
+                await response.write(
+                    (json.dumps({"response": chunk, "done": False}) + "\n").encode()
+                )
+                await asyncio.sleep(chunk_delay)
+            await response.write(
+                (json.dumps({"response": "", "done": True}) + "\n").encode()
+            )
+            await response.write_eof()
+            return response
+
+        async def completions(request):
+            body = await request.json()
+            prompts = body["prompt"]
+            if isinstance(prompts, str):
+                prompts = [prompts]
+            self.stdout.write(f"Completions batch of {len(prompts)} prompt(s)")
+            return web.json_response(
+                {
+                    "choices": [
+                        {"index": index, "text": reply, "finish_reason": "stop"}
+                        for index in range(len(prompts))
+                    ]
+                }
+            )
+
+        async def dispatch(request):
+            if request.path == "/api/generate":
+                return await ollama_generate(request)
+            if request.path == "/v1/completions":
+                return await completions(request)
+            if request.path.endswith(":streamGenerateContent"):
+                return await stream_generate(request)
+            return await generate(request)
+
+        app = web.Application()
+        app.router.add_post("/{tail:.*}", dispatch)
+
+        base = f"http://{options['host']}:{options['port']}"
+        url = f"{base}/v1/models/fake"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fake chatbot API listening:\n"
+                f"  CHATBOT_API_URL={url}:generateContent\n"
+                f"  CHATBOT_STREAM_API_URL={url}:streamGenerateContent?alt=sse\n"
+                f"  OLLAMA_API_URL={base}/api/generate\n"
+                f"  CHATBOT_BATCH_API_URL={base}/v1/completions"
+            )
+        )
+        web.run_app(app, host=options["host"], port=options["port"], print=None)
@@ -1,13 +1,23 @@
-# myapp/management/commands/setup_ollama_model.py
+# messaging/management/commands/setup_ollama_model.py
 import subprocess
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
 
 class Command(BaseCommand):
-    help = "Verify and download the Ollama model if necessary"
+    help = (
+        "Verify and download the Ollama model used by the local chatbot "
+        "provider (CHATBOT_SETTINGS['LOCAL_MODEL']) if necessary. Run it when "
+        "deploying on-prem nodes, not on every worker start."
+    )
 
-    def handle(self, *args, **kwargs):
-        model_name = "llama2"  # Replace with your desired model name
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", default=settings.CHATBOT_SETTINGS.get("LOCAL_MODEL", "llama2")
+        )
+
+    def handle(self, *args, **options):
+        model_name = options["model"]
         try:
             # Check if the model is already downloaded
             result = subprocess.run(["ollama", "ls"], capture_output=True, text=True)
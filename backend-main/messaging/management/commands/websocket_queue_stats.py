@@ -0,0 +1,11 @@
+import json
+from django.core.management.base import BaseCommand
+
+from messaging.outbound import outbound_stats
+
+
+class Command(BaseCommand):
+    help = "Show depth and throughput of the outbound websocket queues"
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(outbound_stats(), indent=2))
@@ -2,15 +2,15 @@
 from cryptography.fernet import Fernet
 from django.conf import settings
 from rest_framework.response import Response
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 import logging
 from django.core.cache import cache
-from django.utils import timezone
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import (
     TokenError,
@@ -40,101 +40,77 @@ class MessageEncryptionMiddleware:
         return message
 
 
-class RealTimeMiddleware:
-    """Middleware to handle real-time updates for messaging actions"""
+USER_SNAPSHOT_TIMEOUT = 300
+USER_SNAPSHOT_FIELDS = ("username", "user_type", "first_name", "last_name", "is_active")
 
-    def __init__(self, get_response):
-        self.get_response = get_response
-        self.channel_layer = get_channel_layer()
 
-    def __call__(self, request):
-        response = self.get_response(request)
+def _user_snapshot_key(user_id):
+    return f"ws_user_snapshot_{user_id}"
 
-        try:
-            # Skip if channel layer is not available
-            if not self.channel_layer:
-                return response
 
-            # Check if this is a messaging action that needs real-time updates
-            if self._should_send_update(request, response):
-                self._send_websocket_update(request, response)
-        except Exception as e:
-            logger.error(f"Error in RealTimeMiddleware: {str(e)}", exc_info=True)
+def get_user_snapshot(user_id):
+    """
+    Small cached dict of the user's profile fields, or None if the user does
+    not exist. Only a cache miss touches the database.
+    """
+    key = _user_snapshot_key(user_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = (
+            get_user_model()
+            .objects.filter(id=user_id)
+            .values(*USER_SNAPSHOT_FIELDS)
+            .first()
+        ) or {}
+        cache.set(key, snapshot, timeout=USER_SNAPSHOT_TIMEOUT)
+    return snapshot or None
 
-        return response
 
-    def _should_send_update(self, request, response):
-        """Determine if the request should trigger a real-time update"""
-        # Only for messaging endpoints, certain methods, and successful responses
-        is_messaging_path = request.path.startswith("/api/messaging/")
-        is_modifying_method = request.method in ["POST", "PUT", "PATCH", "DELETE"]
-        is_successful = 200 <= response.status_code < 300
+def invalidate_user_snapshot(user_id):
+    cache.delete(_user_snapshot_key(user_id))
 
-        return is_messaging_path and is_modifying_method and is_successful
 
-    def _extract_conversation_id(self, path):
-        """Extract conversation ID from request path"""
-        try:
-            # Example paths:
-            # /api/messaging/one_to_one/123/
-            # /api/messaging/groups/123/
-            # /api/messaging/chatbot/123/
-            parts = path.split("/")
-            conversation_types = ["one_to_one", "groups", "chatbot"]
-            for i, part in enumerate(parts):
-                if part in conversation_types and i + 1 < len(parts):
-                    potential_id = parts[i + 1]
-                    # Check if the ID part is a valid numeric ID
-                    if potential_id and potential_id.isdigit():
-                        return potential_id
-            return None
-        except Exception as e:
-            logger.error(f"Error extracting conversation ID: {str(e)}")
-            return None
+class ScopeUser(TokenUser):
+    """
+    Websocket user built from verified access token claims (user_id,
+    username, user_type) and the cached user snapshot, without loading the
+    user model. Consumers that need the model instance call get_user() or
+    aget_user(), which load it once per connection.
+    """
 
-    def _send_websocket_update(self, request, response):
-        """Send WebSocket update for real-time messaging"""
-        try:
-            conversation_id = self._extract_conversation_id(request.path)
-            if not conversation_id:
-                return
-
-            # Cache key for rate limiting
-            cache_key = f"ws_update_{conversation_id}_{request.user.id}"
-            cache.add(cache_key, 1, timeout=1)  # Simple rate limiting
-
-            # Determine action type based on method and endpoint
-            if "message" in request.path.lower():
-                if request.method == "POST":
-                    action = "message_created"
-                elif request.method in ["PUT", "PATCH"]:
-                    action = "message_updated"
-                elif request.method == "DELETE":
-                    action = "message_deleted"
-                else:
-                    action = "message_action"
-            else:
-                action = "conversation_updated"
-
-            # Prepare update data
-            update_data = {
-                "type": "conversation.message",
-                "message": {
-                    "event_type": action,
-                    "user_id": str(request.user.id),
-                    "username": request.user.username,
-                    "data": response.data if hasattr(response, "data") else {},
-                    "timestamp": timezone.now().isoformat(),
-                    "conversation_id": conversation_id,
-                },
-            }
-
-            # Send to appropriate group
-            group_name = f"conversation_{conversation_id}"
-            async_to_sync(self.channel_layer.group_send)(group_name, update_data)
+    def __init__(self, token, snapshot):
+        super().__init__(token)
+        self.snapshot = snapshot
+        self._user = None
 
-        except Exception as e:
-            logger.error(f"Failed to send WebSocket update: {str(e)}", exc_info=True)
+    @cached_property
+    def username(self):
+        return self.token.get("username") or self.snapshot.get("username", "")
+
+    @property
+    def is_active(self):
+        return self.snapshot.get("is_active", True)
+
+    def get_full_name(self):
+        first_name = self.first_name or ""
+        last_name = self.last_name or ""
+        return f"{first_name} {last_name}".strip()
+
+    def get_user(self):
+        """The full user model instance (one query, then cached)"""
+        if self._user is None:
+            self._user = get_user_model().objects.get(id=self.id)
+        return self._user
+
+    async def aget_user(self):
+        return await database_sync_to_async(self.get_user)()
+
+    def __getattr__(self, attr):
+        if attr in ("token", "snapshot"):
+            raise AttributeError(attr)
+        # Claims first (e.g. user_type), then the snapshot
+        value = self.token.get(attr)
+        return value if value is not None else self.snapshot.get(attr)
 
 
 class WebSocketAuthMiddleware(BaseMiddleware):
@@ -163,14 +139,20 @@ class WebSocketAuthMiddleware(BaseMiddleware):
             scope["user"] = AnonymousUser()
             return await super().__call__(scope, receive, send)
 
-    @database_sync_to_async
-    def get_user_from_token(self, token):
+    async def get_user_from_token(self, token):
+        """
+        Verify the token and build a ScopeUser from its claims. The database
+        is only read on a user snapshot cache miss.
+        """
         try:
             access_token = AccessToken(token)
-            user_id = access_token["user_id"]
-            User = get_user_model()
-            return User.objects.get(id=user_id)
-        except (TokenError, InvalidToken, User.DoesNotExist) as e:
+            user_id = access_token[api_settings.USER_ID_CLAIM]
+            snapshot = await database_sync_to_async(get_user_snapshot)(user_id)
+            if snapshot is None or not snapshot.get("is_active", True):
+                logger.warning(f"User {user_id} not found or inactive")
+                return None
+            return ScopeUser(access_token, snapshot)
+        except (TokenError, InvalidToken, KeyError) as e:
             logger.warning(f"Token validation failed: {str(e)}")
             return None
         except Exception as e:
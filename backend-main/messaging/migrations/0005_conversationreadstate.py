@@ -0,0 +1,130 @@
+# Generated by Django 4.2.14 on 2026-10-17 03:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+CONVERSATION_MESSAGE_MODELS = {
+    "onetooneconversation": "onetoonemessage",
+    "groupconversation": "groupmessage",
+}
+
+
+def backfill_read_states(apps, schema_editor):
+    """
+    Seed unread counters and read watermarks (the latest message with a
+    receipt) from the existing read_by receipts
+    """
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    ConversationReadState = apps.get_model("messaging", "ConversationReadState")
+
+    for conversation_model, message_model in CONVERSATION_MESSAGE_MODELS.items():
+        Conversation = apps.get_model("messaging", conversation_model)
+        Message = apps.get_model("messaging", message_model)
+        content_type, _ = ContentType.objects.get_or_create(
+            app_label="messaging", model=conversation_model
+        )
+
+        states = []
+        for conversation in Conversation.objects.prefetch_related("participants"):
+            for user in conversation.participants.all():
+                unread_count = (
+                    Message.objects.filter(conversation_id=conversation.pk)
+                    .exclude(sender_id=user.pk)
+                    .exclude(read_by=user)
+                    .count()
+                )
+                last_read = (
+                    Message.objects.filter(
+                        conversation_id=conversation.pk, read_by=user
+                    )
+                    .order_by("-timestamp", "-id")
+                    .values_list("id", "timestamp")
+                    .first()
+                )
+                states.append(
+                    ConversationReadState(
+                        user_id=user.pk,
+                        content_type_id=content_type.pk,
+                        object_id=conversation.pk,
+                        unread_count=unread_count,
+                        last_read_message_id=last_read[0] if last_read else None,
+                        last_read_at=last_read[1] if last_read else None,
+                    )
+                )
+        ConversationReadState.objects.bulk_create(
+            states, batch_size=1000, ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("messaging", "0004_onetoonemessage_edit_history"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConversationReadState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveBigIntegerField()),
+                (
+                    "last_read_message_id",
+                    models.PositiveBigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "last_read_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Timestamp of the last message read",
+                        null=True,
+                    ),
+                ),
+                ("unread_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="conversation_read_states",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Conversation Read State",
+                "verbose_name_plural": "Conversation Read States",
+                "indexes": [
+                    models.Index(
+                        fields=["content_type", "object_id"],
+                        name="messaging_c_content_717551_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="conversationreadstate",
+            constraint=models.UniqueConstraint(
+                fields=("user", "content_type", "object_id"),
+                name="unique_conversation_read_state",
+            ),
+        ),
+        migrations.RunPython(backfill_read_states, migrations.RunPython.noop),
+    ]
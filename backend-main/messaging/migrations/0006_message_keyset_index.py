@@ -0,0 +1,33 @@
+# Generated by Django 4.2.14 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0005_conversationreadstate"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chatbotmessage",
+            index=models.Index(
+                fields=["conversation", "-timestamp", "-id"],
+                name="messaging_c_convers_6f21c5_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="groupmessage",
+            index=models.Index(
+                fields=["conversation", "-timestamp", "-id"],
+                name="messaging_g_convers_19d235_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="onetoonemessage",
+            index=models.Index(
+                fields=["conversation", "-timestamp", "-id"],
+                name="messaging_o_convers_e4b558_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.14 on 2026-10-17 04:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+CONVERSATION_MESSAGE_MODELS = {
+    "onetooneconversation": "onetoonemessage",
+    "groupconversation": "groupmessage",
+    "chatbotconversation": "chatbotmessage",
+}
+
+
+def backfill_message_counts(apps, schema_editor):
+    """Seed the message counters from the existing messages"""
+    for conversation_model, message_model in CONVERSATION_MESSAGE_MODELS.items():
+        Conversation = apps.get_model("messaging", conversation_model)
+        Message = apps.get_model("messaging", message_model)
+        counts = (
+            Message.objects.filter(conversation_id=OuterRef("pk"))
+            .order_by()
+            .values("conversation_id")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        Conversation.objects.update(message_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0006_message_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatbotconversation",
+            name="message_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Maintained count of messages, used for page totals",
+            ),
+        ),
+        migrations.AddField(
+            model_name="groupconversation",
+            name="message_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Maintained count of messages, used for page totals",
+            ),
+        ),
+        migrations.AddField(
+            model_name="onetooneconversation",
+            name="message_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Maintained count of messages, used for page totals",
+            ),
+        ),
+        migrations.RunPython(backfill_message_counts, migrations.RunPython.noop),
+    ]
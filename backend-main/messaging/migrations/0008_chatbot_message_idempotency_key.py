@@ -0,0 +1,25 @@
+# Generated by Django 4.2.14 on 2026-10-17 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0007_conversation_message_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatbotmessage",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="chatbotmessage",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("idempotency_key__isnull", False)),
+                fields=("conversation", "idempotency_key"),
+                name="unique_chatbot_message_idempotency_key",
+            ),
+        ),
+    ]
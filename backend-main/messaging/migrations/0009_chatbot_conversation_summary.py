@@ -0,0 +1,29 @@
+# Generated by Django 4.2.14 on 2026-10-17 04:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0008_chatbot_message_idempotency_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatbotconversation",
+            name="summarized_until",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="messaging.chatbotmessage",
+            ),
+        ),
+        migrations.AddField(
+            model_name="chatbotconversation",
+            name="summary",
+            field=models.TextField(blank=True, default=""),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.14 on 2026-10-17 04:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+MESSAGE_TABLES = (
+    "messaging_onetoonemessage",
+    "messaging_groupmessage",
+    "messaging_chatbotmessage",
+)
+
+
+def search_vector_sql(table):
+    """Trigger keeping search_vector in step with content, then a backfill"""
+    return [
+        f"""
+        CREATE TRIGGER {table}_search_vector_update
+        BEFORE INSERT OR UPDATE OF content ON {table}
+        FOR EACH ROW EXECUTE FUNCTION
+        tsvector_update_trigger(search_vector, 'pg_catalog.english', content);
+        """,
+        f"UPDATE {table} SET search_vector = to_tsvector('pg_catalog.english', content);",
+    ]
+
+
+def drop_search_vector_sql(table):
+    return f"DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table};"
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0009_chatbot_conversation_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatbotmessage",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="groupmessage",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="onetoonemessage",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chatbotmessage",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="messaging_c_search__ca9a5c_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="groupmessage",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="messaging_g_search__a3b180_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="onetoonemessage",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="messaging_o_search__9c898e_gin"
+            ),
+        ),
+    ] + [
+        migrations.RunSQL(search_vector_sql(table), drop_search_vector_sql(table))
+        for table in MESSAGE_TABLES
+    ]
@@ -0,0 +1,148 @@
+# Generated by Django 4.2.14 on 2026-10-17 04:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+MESSAGE_MODELS = ("onetoonemessage", "groupmessage", "chatbotmessage")
+REACTION_TYPES = {"like", "heart", "smile", "thumbsup"}
+
+
+def copy_reactions(apps, schema_editor):
+    """Move the reactions JSON ({type: [user_id, ...]}) into MessageReaction rows"""
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    MessageReaction = apps.get_model("messaging", "MessageReaction")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    user_ids = set(User.objects.values_list("id", flat=True))
+
+    for model_name in MESSAGE_MODELS:
+        Message = apps.get_model("messaging", model_name)
+        content_type, _ = ContentType.objects.get_or_create(
+            app_label="messaging", model=model_name
+        )
+        reactions = []
+        messages = Message.objects.exclude(reactions={}).values_list("id", "reactions")
+        for message_id, message_reactions in messages.iterator():
+            for reaction_type, reactors in (message_reactions or {}).items():
+                if reaction_type not in REACTION_TYPES:
+                    continue
+                for user_id in {int(u) for u in reactors if str(u).isdigit()}:
+                    if user_id in user_ids:
+                        reactions.append(
+                            MessageReaction(
+                                content_type=content_type,
+                                object_id=message_id,
+                                user_id=user_id,
+                                reaction_type=reaction_type,
+                            )
+                        )
+        MessageReaction.objects.bulk_create(
+            reactions, batch_size=1000, ignore_conflicts=True
+        )
+
+
+def restore_reactions(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    MessageReaction = apps.get_model("messaging", "MessageReaction")
+
+    for model_name in MESSAGE_MODELS:
+        Message = apps.get_model("messaging", model_name)
+        content_type = ContentType.objects.filter(
+            app_label="messaging", model=model_name
+        ).first()
+        if content_type is None:
+            continue
+        by_message = {}
+        rows = MessageReaction.objects.filter(content_type=content_type).values_list(
+            "object_id", "reaction_type", "user_id"
+        )
+        for message_id, reaction_type, user_id in rows.iterator():
+            by_message.setdefault(message_id, {}).setdefault(reaction_type, []).append(
+                str(user_id)
+            )
+        for message_id, reactions in by_message.items():
+            Message.objects.filter(id=message_id).update(reactions=reactions)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("messaging", "0010_message_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MessageReaction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveBigIntegerField()),
+                (
+                    "reaction_type",
+                    models.CharField(
+                        choices=[
+                            ("like", "like"),
+                            ("heart", "heart"),
+                            ("smile", "smile"),
+                            ("thumbsup", "thumbsup"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="message_reactions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Message Reaction",
+                "verbose_name_plural": "Message Reactions",
+                "indexes": [
+                    models.Index(
+                        fields=["content_type", "object_id"],
+                        name="messaging_m_content_b2c23e_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="messagereaction",
+            constraint=models.UniqueConstraint(
+                fields=("content_type", "object_id", "user", "reaction_type"),
+                name="unique_message_reaction",
+            ),
+        ),
+        migrations.RunPython(copy_reactions, restore_reactions),
+        migrations.RemoveField(
+            model_name="chatbotmessage",
+            name="reactions",
+        ),
+        migrations.RemoveField(
+            model_name="groupmessage",
+            name="reactions",
+        ),
+        migrations.RemoveField(
+            model_name="onetoonemessage",
+            name="reactions",
+        ),
+    ]
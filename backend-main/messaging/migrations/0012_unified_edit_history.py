@@ -0,0 +1,108 @@
+# Generated by Django 4.2.14 on 2026-10-17 04:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+import django.utils.timezone
+
+
+def copy_edit_history(apps, schema_editor):
+    """Move OneToOneMessage.edit_history entries into MessageEditHistory rows"""
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    MessageEditHistory = apps.get_model("messaging", "MessageEditHistory")
+    OneToOneMessage = apps.get_model("messaging", "OneToOneMessage")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    user_ids = set(User.objects.values_list("id", flat=True))
+
+    content_type, _ = ContentType.objects.get_or_create(
+        app_label="messaging", model="onetoonemessage"
+    )
+    records = []
+    messages = OneToOneMessage.objects.exclude(edit_history=[]).values_list(
+        "id", "timestamp", "edit_history"
+    )
+    for message_id, timestamp, entries in messages.iterator():
+        for entry in entries or []:
+            if not isinstance(entry, dict):
+                continue
+            editor = str((entry.get("edited_by") or {}).get("id", ""))
+            edited_at = parse_datetime(str(entry.get("edited_at") or ""))
+            records.append(
+                MessageEditHistory(
+                    content_type=content_type,
+                    object_id=message_id,
+                    previous_content=entry.get("previous_content") or "",
+                    edited_at=edited_at or timestamp,
+                    edited_by_id=int(editor)
+                    if editor.isdigit() and int(editor) in user_ids
+                    else None,
+                )
+            )
+    MessageEditHistory.objects.bulk_create(records, batch_size=1000)
+
+
+def restore_edit_history(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    MessageEditHistory = apps.get_model("messaging", "MessageEditHistory")
+    OneToOneMessage = apps.get_model("messaging", "OneToOneMessage")
+
+    content_type = ContentType.objects.filter(
+        app_label="messaging", model="onetoonemessage"
+    ).first()
+    if content_type is None:
+        return
+    records = MessageEditHistory.objects.filter(content_type=content_type)
+    by_message = {}
+    rows = records.order_by("edited_at", "id").values_list(
+        "object_id",
+        "previous_content",
+        "edited_at",
+        "edited_by_id",
+        "edited_by__username",
+    )
+    for message_id, previous_content, edited_at, user_id, username in rows.iterator():
+        by_message.setdefault(message_id, []).append(
+            {
+                "previous_content": previous_content,
+                "edited_at": edited_at.isoformat(),
+                "edited_by": {
+                    "id": str(user_id) if user_id else None,
+                    "username": username or "Unknown",
+                },
+            }
+        )
+    for message_id, entries in by_message.items():
+        OneToOneMessage.objects.filter(id=message_id).update(edit_history=entries)
+    records.delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("messaging", "0011_message_reaction"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="messageedithistory",
+            name="edited_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RemoveIndex(
+            model_name="messageedithistory",
+            name="messaging_m_content_caeab6_idx",
+        ),
+        migrations.AddIndex(
+            model_name="messageedithistory",
+            index=models.Index(
+                fields=["content_type", "object_id", "-edited_at"],
+                name="messaging_m_content_91716b_idx",
+            ),
+        ),
+        migrations.RunPython(copy_edit_history, restore_edit_history),
+        migrations.RemoveField(
+            model_name="onetoonemessage",
+            name="edit_history",
+        ),
+    ]
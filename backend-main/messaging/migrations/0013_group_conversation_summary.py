@@ -0,0 +1,91 @@
+# Generated by Django 4.2.14 on 2026-10-17 04:36
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_group_summaries(apps, schema_editor):
+    """Compute participant_count and the last message of existing groups"""
+    GroupConversation = apps.get_model("messaging", "GroupConversation")
+    GroupMessage = apps.get_model("messaging", "GroupMessage")
+    Participant = GroupConversation.participants.through
+
+    count = (
+        Participant.objects.filter(groupconversation_id=OuterRef("pk"))
+        .values("groupconversation_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    GroupConversation.objects.update(
+        participant_count=Coalesce(Subquery(count), Value(0))
+    )
+
+    groups = []
+    latest_messages = (
+        GroupMessage.objects.select_related("sender")
+        .order_by("conversation_id", "-timestamp", "-id")
+        .distinct("conversation_id")
+    )
+    for message in latest_messages.iterator():
+        sender = message.sender
+        name = ""
+        if sender is not None:
+            full_name = f"{sender.first_name or ''} {sender.last_name or ''}".strip()
+            name = full_name or sender.username
+        content = message.content
+        groups.append(
+            GroupConversation(
+                pk=message.conversation_id,
+                last_message_id=message.id,
+                last_message_preview=content[:100]
+                + ("..." if len(content) > 100 else ""),
+                last_message_sender_name=name,
+                last_message_at=message.timestamp,
+            )
+        )
+    GroupConversation.objects.bulk_update(
+        groups,
+        [
+            "last_message_id",
+            "last_message_preview",
+            "last_message_sender_name",
+            "last_message_at",
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0012_unified_edit_history"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="groupconversation",
+            name="last_message_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="groupconversation",
+            name="last_message_id",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="groupconversation",
+            name="last_message_preview",
+            field=models.CharField(blank=True, default="", max_length=103),
+        ),
+        migrations.AddField(
+            model_name="groupconversation",
+            name="last_message_sender_name",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="groupconversation",
+            name="participant_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_group_summaries, migrations.RunPython.noop),
+    ]
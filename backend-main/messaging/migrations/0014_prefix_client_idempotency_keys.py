@@ -0,0 +1,37 @@
+# Generated by Django 4.2.14 on 2026-10-17 05:10
+
+from django.db import migrations
+from django.db.models import Value
+from django.db.models.functions import Concat, Length
+
+PREFIX = "client:"
+MAX_LENGTH = 100
+
+
+def prefix_client_keys(apps, schema_editor):
+    """
+    Move stored client keys into their own namespace so they cannot collide
+    with the `reply-<id>` keys of bot replies. Keys too long for the prefix
+    are dropped; they only guarded retries of long-finished requests.
+    """
+    ChatbotMessage = apps.get_model("messaging", "ChatbotMessage")
+    client_keys = (
+        ChatbotMessage.objects.filter(is_bot=False, idempotency_key__isnull=False)
+        .exclude(idempotency_key__startswith=PREFIX)
+        .annotate(key_length=Length("idempotency_key"))
+    )
+    client_keys.filter(key_length__gt=MAX_LENGTH - len(PREFIX)).update(
+        idempotency_key=None
+    )
+    client_keys.update(idempotency_key=Concat(Value(PREFIX), "idempotency_key"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0013_group_conversation_summary"),
+    ]
+
+    operations = [
+        # Prefixed keys are harmless to older code, which just stops matching them
+        migrations.RunPython(prefix_client_keys, migrations.RunPython.noop),
+    ]
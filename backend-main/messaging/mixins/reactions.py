@@ -6,6 +6,8 @@ from django.http import Http404
 from drf_spectacular.utils import extend_schema
 import logging
 
+from ..services.reactions import reaction_service
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,7 +16,7 @@ class ReactionMixin:
 
     @extend_schema(
         summary="Add Reaction",
-        description="Add or update a reaction to a message. Valid reactions include: like, heart, smile, thumbsup.",
+        description="Add a reaction to a message. Valid reactions include: like, heart, smile, thumbsup. Adding the same reaction twice has no effect.",
         request={
             "type": "object",
             "properties": {"reaction": {"type": "string", "example": "like"}},
@@ -27,6 +29,7 @@ class ReactionMixin:
                     "status": {"type": "string"},
                     "message": {"type": "string"},
                     "reactions": {"type": "object"},
+                    "counts": {"type": "object"},
                 },
             },
             400: {"description": "Bad Request"},
@@ -55,7 +58,7 @@ class ReactionMixin:
                 )
 
             # Validate reaction type
-            valid_reactions = {"like", "heart", "smile", "thumbsup"}
+            valid_reactions = reaction_service.valid_reactions
             if reaction_type not in valid_reactions:
                 return Response(
                     {
@@ -64,28 +67,14 @@ class ReactionMixin:
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Initialize reactions dict if needed
-            if not message.reactions:
-                message.reactions = {}
-            if reaction_type not in message.reactions:
-                message.reactions[reaction_type] = []
-
-            # Store user ID as string for JSON serialization (consistent format)
-            user_id = str(request.user.id)
-            if user_id not in message.reactions[reaction_type]:
-                # Store reference to last reactor for signal notification
-                message._last_reactor = request.user
-                message.last_reaction_type = reaction_type
-
-                # Add user to reaction list
-                message.reactions[reaction_type].append(user_id)
-                message.save()
+            # Single INSERT ... ON CONFLICT DO NOTHING; the message row is untouched
+            reaction_service.add(message, request.user, reaction_type)
 
             return Response(
                 {
                     "status": "success",
                     "message": f"Added reaction {reaction_type}",
-                    "reactions": message.reactions,
+                    **reaction_service.summary(message),
                 }
             )
 
@@ -111,6 +100,7 @@ class ReactionMixin:
                     "status": {"type": "string"},
                     "message": {"type": "string"},
                     "reactions": {"type": "object"},
+                    "counts": {"type": "object"},
                 },
             },
             400: {"description": "Bad Request"},
@@ -138,26 +128,17 @@ class ReactionMixin:
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            if not message.reactions or reaction_type not in message.reactions:
+            if not reaction_service.remove(message, request.user, reaction_type):
                 return Response(
                     {"error": "No reactions to remove"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Remove user from reaction type - ensure consistent ID format
-            user_id = str(request.user.id)
-            if user_id in message.reactions[reaction_type]:
-                message.reactions[reaction_type].remove(user_id)
-                # Clean up empty reaction types
-                if not message.reactions[reaction_type]:
-                    del message.reactions[reaction_type]
-                message.save()
-
             return Response(
                 {
                     "status": "success",
                     "message": "Reaction removed",
-                    "reactions": message.reactions,
+                    **reaction_service.summary(message),
                 }
             )
 
@@ -192,7 +173,7 @@ class ReactionMixin:
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-            return Response(message.reactions or {})
+            return Response(reaction_service.summary(message)["reactions"])
 
         except Exception as e:
             logger.error(f"Error fetching reactions: {str(e)}", exc_info=True)
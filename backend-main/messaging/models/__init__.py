@@ -7,6 +7,8 @@ from .one_to_one import (
     OneToOneMessage,
     OneToOneConversationParticipant,
 )
+from .reaction import MessageReaction
+from .read_state import ConversationReadState
 
 __all__ = [
     "BaseConversation",
@@ -19,4 +21,6 @@ __all__ = [
     "OneToOneConversation",
     "OneToOneMessage",
     "OneToOneConversationParticipant",
+    "MessageReaction",
+    "ConversationReadState",
 ]
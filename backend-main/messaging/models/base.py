@@ -1,8 +1,10 @@
 # messaging/models/base.py
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
-from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 import logging
@@ -21,6 +23,9 @@ class BaseConversation(models.Model):
     last_activity = models.DateTimeField(auto_now=True)
     archived = models.BooleanField(default=False)
     archive_date = models.DateTimeField(null=True, blank=True)
+    message_count = models.PositiveIntegerField(
+        default=0, help_text="Maintained count of messages, used for page totals"
+    )
 
     class Meta:
         abstract = True
@@ -58,7 +63,10 @@ class BaseMessage(models.Model):
     read_by = models.ManyToManyField(
         settings.AUTH_USER_MODEL, related_name="%(class)s_read_messages", blank=True
     )
-    reactions = models.JSONField(default=dict)
+    # Reactions live in MessageReaction; deleting a message removes them
+    message_reactions = GenericRelation(
+        "messaging.MessageReaction", related_query_name="%(class)s"
+    )
 
     # Edit tracking fields
     edited = models.BooleanField(default=False)
@@ -95,15 +103,35 @@ class BaseMessage(models.Model):
         default=dict, help_text="Store additional message metadata"
     )
 
+    # Full-text index of content, maintained by a database trigger
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         abstract = True
         ordering = ["-timestamp"]
         indexes = [
+            GinIndex(fields=["search_vector"]),
             models.Index(fields=["-timestamp"]),
+            # Keyset pagination of a conversation's timeline
+            models.Index(fields=["conversation", "-timestamp", "-id"]),
             models.Index(fields=["sender", "-timestamp"]),
             models.Index(fields=["message_type", "-timestamp"]),
         ]
 
+    def save(self, *args, **kwargs):
+        """
+        Existing messages only write the fields changed since they were
+        loaded; saving an unchanged message issues no query. Concrete
+        message models declare the `tracker` (FieldTracker is not inherited
+        from abstract models).
+        """
+        if not self._state.adding and not args and "update_fields" not in kwargs:
+            changed = self.tracker.changed()
+            if not changed:
+                return
+            kwargs["update_fields"] = list(changed)
+        super().save(*args, **kwargs)
+
     def soft_delete(self, deleted_by_user):
         """Soft delete a message"""
         try:
@@ -121,12 +149,9 @@ class BaseMessage(models.Model):
     def edit_message(self, new_content: str, edited_by_user):
         """Edit message content with version tracking"""
         try:
-            MessageEditHistory.objects.create(
-                content_type=ContentType.objects.get_for_model(self),
-                object_id=self.id,
-                previous_content=self.content,
-                edited_by=edited_by_user,
-            )
+            from ..services.edit_history import edit_history_service
+
+            edit_history_service.record(self, self.content, edited_by_user)
             self.content = new_content
             self.edited = True
             self.edited_at = timezone.now()
@@ -138,49 +163,16 @@ class BaseMessage(models.Model):
             return False
 
     def add_reaction(self, user, reaction_type: str):
-        """Add a reaction to the message"""
-        if not self.reactions:
-            self.reactions = {}
-
-        if reaction_type not in self.reactions:
-            self.reactions[reaction_type] = []
-
-        if user.id not in self.reactions[reaction_type]:
-            self.reactions[reaction_type].append(user.id)
-            self.save()
+        """Add a reaction to the message; returns whether it is new"""
+        from ..services.reactions import reaction_service
 
-    def remove_reaction(self, user):
-        """Remove all reactions by a user"""
-        if not self.reactions:
-            return
+        return reaction_service.add(self, user, reaction_type)
 
-        for reaction_type, users in list(self.reactions.items()):
-            if user.id in users:
-                users.remove(user.id)
-                if not users:  # Remove empty reaction types
-                    del self.reactions[reaction_type]
-
-        self.save()
-
-    @property
-    def reactions_changed(self):
-        """Check if reactions have changed since load"""
-        return hasattr(self, "_reactions_changed") and self._reactions_changed
-
-    @property
-    def last_reactor(self):
-        """Get the last user who reacted"""
-        return getattr(self, "_last_reactor", None)
-
-    @property
-    def last_reaction_type(self):
-        """Get the type of the last reaction"""
-        return getattr(self, "_last_reaction_type", None)
+    def remove_reaction(self, user, reaction_type: str = None):
+        """Remove a user's reaction (all of them without a type)"""
+        from ..services.reactions import reaction_service
 
-    @last_reaction_type.setter
-    def last_reaction_type(self, value):
-        """Set the type of the last reaction"""
-        self._last_reaction_type = value
+        return reaction_service.remove(self, user, reaction_type)
 
 
 class MessageEditHistory(models.Model):
@@ -193,7 +185,7 @@ class MessageEditHistory(models.Model):
 
     # Edit history fields
     previous_content = models.TextField(help_text="The content before this edit")
-    edited_at = models.DateTimeField(auto_now_add=True)
+    edited_at = models.DateTimeField(default=timezone.now)
     edited_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -206,7 +198,8 @@ class MessageEditHistory(models.Model):
         verbose_name_plural = "Message Edit Histories"
         ordering = ["-edited_at"]
         indexes = [
-            models.Index(fields=["content_type", "object_id"]),
+            # A message's history, newest first
+            models.Index(fields=["content_type", "object_id", "-edited_at"]),
             models.Index(fields=["edited_at"]),
         ]
 
@@ -2,6 +2,7 @@
 from django.db import models
 from django.conf import settings
 from .base import BaseConversation, BaseMessage
+from model_utils import FieldTracker
 
 
 class ChatbotConversation(BaseConversation):
@@ -10,7 +11,15 @@ class ChatbotConversation(BaseConversation):
         on_delete=models.CASCADE,
         related_name="chatbot_conversation",
     )
-    # ... other fields as needed ...
+    # Rolling summary of the turns that no longer fit in the prompt window
+    summary = models.TextField(blank=True, default="")
+    summarized_until = models.ForeignKey(
+        "ChatbotMessage",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
 
 
 class ChatbotMessage(BaseMessage):
@@ -27,3 +36,17 @@ class ChatbotMessage(BaseMessage):
         blank=True,
         related_name="chatbot_sent_messages",
     )
+    # Client-supplied for user messages, "reply-<message id>" for bot replies
+    idempotency_key = models.CharField(max_length=100, null=True, blank=True)
+
+    # Values as loaded, so saves and signal handlers know what changed
+    tracker = FieldTracker()
+
+    class Meta(BaseMessage.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=["conversation", "idempotency_key"],
+                condition=models.Q(idempotency_key__isnull=False),
+                name="unique_chatbot_message_idempotency_key",
+            )
+        ]
@@ -2,6 +2,7 @@
 from django.db import models
 from django.conf import settings
 from .base import BaseConversation, BaseMessage
+from model_utils import FieldTracker
 
 
 class GroupConversation(BaseConversation):
@@ -12,6 +13,14 @@ class GroupConversation(BaseConversation):
     )
     is_private = models.BooleanField(default=True)
 
+    # Summary kept by the messaging pipeline (GroupSummaryService), so the
+    # group list needs no aggregates or per-group message lookups
+    participant_count = models.PositiveIntegerField(default=0)
+    last_message_id = models.PositiveBigIntegerField(null=True, blank=True)
+    last_message_preview = models.CharField(max_length=103, blank=True, default="")
+    last_message_sender_name = models.CharField(max_length=255, blank=True, default="")
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         return self.name
 
@@ -24,5 +33,8 @@ class GroupMessage(BaseMessage):
         max_length=10, choices=[("text", "Text"), ("system", "System")], default="text"
     )
 
+    # Values as loaded, so saves and signal handlers know what changed
+    tracker = FieldTracker()
+
     def __str__(self):
         return f"Message by {self.sender} in {self.conversation}"
@@ -5,7 +5,7 @@ from django.conf import settings
 from django.dispatch import receiver
 from django.db.models.signals import m2m_changed
 from .base import BaseConversation, BaseMessage
-from django.contrib.postgres.fields import ArrayField
+from model_utils import FieldTracker
 
 
 class OneToOneConversationParticipant(models.Model):
@@ -51,9 +51,6 @@ class OneToOneMessage(BaseMessage):
     conversation = models.ForeignKey(
         OneToOneConversation, on_delete=models.CASCADE, related_name="messages"
     )
-    edit_history = ArrayField(
-        models.JSONField(),
-        default=list,
-        blank=True,
-        help_text="History of message edits",
-    )
+
+    # Values as loaded, so saves and signal handlers know what changed
+    tracker = FieldTracker()
@@ -0,0 +1,46 @@
+# messaging/models/reaction.py
+from django.db import models
+from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+
+REACTION_TYPES = ("like", "heart", "smile", "thumbsup")
+
+
+class MessageReaction(models.Model):
+    """
+    One user's reaction to a message. Adding or removing a reaction is a
+    single INSERT or DELETE on this table; the message row and its signals
+    are never touched, so concurrent reactions cannot overwrite each other.
+    """
+
+    # Generic Foreign Key to the message (one-to-one or group)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    message = GenericForeignKey("content_type", "object_id")
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="message_reactions",
+    )
+    reaction_type = models.CharField(
+        max_length=20, choices=[(reaction, reaction) for reaction in REACTION_TYPES]
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Message Reaction"
+        verbose_name_plural = "Message Reactions"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id", "user", "reaction_type"],
+                name="unique_message_reaction",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["content_type", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.reaction_type} {self.content_type.model} {self.object_id}"
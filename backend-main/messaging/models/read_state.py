@@ -0,0 +1,48 @@
+# messaging/models/read_state.py
+from django.db import models
+from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+
+
+class ConversationReadState(models.Model):
+    """
+    Denormalized read state of a user in a conversation: a watermark on the
+    last message read plus a maintained counter of unread messages, so unread
+    counts never have to be aggregated over the read_by join table.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="conversation_read_states",
+    )
+
+    # Generic Foreign Key to the conversation (one-to-one or group)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    conversation = GenericForeignKey("content_type", "object_id")
+
+    # Read watermark
+    last_read_message_id = models.PositiveBigIntegerField(null=True, blank=True)
+    last_read_at = models.DateTimeField(
+        null=True, blank=True, help_text="Timestamp of the last message read"
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Conversation Read State"
+        verbose_name_plural = "Conversation Read States"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "content_type", "object_id"],
+                name="unique_conversation_read_state",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["content_type", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.content_type.model} {self.object_id}: {self.unread_count} unread"
@@ -0,0 +1,265 @@
+# messaging/outbound.py
+import asyncio
+import itertools
+import json
+import os
+import socket
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+from django.conf import settings
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("frames", "batches", "compacted", "dropped", "resyncs")
+
+
+def _settings():
+    return getattr(settings, "WEBSOCKET_OUTBOUND_SETTINGS", {})
+
+
+def _slot_key(slot):
+    return f"websocket_outbound_stats_{slot}"
+
+
+class OutboundMetrics:
+    """
+    Queue depth and throughput of the outbound websocket queues of this
+    process. Counters live in memory. Every PUBLISH_INTERVAL seconds a
+    snapshot is written to the cache from a worker thread, so the event
+    loop never waits on the cache, and `websocket_queue_stats` aggregates
+    all processes.
+
+    Each process publishes under its own slot key (one of MAX_PROCESSES),
+    claimed atomically with cache.add and expiring with the process, so
+    processes never overwrite each other's registration.
+    """
+
+    def __init__(self):
+        outbound_settings = _settings()
+        self.process_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.publish_interval = outbound_settings.get("PUBLISH_INTERVAL", 10)
+        self.max_processes = outbound_settings.get("MAX_PROCESSES", 256)
+        self.counters = dict.fromkeys(METRICS, 0)
+        self.depths = {}
+        self.max_depth = 0
+        self._published_at = 0
+        self._publishing = False
+        self._slot = None
+
+    def record(self, metric, count=1):
+        self.counters[metric] += count
+
+    def track_depth(self, queue_id, depth):
+        if depth:
+            self.depths[queue_id] = depth
+            self.max_depth = max(self.max_depth, depth)
+        else:
+            self.depths.pop(queue_id, None)
+
+    def snapshot(self):
+        return {
+            **self.counters,
+            "sockets_queued": len(self.depths),
+            "queued": sum(self.depths.values()),
+            "max_depth": self.max_depth,
+        }
+
+    def maybe_publish(self):
+        """Start publishing a snapshot in a worker thread when one is due"""
+        now = time.monotonic()
+        if self._publishing or now - self._published_at < self.publish_interval:
+            return
+        self._published_at = now
+        self._publishing = True
+        future = asyncio.get_running_loop().run_in_executor(
+            None, self.publish, self.snapshot()
+        )
+        future.add_done_callback(lambda _: setattr(self, "_publishing", False))
+
+    def publish(self, snapshot):
+        timeout = self.publish_interval * 3
+        value = {"process": self.process_id, **snapshot}
+        try:
+            if self._slot is not None:
+                key = _slot_key(self._slot)
+                owner = cache.get(key)
+                if owner and owner.get("process") == self.process_id:
+                    cache.set(key, value, timeout=timeout)
+                    return
+                if owner is None and cache.add(key, value, timeout=timeout):
+                    return
+            for slot in range(self.max_processes):
+                if cache.add(_slot_key(slot), value, timeout=timeout):
+                    self._slot = slot
+                    return
+            logger.warning("No free slot to publish websocket queue metrics")
+        except Exception as e:
+            logger.debug(f"Could not publish websocket queue metrics: {e}")
+
+
+def outbound_stats():
+    """Per-process snapshots and totals of every process that published lately"""
+    max_processes = _settings().get("MAX_PROCESSES", 256)
+    found = cache.get_many([_slot_key(slot) for slot in range(max_processes)])
+    snapshots = {}
+    for value in found.values():
+        snapshot = dict(value)
+        snapshots[snapshot.pop("process")] = snapshot
+
+    totals = dict.fromkeys((*METRICS, "sockets_queued", "queued"), 0)
+    totals["max_depth"] = 0
+    for snapshot in snapshots.values():
+        for metric in totals:
+            if metric == "max_depth":
+                totals[metric] = max(totals[metric], snapshot.get(metric, 0))
+            else:
+                totals[metric] += snapshot.get(metric, 0)
+    return {"totals": totals, "processes": snapshots}
+
+
+outbound_metrics = OutboundMetrics()
+_queue_ids = itertools.count()
+
+
+class OutboundQueueMixin:
+    """
+    Per-socket outbound queue for websocket consumers.
+
+    Handlers call `enqueue(frame)` instead of sending, so dispatching group
+    events never waits for a slow client. A writer task sends what has
+    accumulated every BATCH_WINDOW_MS:
+
+    - frames with a `compact_key` (typing, presence, read receipts of one
+      user) replace the queued frame with the same key, so only the latest
+      state is sent;
+    - the queue holds at most MAX_QUEUE_SIZE frames. Compactable frames are
+      dropped first; if real events have to be dropped the client gets a
+      `resync` frame and should refetch;
+    - clients that connect with `?batch=1` receive several frames as one
+      {"type": "batch", "events": [...]} frame, others get them one by one.
+    """
+
+    def init_outbound_queue(self):
+        outbound_settings = _settings()
+        self.batch_window = outbound_settings.get("BATCH_WINDOW_MS", 25) / 1000
+        self.max_queue_size = outbound_settings.get("MAX_QUEUE_SIZE", 200)
+        self.max_batch_size = outbound_settings.get("MAX_BATCH_SIZE", 50)
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        self.batch_frames = query.get("batch", ["0"])[0] in ("1", "true")
+
+        self._outbound = OrderedDict()
+        self._droppable = set()
+        self._outbound_ids = itertools.count()
+        self._outbound_id = next(_queue_ids)
+        self._outbound_ready = asyncio.Event()
+        self._outbound_overflowed = False
+        self._writer = asyncio.create_task(self._write_outbound())
+
+    async def close_outbound_queue(self):
+        writer = getattr(self, "_writer", None)
+        if writer is None:
+            return
+        writer.cancel()
+        try:
+            await writer
+        except asyncio.CancelledError:
+            pass
+        self._outbound.clear()
+        self._droppable.clear()
+        outbound_metrics.track_depth(self._outbound_id, 0)
+
+    def enqueue(self, frame, compact_key=None, merge=None, droppable=None):
+        """
+        Queue a frame for the client without waiting for the socket. A queued
+        frame with the same compact_key is replaced, or combined with the new
+        one by `merge(old, new)`, and keeps its place in the queue so it is
+        never sent after frames queued later. Compacted frames are droppable
+        when the queue is full unless droppable=False.
+        """
+        if getattr(self, "_writer", None) is None:
+            return
+
+        if compact_key is not None and compact_key in self._outbound:
+            previous = self._outbound[compact_key]
+            if merge is not None:
+                frame = merge(previous, frame)
+            outbound_metrics.record("compacted")
+        elif len(self._outbound) >= self.max_queue_size:
+            self._drop_one()
+
+        key = compact_key if compact_key is not None else next(self._outbound_ids)
+        self._outbound[key] = frame
+        if droppable if droppable is not None else compact_key is not None:
+            self._droppable.add(key)
+        else:
+            self._droppable.discard(key)
+        outbound_metrics.track_depth(self._outbound_id, len(self._outbound))
+        self._outbound_ready.set()
+
+    def _drop_one(self):
+        # Stale ephemeral state first, then the oldest event
+        for key in self._outbound:
+            if key in self._droppable:
+                del self._outbound[key]
+                self._droppable.discard(key)
+                break
+        else:
+            key, _ = self._outbound.popitem(last=False)
+            self._droppable.discard(key)
+            self._outbound_overflowed = True
+        outbound_metrics.record("dropped")
+
+    async def _write_outbound(self):
+        try:
+            while True:
+                await self._outbound_ready.wait()
+                # Let a burst accumulate into one batch
+                await asyncio.sleep(self.batch_window)
+                self._outbound_ready.clear()
+
+                frames = []
+                if self._outbound_overflowed:
+                    self._outbound_overflowed = False
+                    frames.append({"type": "resync"})
+                    outbound_metrics.record("resyncs")
+                while self._outbound and len(frames) < self.max_batch_size:
+                    key, frame = self._outbound.popitem(last=False)
+                    self._droppable.discard(key)
+                    frames.append(frame)
+                if self._outbound:
+                    self._outbound_ready.set()
+                outbound_metrics.track_depth(self._outbound_id, len(self._outbound))
+
+                await self._send_frames(frames)
+                outbound_metrics.maybe_publish()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Without a writer the socket would never get another frame;
+            # close it so the client reconnects and resyncs
+            logger.error(
+                f"Error writing websocket frames, closing the connection: {str(e)}",
+                exc_info=True,
+            )
+            self._writer = None
+            self._outbound.clear()
+            self._droppable.clear()
+            outbound_metrics.track_depth(self._outbound_id, 0)
+            try:
+                await self.close(code=1011)
+            except Exception as close_error:
+                logger.debug(f"Could not close websocket: {close_error}")
+
+    async def _send_frames(self, frames):
+        if not frames:
+            return
+        outbound_metrics.record("frames", len(frames))
+        if self.batch_frames and len(frames) > 1:
+            outbound_metrics.record("batches")
+            await self.send(text_data=json.dumps({"type": "batch", "events": frames}))
+            return
+        for frame in frames:
+            await self.send(text_data=json.dumps(frame))
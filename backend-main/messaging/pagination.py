@@ -1,27 +1,247 @@
 # messaging/pagination.py
-from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from cryptography.fernet import Fernet
 from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+import binascii
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class MessagePagination(CursorPagination):
+def estimated_row_count(model):
+    """Planner estimate of a table's row count from pg_class, or None"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+    except Exception as e:
+        logger.error(f"Error estimating row count: {str(e)}")
+        return None
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    if not row or row[0] < 0:
+        return None
+    return row[0]
+
+
+def page_number_params(request, page_size=20, max_page_size=50):
+    """(page, page_size) from ?page= and ?page_size=, falling back to defaults"""
+    try:
+        page = max(int(request.query_params.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    try:
+        page_size = int(request.query_params.get("page_size", page_size))
+    except ValueError:
+        pass
+    return page, min(max(page_size, 1), max_page_size)
+
+
+class KeysetPaginator:
+    """
+    Keyset pagination over (timestamp, id), newest first.
+
+    Cursors are opaque tokens embedding the timestamp and id of the boundary
+    row, so every page is a single index-range query: no OFFSET, no lookup of
+    the boundary message and no COUNT. One extra row is fetched to tell
+    whether another page exists.
+    """
+
+    OLDER = "o"
+    NEWER = "n"
+
+    def __init__(self, page_size, timestamp_field="timestamp"):
+        self.page_size = page_size
+        self.timestamp_field = timestamp_field
+
+    def encode_cursor(self, item, direction):
+        """Opaque cursor pointing past `item` in the given direction"""
+        payload = {
+            "d": direction,
+            "t": getattr(item, self.timestamp_field).isoformat(),
+            "i": item.pk,
+        }
+        return urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode()
+        ).decode()
+
+    def decode_cursor(self, cursor):
+        """Return (direction, timestamp, pk) or raise NotFound"""
+        try:
+            payload = json.loads(urlsafe_b64decode(cursor.encode()))
+            direction = payload["d"]
+            timestamp = datetime.fromisoformat(payload["t"])
+            pk = int(payload["i"])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound("Invalid cursor")
+
+        if direction not in (self.OLDER, self.NEWER):
+            raise NotFound("Invalid cursor")
+        return direction, timestamp, pk
+
+    def paginate(self, queryset, cursor=None):
+        """
+        Return (items, next_cursor, previous_cursor). Items are newest first;
+        next_cursor walks towards older rows and previous_cursor towards
+        newer ones. Either is None when there is nothing more that way.
+        """
+        field = self.timestamp_field
+        direction = self.OLDER
+        if cursor:
+            direction, timestamp, pk = self.decode_cursor(cursor)
+
+        if direction == self.OLDER:
+            if cursor:
+                queryset = queryset.filter(
+                    Q(**{f"{field}__lt": timestamp})
+                    | Q(**{field: timestamp, "pk__lt": pk})
+                )
+            rows = list(queryset.order_by(f"-{field}", "-pk")[: self.page_size + 1])
+            items = rows[: self.page_size]
+            has_older = len(rows) > self.page_size
+            has_newer = bool(cursor)
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{field}__gt": timestamp}) | Q(**{field: timestamp, "pk__gt": pk})
+            )
+            rows = list(queryset.order_by(field, "pk")[: self.page_size + 1])
+            items = rows[: self.page_size][::-1]
+            has_older = True
+            has_newer = len(rows) > self.page_size
+
+        next_cursor = (
+            self.encode_cursor(items[-1], self.OLDER) if items and has_older else None
+        )
+        previous_cursor = (
+            self.encode_cursor(items[0], self.NEWER) if items and has_newer else None
+        )
+        return items, next_cursor, previous_cursor
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Count-free keyset cursor pagination, newest first.
+
+    Pages never run COUNT(*). The reported total is approximate by default:
+    a value preset on `approximate_count` by the caller, the view's
+    `get_approximate_count(queryset)` (typically a maintained per-conversation
+    message counter) or, for unfiltered querysets, the pg_class estimate.
+    Clients opt in to an exact count with `?count=exact`.
+    """
+
+    page_size = 50
+    timestamp_field = "timestamp"
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    count_query_param = "count"
+    approximate_count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.view = view
+        self.queryset = queryset
+        paginator = KeysetPaginator(self.get_page_size(request), self.timestamp_field)
+        self.page, self.next_cursor, self.previous_cursor = paginator.paginate(
+            queryset, request.query_params.get(self.cursor_query_param)
+        )
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor,
+        )
+
+    def get_previous_link(self):
+        if not self.previous_cursor:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.previous_cursor,
+        )
+
+    def get_count(self):
+        """Return (total, is_exact); total is None when no estimate is available"""
+        if self.request.query_params.get(self.count_query_param) == "exact":
+            return self.queryset.count(), True
+        return self.get_approximate_count(), False
+
+    def get_approximate_count(self):
+        if self.approximate_count is not None:
+            return self.approximate_count
+
+        get_approximate_count = getattr(self.view, "get_approximate_count", None)
+        if get_approximate_count:
+            return get_approximate_count(self.queryset)
+
+        if not self.queryset.query.where:
+            return estimated_row_count(self.queryset.model)
+        return None
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque pagination cursor",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Pass 'exact' to count all results instead of estimating",
+                "schema": {"type": "string", "enum": ["exact"]},
+            },
+        ]
+
+
+class MessagePagination(KeysetCursorPagination):
     """Base cursor pagination for messages"""
 
     page_size = 20
-    ordering = "-timestamp"
-    cursor_query_param = "cursor"
 
     def get_paginated_response(self, data):
+        count, count_is_exact = self.get_count()
         return Response(
             {
                 "next": self.get_next_link(),
                 "previous": self.get_previous_link(),
                 "results": data,
-                "total_count": self.page.paginator.count,
+                "total_count": count,
+                "count_is_exact": count_is_exact,
             }
         )
 
@@ -58,55 +278,26 @@ class EncryptedMessagePagination(MessagePagination):
             return ""
 
 
-class CustomMessagePagination(CursorPagination):
+class CustomMessagePagination(KeysetCursorPagination):
     """Custom cursor pagination for messages"""
 
-    page_size = 50
-    ordering = "-timestamp"
-    cursor_query_param = "cursor"
-    page_size_query_param = "page_size"
-    max_page_size = 100
-
     def get_paginated_response(self, data):
-        count = 0
-        # Handle case where self.page is a list without paginator
-        if hasattr(self, "page"):
-            if hasattr(self.page, "paginator"):
-                count = self.page.paginator.count
-            elif isinstance(self.page, list):
-                count = len(self.page)
-
+        count, count_is_exact = self.get_count()
         return Response(
             {
                 "next": self.get_next_link(),
                 "previous": self.get_previous_link(),
                 "count": count,
+                "count_is_exact": count_is_exact,
                 "results": data,
                 "next_cursor": self.get_next_cursor(),
+                "previous_cursor": self.previous_cursor,
+                "has_more": self.next_cursor is not None,
             }
         )
 
     def get_next_cursor(self):
-        try:
-            if (
-                hasattr(self, "page")
-                and self.page
-                and hasattr(self.page, "has_next")
-                and self.page.has_next
-            ):
-                last_item = self.page[-1]
-                return str(last_item.id)
-            elif (
-                isinstance(getattr(self, "page", None), list)
-                and len(self.page) >= self.page_size
-            ):
-                # If we have exactly page_size items, there might be more
-                last_item = self.page[-1]
-                return str(last_item.id)
-            return None
-        except Exception as e:
-            logger.error(f"Error getting next cursor: {str(e)}")
-            return None
+        return self.next_cursor
 
     def get_paginated_response_schema(self, schema):
         return {
@@ -114,8 +305,11 @@ class CustomMessagePagination(CursorPagination):
             "properties": {
                 "next": {"type": "string", "format": "uri", "nullable": True},
                 "previous": {"type": "string", "format": "uri", "nullable": True},
-                "count": {"type": "integer"},
+                "count": {"type": "integer", "nullable": True},
+                "count_is_exact": {"type": "boolean"},
                 "results": schema,
                 "next_cursor": {"type": "string", "nullable": True},
+                "previous_cursor": {"type": "string", "nullable": True},
+                "has_more": {"type": "boolean"},
             },
         }
@@ -2,6 +2,8 @@
 from rest_framework.permissions import BasePermission
 import logging
 
+from .services.membership import membership_service
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,7 +48,7 @@ class IsParticipant(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         try:
-            return request.user in obj.participants.all()
+            return membership_service.is_participant(request.user.id, obj)
         except Exception as e:
             logger.error(f"Error checking participant permission: {str(e)}")
             return False
@@ -127,20 +129,19 @@ class IsParticipantOrModerator(permissions.BasePermission):
         else:
             conversation = obj
 
-        # Check if user is a participant
+        # Check if user is a participant (membership index, no query)
         try:
-            user_is_participant = conversation.participants.filter(
-                id=request.user.id
-            ).exists()
+            user_is_participant = membership_service.is_participant(
+                request.user.id, conversation
+            )
         except Exception as e:
             logger.error(f"Error checking participant status: {str(e)}")
             user_is_participant = False
 
         # Check if user is a moderator (for group conversations)
         try:
-            user_is_moderator = (
-                hasattr(conversation, "moderators")
-                and conversation.moderators.filter(id=request.user.id).exists()
+            user_is_moderator = membership_service.is_moderator(
+                request.user.id, conversation
             )
         except Exception as e:
             logger.error(f"Error checking moderator status: {str(e)}")
@@ -152,7 +153,7 @@ class IsParticipantOrModerator(permissions.BasePermission):
 
         # For PUT/PATCH/DELETE, check if it's the message owner or a moderator
         if hasattr(obj, "sender") and request.method in ["PUT", "PATCH", "DELETE"]:
-            return obj.sender == request.user or user_is_moderator
+            return obj.sender_id == request.user.id or user_is_moderator
 
         # For conversation-level actions, check moderator status
         if hasattr(view, "action") and view.action in [
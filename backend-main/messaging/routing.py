@@ -3,6 +3,20 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
+    re_path(
+        r"^ws/messaging/dm/(?P<conversation_id>\d+)/$",
+        consumers.OneToOneConsumer.as_asgi(),
+    ),
+    re_path(
+        r"^ws/messaging/group/(?P<conversation_id>\d+)/$",
+        consumers.GroupConsumer.as_asgi(),
+    ),
+    re_path(
+        r"^ws/messaging/bot/(?P<conversation_id>\d+)/$",
+        consumers.ChatbotConsumer.as_asgi(),
+    ),
+    # Deprecated untyped route; the kind is resolved on connect and ids that
+    # match several conversation kinds of the user are rejected
     re_path(
         r"^ws/messaging/(?P<conversation_id>\w+)/$",
         consumers.ConversationConsumer.as_asgi(),
@@ -2,6 +2,7 @@
 from rest_framework import serializers
 from django.conf import settings
 from ..models.group import GroupConversation, GroupMessage
+from .reactions import ReactionListSerializer, ReactionsFieldMixin
 import logging
 
 logger = logging.getLogger(__name__)
@@ -59,32 +60,26 @@ class GroupConversationSerializer(serializers.ModelSerializer):
         return attrs
 
     def get_last_message(self, obj):
-        """Get latest message details"""
-        try:
-            message = obj.messages.order_by("-timestamp").first()
-            if not message:
-                return None
-
-            return {
-                "id": message.id,
-                "content": message.content[:100]
-                + ("..." if len(message.content) > 100 else ""),
-                "sender_name": message.sender.get_full_name()
-                or message.sender.username,
-                "timestamp": message.timestamp,
-            }
-        except Exception as e:
-            logger.error(f"Error getting last message: {str(e)}")
+        """Latest message, from the group's summary columns"""
+        if obj.last_message_id is None:
             return None
+        return {
+            "id": obj.last_message_id,
+            "content": obj.last_message_preview,
+            "sender_name": obj.last_message_sender_name,
+            "timestamp": obj.last_message_at,
+        }
 
 
-class GroupMessageSerializer(serializers.ModelSerializer):
+class GroupMessageSerializer(ReactionsFieldMixin, serializers.ModelSerializer):
     sender_name = serializers.CharField(source="sender.username", read_only=True)
+    reactions = serializers.SerializerMethodField(read_only=True)
     is_edited = serializers.BooleanField(read_only=True)
     edit_history = serializers.JSONField(read_only=True)
 
     class Meta:
         model = GroupMessage
+        list_serializer_class = ReactionListSerializer
         fields = [
             "id",
             "conversation",
@@ -166,23 +161,37 @@ class GroupMessageSerializer(serializers.ModelSerializer):
             logger.error(f"Message validation error: {str(e)}")
             raise serializers.ValidationError("Message validation failed")
 
-    def to_representation(self, instance):
-        """Override to convert non-serializable objects in reactions"""
-        representation = super().to_representation(instance)
-        reactions = representation.get("reactions")
-        if isinstance(reactions, dict):
-            safe_reactions = {}
-            for key, value in reactions.items():
-                # If value is a CustomUser instance, convert to its id
-                if hasattr(value, "id"):
-                    safe_reactions[key] = value.id
-                else:
-                    safe_reactions[key] = value
-            representation["reactions"] = safe_reactions
-        return representation
-
     def validate_message_type(self, value):
         allowed = ["text", "system"]
         if value not in allowed:
             raise serializers.ValidationError("Invalid message type for group.")
         return value
+
+
+class GroupTimelineMessageSerializer(ReactionsFieldMixin, serializers.ModelSerializer):
+    """
+    Compact, read-only timeline entry. Read state is a `read_count`
+    annotation, so the payload does not grow with the group.
+    """
+
+    sender_name = serializers.CharField(source="sender.username", read_only=True)
+    reactions = serializers.SerializerMethodField(read_only=True)
+    read_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = GroupMessage
+        list_serializer_class = ReactionListSerializer
+        fields = [
+            "id",
+            "sender",
+            "sender_name",
+            "content",
+            "message_type",
+            "timestamp",
+            "edited",
+            "edited_at",
+            "deleted",
+            "reactions",
+            "read_count",
+        ]
+        read_only_fields = fields
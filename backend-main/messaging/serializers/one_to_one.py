@@ -1,6 +1,8 @@
 # messaging/serializers/one_to_one.py
 from rest_framework import serializers
 from ..models.one_to_one import OneToOneConversation, OneToOneMessage
+from ..services.reactions import reaction_service
+from .reactions import ReactionListSerializer, ReactionsFieldMixin
 import logging
 from django.contrib.auth import get_user_model
 
@@ -74,7 +76,11 @@ class OneToOneConversationSerializer(serializers.ModelSerializer):
     def get_last_message(self, obj):
         """Get the last message in conversation"""
         try:
-            message = obj.messages.last()
+            # Use the message loaded by the inbox when available
+            if hasattr(obj, "latest_message"):
+                message = obj.latest_message
+            else:
+                message = obj.messages.last()
             if message:
                 return {
                     "content": message.content,
@@ -93,7 +99,7 @@ class OneToOneConversationSerializer(serializers.ModelSerializer):
             if not request:
                 return None
 
-            other_user = obj.participants.exclude(id=request.user.id).first()
+            other_user = self._get_other_user(obj, request.user)
             if not other_user:
                 return None
 
@@ -110,24 +116,31 @@ class OneToOneConversationSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         if not request:
             return None
-        other_user = obj.participants.exclude(id=request.user.id).first()
+        other_user = self._get_other_user(obj, request.user)
         if other_user:
             return other_user.get_full_name() or other_user.username
         return None
 
+    def _get_other_user(self, obj, user):
+        """Get the other participant, reusing data loaded by the inbox"""
+        if hasattr(obj, "other_participants"):
+            return next(iter(obj.other_participants), None)
+        return obj.participants.exclude(id=user.id).first()
 
-class OneToOneMessageSerializer(serializers.ModelSerializer):
+
+class OneToOneMessageSerializer(ReactionsFieldMixin, serializers.ModelSerializer):
     sender_name = serializers.CharField(source="sender.username", read_only=True)
     is_edited = serializers.BooleanField(read_only=True)
     message_type = serializers.CharField(required=False, default="text")
     read_by = serializers.PrimaryKeyRelatedField(
         many=True, queryset=get_user_model().objects.all(), required=False
     )
-    reactions = serializers.JSONField(required=False, allow_null=True, default=dict)
+    reactions = serializers.SerializerMethodField(read_only=True)
     formatted_reactions = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = OneToOneMessage
+        list_serializer_class = ReactionListSerializer
         fields = [
             "id",
             "content",
@@ -146,6 +159,7 @@ class OneToOneMessageSerializer(serializers.ModelSerializer):
             "timestamp",
             "sender_name",
             "is_edited",
+            "reactions",
             "formatted_reactions",
         ]
 
@@ -159,42 +173,9 @@ class OneToOneMessageSerializer(serializers.ModelSerializer):
 
         return value.strip()
 
-    def validate_reactions(self, value):
-        """Validate message reactions"""
-        if value is None:
-            return {}
-
-        if not isinstance(value, dict):
-            raise serializers.ValidationError("Reactions must be a dictionary")
-
-        # Validate reaction types and values
-        valid_reactions = {"like", "heart", "smile", "thumbsup"}
-
-        for reaction_type, user_ids in value.items():
-            # Check reaction type
-            if reaction_type not in valid_reactions:
-                raise serializers.ValidationError(
-                    f"Invalid reaction type: {reaction_type}"
-                )
-
-            # Check user IDs list format
-            if not isinstance(user_ids, list):
-                raise serializers.ValidationError(
-                    f"Reaction '{reaction_type}' must contain a list of user IDs"
-                )
-
-            # Validate each user ID is a string
-            for user_id in user_ids:
-                if not isinstance(user_id, str):
-                    raise serializers.ValidationError(
-                        f"User ID must be a string, got {type(user_id).__name__}"
-                    )
-
-        return value
-
     def validate_reaction(self, value):
         """Validate a single reaction"""
-        valid_reactions = {"like", "heart", "smile", "thumbsup"}
+        valid_reactions = reaction_service.valid_reactions
 
         if not isinstance(value, str):
             raise serializers.ValidationError("Reaction must be a string")
@@ -208,93 +189,27 @@ class OneToOneMessageSerializer(serializers.ModelSerializer):
 
     def add_reaction(self, user, reaction_type):
         """Add a reaction from a user"""
-        # Validate reaction
         self.validate_reaction(reaction_type)
-
-        # Get instance and its current reactions
-        instance = self.instance
-        reactions = instance.reactions or {}
-
-        # Initialize the reaction type list if it doesn't exist
-        if reaction_type not in reactions:
-            reactions[reaction_type] = []
-
-        # Add user ID if not already present
-        user_id = str(user.id)
-        if user_id not in reactions[reaction_type]:
-            reactions[reaction_type].append(user_id)
-
-        # Update instance
-        instance.reactions = reactions
-        instance.save(update_fields=["reactions"])
-
-        return reactions
+        reaction_service.add(self.instance, user, reaction_type)
+        return reaction_service.summary(self.instance)["reactions"]
 
     def remove_reaction(self, user, reaction_type=None):
         """Remove a user's reaction"""
-        instance = self.instance
-        reactions = instance.reactions or {}
-        user_id = str(user.id)
-
-        # If reaction type specified, remove from just that type
-        if reaction_type:
-            if reaction_type in reactions and user_id in reactions[reaction_type]:
-                reactions[reaction_type].remove(user_id)
-                # Remove empty lists
-                if not reactions[reaction_type]:
-                    del reactions[reaction_type]
-        else:
-            # Remove from all reaction types
-            for r_type in list(reactions.keys()):
-                if user_id in reactions[r_type]:
-                    reactions[r_type].remove(user_id)
-                    # Remove empty lists
-                    if not reactions[r_type]:
-                        del reactions[r_type]
-
-        # Update instance
-        instance.reactions = reactions
-        instance.save(update_fields=["reactions"])
-
-        return reactions
+        reaction_service.remove(self.instance, user, reaction_type)
+        return reaction_service.summary(self.instance)["reactions"]
 
     def get_formatted_reactions(self, obj):
         """Format reactions for display with user details"""
-        try:
-            reactions = obj.reactions or {}
-            formatted = {}
-
-            from django.contrib.auth import get_user_model
-
-            User = get_user_model()
-
-            # Process each reaction type
-            for reaction_type, user_ids in reactions.items():
-                # Get user details for each ID
-                user_objects = User.objects.filter(id__in=user_ids)
-                user_map = {str(user.id): user for user in user_objects}
-
-                formatted[reaction_type] = [
-                    {
-                        "user_id": user_id,
-                        "username": user_map.get(user_id).username
-                        if user_id in user_map
-                        else "Unknown",
-                        "name": (
-                            user_map.get(user_id).get_full_name()
-                            or user_map.get(user_id).username
-                        )
-                        if user_id in user_map
-                        else "Unknown",
-                    }
-                    for user_id in user_ids
-                ]
-
-            return formatted
-
-        except Exception as e:
-            logger.error(f"Error formatting reactions: {str(e)}")
-            return {}
+        formatted = {}
+        for reaction in self.message_reactions(obj):
+            formatted.setdefault(reaction["reaction_type"], []).append(
+                {
+                    "user_id": reaction["user_id"],
+                    "username": reaction["username"],
+                    "name": reaction["name"],
+                }
+            )
+        return formatted
 
     def validate_conversation(self, value):
         """Validate conversation access"""
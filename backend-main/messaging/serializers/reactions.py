@@ -0,0 +1,27 @@
+# messaging/serializers/reactions.py
+from django.db import models
+from rest_framework import serializers
+
+from ..services.reactions import reaction_service
+
+
+class ReactionListSerializer(serializers.ListSerializer):
+    """Loads the reactions of every message in the list with one query"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        self.context["reactions"] = reaction_service.for_messages(items)
+        return super().to_representation(items)
+
+
+class ReactionsFieldMixin:
+    """`reactions` ({type: [user_id, ...]}) read from MessageReaction"""
+
+    def message_reactions(self, obj):
+        preloaded = self.context.get("reactions")
+        if preloaded is None:
+            preloaded = reaction_service.for_messages([obj])
+        return preloaded.get(obj.pk, [])
+
+    def get_reactions(self, obj):
+        return reaction_service.by_type(self.message_reactions(obj))
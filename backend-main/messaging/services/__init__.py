@@ -1,14 +1,50 @@
 # messaging/services/__init__.py
-from .chatbot import ChatbotService, chatbot_service
+from .chatbot import ChatbotService, chatbot_service, get_chatbot_service
+from .chatbot_cache import ChatbotResponseCache
+from .chatbot_providers import (
+    ChatbotProvider,
+    GeminiProvider,
+    OllamaProvider,
+    get_provider,
+)
 from .constants import THERAPEUTIC_GUIDELINES, ERROR_MESSAGES
 from .exceptions import ChatbotError, ChatbotConfigError, ChatbotAPIError
+from .edit_history import EditHistoryService, edit_history_service
+from .group_summary import GroupSummaryService, group_summary_service
+from .inbox import OneToOneInbox
+from .membership import ConversationMembershipService, membership_service
+from .message_events import MessageEventService, message_event_service
+from .presence import PresenceService, presence_service
+from .read_state import ReadStateService, read_state_service
+from .search import MessageSearchService, message_search_service
 
 __all__ = [
     "ChatbotService",
     "chatbot_service",
+    "get_chatbot_service",
+    "ChatbotResponseCache",
+    "ChatbotProvider",
+    "GeminiProvider",
+    "OllamaProvider",
+    "get_provider",
     "THERAPEUTIC_GUIDELINES",
     "ERROR_MESSAGES",
     "ChatbotError",
     "ChatbotConfigError",
     "ChatbotAPIError",
+    "EditHistoryService",
+    "edit_history_service",
+    "GroupSummaryService",
+    "group_summary_service",
+    "OneToOneInbox",
+    "ConversationMembershipService",
+    "membership_service",
+    "MessageEventService",
+    "message_event_service",
+    "PresenceService",
+    "presence_service",
+    "ReadStateService",
+    "read_state_service",
+    "MessageSearchService",
+    "message_search_service",
 ]
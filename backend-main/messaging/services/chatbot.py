@@ -1,28 +1,39 @@
 # messaging/services/chatbot.py
-import requests
-from typing import List, Dict
+import threading
+from typing import AsyncIterator, List, Dict
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 import logging
+from .chatbot_cache import ChatbotResponseCache
+from .chatbot_prompt import prompt_builder
+from .chatbot_providers import error_response, get_provider
 from .exceptions import ChatbotError
 
 logger = logging.getLogger(__name__)
 
 
 class ChatbotService:
-    """Service for handling chatbot interactions"""
-
-    def __init__(self):
-        if not settings.GEMINI_API_KEY:
-            raise ChatbotError("Gemini API key not configured")
-
-        self.api_key = settings.GEMINI_API_KEY
-        # Updated API URL and model name
-        self.api_url = "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent"
-        self.max_retries = settings.CHATBOT_SETTINGS["MAX_RETRIES"]
-        self.timeout = settings.CHATBOT_SETTINGS["RESPONSE_TIMEOUT"]
-        self.max_history = settings.CHATBOT_SETTINGS.get("MAX_HISTORY_MESSAGES", 5)
-
-    def get_response(self, message: str, history: List[Dict]) -> Dict[str, any]:
+    """
+    Service for handling chatbot interactions: input validation, prompt
+    assembly and response caching in front of the configured provider
+    (CHATBOT_SETTINGS['PROVIDER']).
+    """
+
+    def __init__(self, provider=None):
+        chatbot_settings = settings.CHATBOT_SETTINGS
+        self.provider = provider or get_provider(chatbot_settings)
+        self.stream_responses = chatbot_settings.get("STREAM_RESPONSES", True)
+        # Successful replies are shared between identical prompts
+        self.response_cache = ChatbotResponseCache(
+            timeout=chatbot_settings.get("RESPONSE_CACHE_TIMEOUT", 3600),
+            local_size=chatbot_settings.get("RESPONSE_CACHE_LOCAL_SIZE", 256),
+            local_timeout=chatbot_settings.get("RESPONSE_CACHE_LOCAL_TIMEOUT", 300),
+            lock_timeout=self.provider.timeout * self.provider.max_retries,
+        )
+
+    def get_response(
+        self, message: str, history: List[Dict], summary: str = ""
+    ) -> Dict[str, any]:
         """Get chatbot response with error handling and retries"""
         try:
             # Validate input
@@ -30,24 +41,87 @@ class ChatbotService:
                 return self._error_response("Invalid input parameters")
 
             # Build prompt with context
-            prompt = self._build_prompt(message, history)
-
-            # Make API request with retries
-            for attempt in range(self.max_retries):
-                try:
-                    return self._make_api_request(prompt)
-                except requests.RequestException as e:
-                    if attempt == self.max_retries - 1:
-                        logger.error(
-                            f"API request failed after {self.max_retries} attempts: {str(e)}"
-                        )
-                        return self._error_response("Service temporarily unavailable")
-                    continue
+            prompt = self._build_prompt(message, history, summary)
+
+            # Identical prompts share one upstream call and its cached reply
+            return self.response_cache.get_or_compute(
+                self._cache_key(message, history, summary),
+                lambda: self.provider.generate(prompt),
+            )
 
         except Exception as e:
             logger.error(f"Chatbot error: {str(e)}")
             return self._error_response("Internal service error")
 
+    async def aget_response(
+        self, message: str, history: List[Dict], summary: str = ""
+    ) -> Dict[str, any]:
+        """
+        Async variant of get_response for ASGI callers. Uses the provider's
+        pooled async client, so the event loop is never blocked on the LLM
+        round trip.
+        """
+        try:
+            if not self._validate_input(message, history):
+                return self._error_response("Invalid input parameters")
+
+            prompt = self._build_prompt(message, history, summary)
+            logger.debug(f"Prompt length: {len(prompt)} characters")
+            return await self.response_cache.aget_or_compute(
+                self._cache_key(message, history, summary),
+                lambda: self.provider.agenerate(prompt),
+            )
+
+        except Exception as e:
+            logger.exception(f"Chatbot error: {str(e)}")
+            return self._error_response("Internal service error")
+
+    async def astream_response(
+        self, message: str, history: List[Dict], summary: str = ""
+    ) -> AsyncIterator[str]:
+        """
+        Yield the reply text chunk by chunk as the streaming endpoint produces
+        it. Raises ChatbotError on invalid input or when the stream fails.
+        A cached reply is yielded as a single chunk.
+        """
+        if not self._validate_input(message, history):
+            raise ChatbotError("Invalid input parameters")
+
+        cache_key = self._cache_key(message, history, summary)
+        cached = await self.response_cache.aget(cache_key)
+        if cached is not None:
+            yield cached["response"]
+            return
+        await self.response_cache.arecord("misses")
+
+        prompt = self._build_prompt(message, history, summary)
+        chunks = []
+        async for text in self.provider.astream(prompt):
+            chunks.append(text)
+            yield text
+
+        reply = "".join(chunks).strip()
+        if reply:
+            await self.response_cache.aset(
+                cache_key, {"success": True, "response": reply}
+            )
+
+    def summarize(self, prompt: str) -> Dict[str, any]:
+        """Run a summarization prompt built by the prompt builder (uncached)"""
+        try:
+            return self.provider.generate(prompt)
+        except Exception as e:
+            logger.error(f"Chatbot summary error: {str(e)}")
+            return self._error_response("Internal service error")
+
+    def _cache_key(self, message: str, history: List[Dict], summary: str) -> str:
+        return self.response_cache.make_key(
+            message,
+            prompt_builder.pack_history(history),
+            summary,
+            namespace=self.provider.cache_namespace,
+        )
+
     def _validate_input(self, message: str, history: List[Dict]) -> bool:
         """Validate input parameters with improved checks"""
         if not isinstance(message, str) or not message.strip():
@@ -69,134 +143,35 @@ class ChatbotService:
 
         return True
 
-    def _build_prompt(self, message: str, history: List[Dict]) -> str:
-        """Build enhanced prompt for the chatbot with structured history and empathetic tone"""
-
-        # Filter and format valid history entries
-        valid_history = []
-        for msg in history[-self.max_history :]:  # Keep recent exchanges only
-            try:
-                sender = "Samantha" if msg.get("is_bot") else "User"
-                content = msg.get("content", "").strip()
-                if content:
-                    valid_history.append(f"{sender}: {content}")
-            except Exception as e:
-                logger.warning(f"Error processing history message: {e}")
-                continue
-
-        # Build enhanced context-aware prompt
-        prompt = f"""
-You are **Samantha**, an AI-powered **mental health support assistant** designed to provide **empathetic, supportive, and encouraging conversations**.  
-You are **not a doctor or therapist**, but you can offer **comfort, guidance, and coping strategies** using evidence-based therapeutic techniques like **CBT, DBT, and mindfulness**.  
-
-### **Guidelines for Responses:**
-- Always be **warm, non-judgmental, and encouraging**.
-- Use **active listening** and acknowledge emotions.
-- Offer **practical coping strategies** (e.g., deep breathing, journaling).
-- If a user expresses distress, suggest **self-care techniques** and encourage **seeking professional help** if needed.
-- Do **not** diagnose or provide medical advice.
-
-### **Conversation History:**
-{chr(10).join(valid_history)}
-
-### **Current User Message:**
-User: {message.strip()}
-Samantha: 
-"""
-
-        logger.debug(f"Built prompt with {len(valid_history)} history messages")
-        return prompt
-
-    def _make_api_request(self, prompt: str) -> Dict[str, any]:
-        """Make API request with enhanced error handling and debugging"""
-        try:
-            debug_url = f"{self.api_url}?key=***"
-            logger.debug(f"Making API request to: {debug_url}")
-            logger.debug(f"Prompt length: {len(prompt)} characters")
-
-            payload = {
-                "contents": [{"parts": [{"text": prompt}]}],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topP": 0.8,
-                    "topK": 40,
-                    "maxOutputTokens": 1024,
-                },
-            }
-
-            try:
-                response = requests.post(
-                    f"{self.api_url}",  # Remove key from URL
-                    json=payload,
-                    timeout=self.timeout,
-                    headers={
-                        "Content-Type": "application/json",
-                        "User-Agent": "MindCare-Chatbot/1.0",
-                        "x-goog-api-key": self.api_key,  # Add API key as header
-                    },
-                )
-
-                # Log response details for debugging
-                logger.debug(f"API Response Status: {response.status_code}")
-                if response.status_code != 200:
-                    logger.error(f"API Error Response: {response.text}")
-
-                # Handle specific error cases
-                if response.status_code == 404:
-                    logger.error("API endpoint not found - check API URL")
-                    return self._error_response("Invalid API configuration")
-
-                if response.status_code == 401:
-                    logger.error("API Authentication failed - check API key")
-                    return self._error_response("API authentication failed")
-
-                if response.status_code == 429:
-                    logger.warning("API rate limit exceeded")
-                    return self._error_response("Service is currently busy")
-
-                response.raise_for_status()
-
-                data = response.json()
-                if "candidates" not in data or not data["candidates"]:
-                    logger.error(f"Invalid API response format: {data}")
-                    return self._error_response("Unexpected API response format")
-
-                response_text = data["candidates"][0]["content"]["parts"][0][
-                    "text"
-                ].strip()
-                logger.info(
-                    f"Successfully got response of {len(response_text)} characters"
-                )
-
-                return {
-                    "success": True,
-                    "response": response_text,
-                }
-
-            except requests.exceptions.Timeout:
-                logger.error(f"API request timed out after {self.timeout}s")
-                return self._error_response("Request timed out")
-
-            except requests.exceptions.SSLError:
-                logger.error("SSL verification failed")
-                return self._error_response("Connection security error")
-
-            except requests.exceptions.ConnectionError:
-                logger.error(f"Connection failed to {self.api_url}")
-                return self._error_response("Could not connect to service")
-
-        except Exception as e:
-            logger.exception(f"Unexpected error in API request: {str(e)}")
-            return self._error_response("Internal service error")
+    def _build_prompt(
+        self, message: str, history: List[Dict], summary: str = ""
+    ) -> str:
+        """
+        Build the prompt from the system prompt, the conversation summary and
+        the recent history that fits in the token budget
+        """
+        return prompt_builder.build(message, history, summary)
 
     def _error_response(self, message: str) -> Dict[str, any]:
         """Format error response"""
-        return {
-            "success": False,
-            "error": message,
-            "response": "I'm having trouble responding right now. Please try again later.",
-        }
+        return error_response(message)
+
+
+_chatbot_service = None
+_chatbot_service_lock = threading.Lock()
+
+
+def get_chatbot_service() -> ChatbotService:
+    """
+    The shared ChatbotService, built on first use rather than at import so
+    that a missing API key or unreachable provider never breaks startup
+    """
+    global _chatbot_service
+    if _chatbot_service is None:
+        with _chatbot_service_lock:
+            if _chatbot_service is None:
+                _chatbot_service = ChatbotService()
+    return _chatbot_service
 
 
-# Create singleton instance
-chatbot_service = ChatbotService()
+chatbot_service = SimpleLazyObject(get_chatbot_service)
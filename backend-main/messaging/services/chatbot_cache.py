@@ -0,0 +1,228 @@
+# messaging/services/chatbot_cache.py
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("hits", "local_hits", "misses", "coalesced")
+
+
+class ChatbotResponseCache:
+    """
+    Two-tier cache of successful chatbot replies, keyed by the trimmed user
+    message plus the summary and history turns that go into the prompt.
+
+    A small in-process LRU tier sits in front of the shared Django cache
+    (Redis, which evicts by LRU under memory pressure). Computing a missing
+    reply is single-flight: concurrent identical requests in a process wait
+    for the first one, and a short Redis lock makes other processes (e.g.
+    Celery retries) wait for the result instead of calling upstream again.
+    """
+
+    def __init__(
+        self,
+        timeout=3600,
+        local_size=256,
+        local_timeout=300,
+        lock_timeout=60,
+        prefix="chatbot_response",
+    ):
+        self.timeout = timeout
+        self.local_size = local_size
+        self.local_timeout = local_timeout
+        self.lock_timeout = lock_timeout
+        self.prefix = prefix
+        self._local = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> threading.Event
+        self._async_inflight = {}  # (event loop, key) -> asyncio.Future
+
+    def make_key(self, message, history, summary="", namespace=""):
+        """Stable key of the prompt inputs"""
+        turns = [
+            [bool(msg.get("is_bot")), msg.get("content", "").strip()] for msg in history
+        ]
+        digest = hashlib.sha256(
+            json.dumps(
+                {"n": namespace, "m": message.strip(), "s": summary, "h": turns},
+                separators=(",", ":"),
+            ).encode()
+        ).hexdigest()
+        return f"{self.prefix}_{digest}"
+
+    # Tiers
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry[1]
+
+    def _set_local(self, key, response):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_timeout, response)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def get(self, key, record=True):
+        response = self._get_local(key)
+        if response is not None:
+            if record:
+                self.record("local_hits")
+            return response
+
+        response = cache.get(key)
+        if response is not None:
+            self._set_local(key, response)
+            if record:
+                self.record("hits")
+        return response
+
+    def set(self, key, response):
+        """Store a reply; failed replies are never cached"""
+        if not response or not response.get("success"):
+            return
+        self._set_local(key, response)
+        cache.set(key, response, timeout=self.timeout)
+
+    # Metrics
+
+    def record(self, metric):
+        key = f"{self.prefix}_stats_{metric}"
+        try:
+            if not cache.add(key, 1, timeout=None):
+                cache.incr(key)
+        except Exception as e:
+            logger.debug(f"Could not record chatbot cache metric {metric}: {e}")
+
+    def stats(self):
+        """Hit/miss counters shared by all processes"""
+        values = cache.get_many([f"{self.prefix}_stats_{metric}" for metric in METRICS])
+        stats = {
+            metric: values.get(f"{self.prefix}_stats_{metric}", 0) for metric in METRICS
+        }
+        # Coalesced callers shared an upstream call, so they count as hits
+        served = stats["hits"] + stats["local_hits"] + stats["coalesced"]
+        lookups = served + stats["misses"]
+        stats["hit_ratio"] = round(served / lookups, 4) if lookups else 0.0
+        with self._lock:
+            stats["local_entries"] = len(self._local)
+        return stats
+
+    # Single-flight
+
+    def get_or_compute(self, key, compute):
+        """Return the cached reply or compute it once for all concurrent callers"""
+        response = self.get(key)
+        if response is not None:
+            return response
+
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            event.wait(self.lock_timeout)
+            response = self.get(key, record=False)
+            if response is not None:
+                self.record("coalesced")
+                return response
+            # The first caller failed; try on our own
+            return compute()
+
+        locked = False
+        try:
+            locked, response = self._wait_for_other_process(key)
+            if response is not None:
+                return response
+
+            self.record("misses")
+            response = compute()
+            self.set(key, response)
+            return response
+        finally:
+            if locked:
+                cache.delete(f"{key}_lock")
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _wait_for_other_process(self, key):
+        """
+        Take the cross-process lock, or wait for its holder's reply. Returns
+        (lock taken, cached reply); if the holder dies the lock expires and
+        the caller goes upstream after `lock_timeout`.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        while not cache.add(f"{key}_lock", 1, timeout=self.lock_timeout):
+            if time.monotonic() >= deadline:
+                return False, None
+            time.sleep(0.1)
+            response = self.get(key, record=False)
+            if response is not None:
+                self.record("coalesced")
+                return False, response
+        return True, None
+
+    async def aget_or_compute(self, key, compute):
+        """Async get_or_compute; `compute` is a coroutine function"""
+        response = await self.aget(key)
+        if response is not None:
+            return response
+
+        loop = asyncio.get_running_loop()
+        inflight_key = (loop, key)
+        future = self._async_inflight.get(inflight_key)
+        if future is not None:
+            response = await asyncio.shield(future)
+            if response is not None and response.get("success"):
+                await self.arecord("coalesced")
+                return response
+            # The first caller failed; try on our own
+            return await compute()
+
+        future = loop.create_future()
+        self._async_inflight[inflight_key] = future
+        locked = False
+        response = None
+        try:
+            locked, response = await asyncio.to_thread(
+                self._wait_for_other_process, key
+            )
+            if response is not None:
+                return response
+
+            await self.arecord("misses")
+            response = await compute()
+            await self.aset(key, response)
+            return response
+        finally:
+            if locked:
+                await asyncio.to_thread(cache.delete, f"{key}_lock")
+            self._async_inflight.pop(inflight_key, None)
+            future.set_result(response)
+
+    # Async callers never block their event loop on Redis
+
+    async def aget(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key, response):
+        await asyncio.to_thread(self.set, key, response)
+
+    async def arecord(self, metric):
+        await asyncio.to_thread(self.record, metric)
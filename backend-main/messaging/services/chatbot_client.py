@@ -0,0 +1,204 @@
+# messaging/services/chatbot_client.py
+import asyncio
+import json
+import random
+import aiohttp
+import logging
+
+from .exceptions import ChatbotAPIError
+
+logger = logging.getLogger(__name__)
+
+# Upstream answers worth retrying; anything else is returned to the caller
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, base, cap):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))"""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class AsyncChatbotClient:
+    """
+    Pooled aiohttp client for the LLM API.
+
+    Keep-alive connections are shared by every request made on the same
+    event loop, at most `max_concurrency` requests are in flight at once, and
+    transient failures are retried with jittered exponential backoff.
+
+    `timeout` caps a whole post_json request. Streams have no total cap, as
+    long replies are expected; they fail when connecting takes `timeout` or
+    no data arrives for `stream_idle_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        timeout=30,
+        max_retries=3,
+        max_concurrency=10,
+        backoff_base=0.5,
+        backoff_max=8.0,
+        stream_idle_timeout=30,
+    ):
+        self.timeout = timeout
+        self.stream_idle_timeout = stream_idle_timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # aiohttp sessions are bound to the loop that created them
+        self._sessions = {}
+
+    def _get_session(self):
+        loop = asyncio.get_running_loop()
+        for other_loop in [other for other in self._sessions if other.is_closed()]:
+            del self._sessions[other_loop]
+
+        entry = self._sessions.get(loop)
+        if entry is None or entry[0].closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency, keepalive_timeout=60
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            entry = (session, asyncio.Semaphore(self.max_concurrency))
+            self._sessions[loop] = entry
+        return entry
+
+    async def post_json(self, url, payload, headers=None):
+        """
+        POST a JSON payload and return (status, parsed JSON body or None).
+        Raises ChatbotAPIError once retries are exhausted on network errors.
+        """
+        session, semaphore = self._get_session()
+        last_error = None
+
+        for attempt in range(self.max_retries):
+            if attempt:
+                await asyncio.sleep(
+                    backoff_delay(attempt - 1, self.backoff_base, self.backoff_max)
+                )
+            try:
+                async with semaphore:
+                    async with session.post(
+                        url, json=payload, headers=headers
+                    ) as response:
+                        if (
+                            response.status in RETRYABLE_STATUSES
+                            and attempt < self.max_retries - 1
+                        ):
+                            logger.warning(
+                                f"API returned {response.status}, retrying "
+                                f"(attempt {attempt + 1}/{self.max_retries})"
+                            )
+                            continue
+                        try:
+                            data = await response.json(content_type=None)
+                        except ValueError:
+                            data = None
+                        return response.status, data
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+                logger.warning(
+                    f"API request failed: {str(e) or type(e).__name__} "
+                    f"(attempt {attempt + 1}/{self.max_retries})"
+                )
+
+        raise ChatbotAPIError(
+            f"API request failed after {self.max_retries} attempts: {last_error}"
+        )
+
+    async def stream_sse(self, url, payload, headers=None):
+        """
+        POST a JSON payload to a server-sent events endpoint and yield every
+        event's JSON data as it arrives. Connecting is retried like post_json;
+        once the first event has been yielded, failures propagate.
+        """
+        async for event in self._stream(url, payload, headers, self._parse_sse_line):
+            yield event
+
+    async def stream_ndjson(self, url, payload, headers=None):
+        """Like stream_sse, for endpoints answering with one JSON object per line"""
+        async for event in self._stream(url, payload, headers, self._parse_ndjson_line):
+            yield event
+
+    @staticmethod
+    def _parse_sse_line(line):
+        """Returns the event's data, None to skip the line, or "[DONE]" """
+        if not line.startswith("data:"):
+            return None
+        return line[len("data:") :].strip()
+
+    @staticmethod
+    def _parse_ndjson_line(line):
+        return line or None
+
+    async def _stream(self, url, payload, headers, parse_line):
+        session, semaphore = self._get_session()
+        timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=self.timeout, sock_read=self.stream_idle_timeout
+        )
+        last_error = None
+        started = False
+
+        for attempt in range(self.max_retries):
+            if attempt:
+                await asyncio.sleep(
+                    backoff_delay(attempt - 1, self.backoff_base, self.backoff_max)
+                )
+            try:
+                async with semaphore:
+                    async with session.post(
+                        url, json=payload, headers=headers, timeout=timeout
+                    ) as response:
+                        if response.status in RETRYABLE_STATUSES:
+                            last_error = f"status {response.status}"
+                            logger.warning(
+                                f"Stream returned {response.status}, retrying "
+                                f"(attempt {attempt + 1}/{self.max_retries})"
+                            )
+                            continue
+                        if response.status != 200:
+                            raise ChatbotAPIError(
+                                f"Stream request failed with status {response.status}"
+                            )
+
+                        async for line in response.content:
+                            data = parse_line(line.decode("utf-8").strip())
+                            if data is None:
+                                continue
+                            if data == "[DONE]":
+                                return
+                            try:
+                                event = json.loads(data)
+                            except ValueError:
+                                logger.warning(
+                                    f"Skipping malformed stream event: {data}"
+                                )
+                                continue
+                            started = True
+                            yield event
+                        return
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if started:
+                    # Part of the reply is already out; retrying would repeat it
+                    raise ChatbotAPIError(f"Stream interrupted: {e}") from e
+                last_error = e
+                logger.warning(
+                    f"Stream request failed: {str(e) or type(e).__name__} "
+                    f"(attempt {attempt + 1}/{self.max_retries})"
+                )
+
+        raise ChatbotAPIError(
+            f"Stream request failed after {self.max_retries} attempts: {last_error}"
+        )
+
+    async def close(self):
+        """Close the session of the running event loop"""
+        entry = self._sessions.pop(asyncio.get_running_loop(), None)
+        if entry:
+            await entry[0].close()
@@ -0,0 +1,184 @@
+# messaging/services/chatbot_prompt.py
+from typing import Dict, List
+from django.conf import settings
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are Samantha, an empathetic mental health support assistant. You are "
+    "not a doctor or therapist: never diagnose or give medical advice. Be warm "
+    "and non-judgmental, acknowledge feelings, and offer practical coping "
+    "strategies grounded in CBT, DBT and mindfulness (e.g. deep breathing, "
+    "journaling). If the user is in distress, suggest self-care and encourage "
+    "seeking professional help."
+)
+
+SUMMARY_INSTRUCTIONS = (
+    "Update the running summary of a support conversation between a user and "
+    "Samantha, an assistant. Keep what matters for future replies: the user's "
+    "situation, feelings, goals, coping strategies tried and anything they "
+    "asked to be remembered. Write plain prose in the third person, at most "
+    "{words} words. Reply with the updated summary only."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text). Close
+    enough for budgeting without shipping the provider's tokenizer.
+    """
+    return len(text) // 4 + 1
+
+
+class ChatbotPromptBuilder:
+    """
+    Assembles chatbot prompts from a compact system prompt, the
+    conversation's rolling summary and as many recent turns as fit in the
+    token budget. Turns that fall out of the budget are folded into the
+    summary in batches by `update_summary`, so long conversations keep their
+    context without the request growing. Until its batch is folded, an
+    overflowing turn is still sent verbatim.
+    """
+
+    def __init__(self):
+        chatbot_settings = settings.CHATBOT_SETTINGS
+        self.history_budget = chatbot_settings.get("HISTORY_TOKEN_BUDGET", 1500)
+        self.summary_budget = chatbot_settings.get("SUMMARY_TOKEN_BUDGET", 300)
+        self.fetch_limit = chatbot_settings.get("HISTORY_FETCH_LIMIT", 40)
+        self.summary_batch = chatbot_settings.get("SUMMARY_BATCH_MESSAGES", 8)
+
+    # Loading
+
+    def context_for(self, user_message) -> Dict:
+        """Summary and history (oldest first) preceding a user message"""
+        conversation = user_message.conversation
+        history = list(
+            conversation.messages.filter(timestamp__lt=user_message.timestamp)
+            .order_by("-timestamp", "-id")
+            .values("id", "content", "is_bot")[: self.fetch_limit]
+        )
+        history.reverse()
+        summarized_until = conversation.summarized_until_id or 0
+        for msg in history:
+            msg["summarized"] = msg["id"] <= summarized_until
+        return {"summary": conversation.summary, "history": history}
+
+    # Assembly
+
+    def pack_history(self, history: List[Dict]) -> List[Dict]:
+        """
+        The most recent turns whose text fits in the history budget. Turns
+        marked `"summarized": False` are kept past the budget, as they are
+        not in the summary yet.
+        """
+        packed = []
+        remaining = self.history_budget
+        for msg in reversed(history):
+            content = msg.get("content", "").strip()
+            if not content:
+                continue
+            cost = estimate_tokens(content) + 2
+            if cost > remaining and msg.get("summarized", True):
+                break
+            remaining = max(remaining - cost, 0)
+            packed.append({"is_bot": bool(msg.get("is_bot")), "content": content})
+        packed.reverse()
+        return packed
+
+    def build(self, message: str, history: List[Dict], summary: str = "") -> str:
+        sections = [SYSTEM_PROMPT]
+        if summary:
+            sections.append(f"Summary of the earlier conversation:\n{summary}")
+
+        turns = [self._format_turn(msg) for msg in self.pack_history(history)]
+        if turns:
+            sections.append("Recent conversation:\n" + "\n".join(turns))
+
+        sections.append(f"User: {message.strip()}\nSamantha:")
+        prompt = "\n\n".join(sections)
+        logger.debug(
+            f"Built prompt with {len(turns)} history messages, "
+            f"~{estimate_tokens(prompt)} tokens"
+        )
+        return prompt
+
+    def build_summary_prompt(self, summary: str, messages: List[Dict]) -> str:
+        words = self.summary_budget * 3 // 4
+        sections = [SUMMARY_INSTRUCTIONS.format(words=words)]
+        sections.append(f"Current summary:\n{summary or '(none yet)'}")
+        sections.append(
+            "New messages:\n" + "\n".join(self._format_turn(msg) for msg in messages)
+        )
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def _format_turn(msg: Dict) -> str:
+        sender = "Samantha" if msg.get("is_bot") else "User"
+        return f"{sender}: {msg['content'].strip()}"
+
+    # Rolling summary
+
+    def pending_summary_messages(self, conversation) -> List[Dict]:
+        """
+        Messages that no longer fit in the prompt window and are not yet part
+        of the summary, oldest first.
+        """
+        history = list(
+            conversation.messages.order_by("-timestamp", "-id").values(
+                "id", "content", "is_bot"
+            )[: self.fetch_limit]
+        )
+        history.reverse()
+        # Unmarked turns count as summarized: the window is the budget alone
+        window = len(self.pack_history(history))
+        # Everything older than the verbatim window, up to the newest turns
+        # that would still be sent as history on the next request
+        cutoff = history[-window]["id"] if window else None
+
+        pending = conversation.messages.order_by("timestamp", "id")
+        if conversation.summarized_until_id:
+            pending = pending.filter(id__gt=conversation.summarized_until_id)
+        if cutoff is not None:
+            pending = pending.filter(id__lt=cutoff)
+        return list(pending.values("id", "content", "is_bot")[: self.fetch_limit])
+
+    def update_summary(self, conversation, summarize) -> bool:
+        """
+        Fold messages that left the prompt window into the conversation's
+        summary once a batch has accumulated. `summarize(prompt)` returns a
+        chatbot result dict. Returns whether the summary changed.
+        """
+        lock_key = f"chatbot_summary_lock_{conversation.id}"
+        if not cache.add(lock_key, True, timeout=120):
+            return False
+        try:
+            pending = self.pending_summary_messages(conversation)
+            if len(pending) < self.summary_batch:
+                return False
+
+            result = summarize(self.build_summary_prompt(conversation.summary, pending))
+            if not result.get("success"):
+                logger.warning(
+                    f"Could not summarize chatbot conversation {conversation.id}: "
+                    f"{result.get('error')}"
+                )
+                return False
+
+            conversation.summary = result["response"].strip()
+            conversation.summarized_until_id = pending[-1]["id"]
+            type(conversation).objects.filter(id=conversation.id).update(
+                summary=conversation.summary,
+                summarized_until_id=conversation.summarized_until_id,
+            )
+            logger.info(
+                f"Folded {len(pending)} messages into the summary of chatbot "
+                f"conversation {conversation.id}"
+            )
+            return True
+        finally:
+            cache.delete(lock_key)
+
+
+prompt_builder = ChatbotPromptBuilder()
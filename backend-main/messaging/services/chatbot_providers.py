@@ -0,0 +1,360 @@
+# messaging/services/chatbot_providers.py
+import asyncio
+import requests
+import time
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, Dict, List
+from django.conf import settings
+from django.utils.module_loading import import_string
+import logging
+from .chatbot_client import RETRYABLE_STATUSES, AsyncChatbotClient, backoff_delay
+from .exceptions import ChatbotAPIError, ChatbotConfigError
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent"
+GEMINI_STREAM_API_URL = "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:streamGenerateContent?alt=sse"
+OLLAMA_API_URL = "http://localhost:11434/api/generate"
+
+
+def error_response(message: str) -> Dict[str, any]:
+    """Format error response"""
+    return {
+        "success": False,
+        "error": message,
+        "response": "I'm having trouble responding right now. Please try again later.",
+    }
+
+
+class ChatbotProvider:
+    """
+    Backend that turns a finished prompt into a reply.
+
+    Subclasses describe one API: the request payload, headers and how to read
+    the reply. Pooled sync and async HTTP clients, jittered retries and
+    status handling are shared.
+    """
+
+    name = None
+
+    def __init__(self, chatbot_settings):
+        self.max_retries = chatbot_settings["MAX_RETRIES"]
+        self.timeout = chatbot_settings["RESPONSE_TIMEOUT"]
+        self.stream_idle_timeout = chatbot_settings.get(
+            "STREAM_IDLE_TIMEOUT", self.timeout
+        )
+        self.backoff_base = chatbot_settings.get("RETRY_BACKOFF_BASE", 0.5)
+        self.backoff_max = chatbot_settings.get("RETRY_BACKOFF_MAX", 8.0)
+        self.max_concurrency = chatbot_settings.get("MAX_CONCURRENT_REQUESTS", 10)
+
+        # Keep-alive connection pools for the sync and async paths
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.async_client = AsyncChatbotClient(
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            max_concurrency=self.max_concurrency,
+            backoff_base=self.backoff_base,
+            backoff_max=self.backoff_max,
+            stream_idle_timeout=self.stream_idle_timeout,
+        )
+
+    @property
+    def cache_namespace(self) -> str:
+        """Distinguishes cached replies of different backends and models"""
+        return self.api_url
+
+    def generate(self, prompt: str) -> Dict[str, any]:
+        """Make the API request, retrying transient failures with jittered backoff"""
+        for attempt in range(self.max_retries):
+            try:
+                return self._make_api_request(prompt)
+            except requests.RequestException as e:
+                if attempt == self.max_retries - 1:
+                    logger.error(
+                        f"API request failed after {self.max_retries} attempts: {str(e)}"
+                    )
+                    return error_response("Service temporarily unavailable")
+                time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+
+    async def agenerate(self, prompt: str) -> Dict[str, any]:
+        """Make the API request on the pooled async client"""
+        try:
+            status, data = await self.async_client.post_json(
+                self.api_url, self.build_payload(prompt), headers=self.headers()
+            )
+        except ChatbotAPIError as e:
+            logger.error(str(e))
+            return error_response("Service temporarily unavailable")
+        return self.parse_response(status, data)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Yield the reply text as it is generated. Providers without a
+        streaming endpoint yield the whole reply at once.
+        """
+        result = await self.agenerate(prompt)
+        if not result["success"]:
+            raise ChatbotAPIError(result["error"])
+        yield result["response"]
+
+    def build_payload(self, prompt: str, stream: bool = False) -> Dict[str, any]:
+        raise NotImplementedError
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "User-Agent": "MindCare-Chatbot/1.0",
+        }
+
+    def extract_text(self, data) -> str:
+        """Reply text of a successful response; raises KeyError/IndexError/TypeError"""
+        raise NotImplementedError
+
+    def _make_api_request(self, prompt: str) -> Dict[str, any]:
+        """
+        Make API request on the pooled session. Transient failures (network
+        errors, 429 and 5xx) raise requests.RequestException so the caller
+        can retry them.
+        """
+        logger.debug(f"Making API request to: {self.api_url}")
+        logger.debug(f"Prompt length: {len(prompt)} characters")
+
+        response = self.session.post(
+            self.api_url,
+            json=self.build_payload(prompt),
+            timeout=self.timeout,
+            headers=self.headers(),
+        )
+
+        logger.debug(f"API Response Status: {response.status_code}")
+        if response.status_code in RETRYABLE_STATUSES:
+            logger.warning(f"API Error Response: {response.text}")
+            response.raise_for_status()
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        return self.parse_response(response.status_code, data)
+
+    def parse_response(self, status: int, data) -> Dict[str, any]:
+        """Map an API response to the service's result format"""
+        if status == 404:
+            logger.error("API endpoint not found - check API URL")
+            return error_response("Invalid API configuration")
+
+        if status in (401, 403):
+            logger.error("API Authentication failed - check API key")
+            return error_response("API authentication failed")
+
+        if status == 429:
+            logger.warning("API rate limit exceeded")
+            return error_response("Service is currently busy")
+
+        if status != 200:
+            logger.error(f"API Error Response ({status}): {data}")
+            return error_response("Service temporarily unavailable")
+
+        try:
+            response_text = self.extract_text(data).strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            logger.error(f"Invalid API response format: {data}")
+            return error_response("Unexpected API response format")
+
+        logger.info(f"Successfully got response of {len(response_text)} characters")
+        return {
+            "success": True,
+            "response": response_text,
+        }
+
+
+class GeminiProvider(ChatbotProvider):
+    """Google Gemini generateContent/streamGenerateContent API"""
+
+    name = "gemini"
+
+    def __init__(self, chatbot_settings):
+        if not settings.GEMINI_API_KEY:
+            raise ChatbotConfigError("Gemini API key not configured")
+        super().__init__(chatbot_settings)
+        self.api_key = settings.GEMINI_API_KEY
+        # Overridable so the service can be pointed at a local stub server
+        self.api_url = chatbot_settings.get("API_URL", GEMINI_API_URL)
+        self.stream_url = chatbot_settings.get("STREAM_API_URL", GEMINI_STREAM_API_URL)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        async for event in self.async_client.stream_sse(
+            self.stream_url, self.build_payload(prompt), headers=self.headers()
+        ):
+            try:
+                parts = event["candidates"][0]["content"]["parts"]
+            except (KeyError, IndexError, TypeError):
+                continue
+            text = "".join(part.get("text", "") for part in parts)
+            if text:
+                yield text
+
+    def build_payload(self, prompt: str, stream: bool = False) -> Dict[str, any]:
+        return {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": 0.7,
+                "topP": 0.8,
+                "topK": 40,
+                "maxOutputTokens": 1024,
+            },
+        }
+
+    def headers(self) -> Dict[str, str]:
+        return {**super().headers(), "x-goog-api-key": self.api_key}
+
+    def extract_text(self, data) -> str:
+        return data["candidates"][0]["content"]["parts"][0]["text"]
+
+
+class OllamaProvider(ChatbotProvider):
+    """
+    Local model served by Ollama (or any server speaking its /api/generate
+    protocol, such as the run_fake_chatbot stub). Needs no outbound network.
+
+    Concurrent async requests are collected for BATCH_WINDOW_MS and sent
+    together: as a single request when BATCH_API_URL points at an
+    OpenAI-compatible /v1/completions endpoint that accepts a list of
+    prompts, otherwise as parallel requests that the server schedules into
+    its own batches (OLLAMA_NUM_PARALLEL).
+    """
+
+    name = "ollama"
+
+    def __init__(self, chatbot_settings):
+        super().__init__(chatbot_settings)
+        self.api_url = getattr(settings, "OLLAMA_API_URL", OLLAMA_API_URL)
+        self.model = chatbot_settings.get("LOCAL_MODEL", "llama2")
+        self.batch_url = chatbot_settings.get("BATCH_API_URL")
+        self.batch_window = chatbot_settings.get("BATCH_WINDOW_MS", 20) / 1000
+        self.max_batch_size = chatbot_settings.get("MAX_BATCH_SIZE", 8)
+        # Pending batch per event loop: loop -> [(prompt, future), ...]
+        self._batches = {}
+
+    @property
+    def cache_namespace(self) -> str:
+        return f"{self.api_url}|{self.model}"
+
+    async def agenerate(self, prompt: str) -> Dict[str, any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._batches.get(loop)
+        if batch is None:
+            batch = self._batches[loop] = []
+            loop.call_later(self.batch_window, self._flush, loop, batch)
+        batch.append((prompt, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(loop, batch)
+        return await future
+
+    def _flush(self, loop, batch):
+        # The timer of a batch that was already sent when it filled up is a no-op
+        if self._batches.get(loop) is batch:
+            del self._batches[loop]
+            loop.create_task(self._send_batch(batch))
+
+    async def _send_batch(self, batch):
+        # Identical prompts in a batch are generated once
+        prompts = list(dict.fromkeys(prompt for prompt, _ in batch))
+        logger.debug(f"Sending batch of {len(prompts)} prompts to local model")
+        try:
+            if self.batch_url and len(prompts) > 1:
+                results = await self._generate_many(prompts)
+            else:
+                results = await asyncio.gather(
+                    *(super(OllamaProvider, self).agenerate(p) for p in prompts)
+                )
+            replies = dict(zip(prompts, results))
+        except Exception as e:
+            logger.exception(f"Local model batch failed: {str(e)}")
+            replies = {}
+
+        for prompt, future in batch:
+            if not future.done():
+                future.set_result(
+                    replies.get(prompt) or error_response("Internal service error")
+                )
+
+    async def _generate_many(self, prompts: List[str]) -> List[Dict[str, any]]:
+        """One OpenAI-compatible completions request for a whole batch"""
+        try:
+            status, data = await self.async_client.post_json(
+                self.batch_url,
+                {
+                    "model": self.model,
+                    "prompt": prompts,
+                    "temperature": 0.7,
+                    "top_p": 0.8,
+                    "max_tokens": 1024,
+                },
+                headers=self.headers(),
+            )
+        except ChatbotAPIError as e:
+            logger.error(str(e))
+            return [error_response("Service temporarily unavailable")] * len(prompts)
+
+        if status != 200:
+            result = self.parse_response(status, data)
+            return [result] * len(prompts)
+        try:
+            choices = sorted(data["choices"], key=lambda choice: choice["index"])
+            return [
+                {"success": True, "response": choice["text"].strip()}
+                for choice in choices
+            ]
+        except (KeyError, TypeError):
+            logger.error(f"Invalid batch response format: {data}")
+            return [error_response("Unexpected API response format")] * len(prompts)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        async for event in self.async_client.stream_ndjson(
+            self.api_url,
+            self.build_payload(prompt, stream=True),
+            headers=self.headers(),
+        ):
+            if event.get("error"):
+                raise ChatbotAPIError(event["error"])
+            if event.get("response"):
+                yield event["response"]
+            if event.get("done"):
+                return
+
+    def build_payload(self, prompt: str, stream: bool = False) -> Dict[str, any]:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.7,
+                "top_p": 0.8,
+                "top_k": 40,
+                "num_predict": 1024,
+            },
+        }
+
+    def extract_text(self, data) -> str:
+        return data["response"]
+
+
+PROVIDERS = {
+    GeminiProvider.name: GeminiProvider,
+    OllamaProvider.name: OllamaProvider,
+}
+
+
+def get_provider(chatbot_settings) -> ChatbotProvider:
+    """Build the provider named by CHATBOT_SETTINGS['PROVIDER'] (or a dotted path)"""
+    name = chatbot_settings.get("PROVIDER", GeminiProvider.name)
+    try:
+        provider_class = PROVIDERS.get(name) or import_string(name)
+    except ImportError as e:
+        raise ChatbotConfigError(f"Unknown chatbot provider: {name}") from e
+    return provider_class(chatbot_settings)
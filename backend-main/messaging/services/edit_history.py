@@ -0,0 +1,80 @@
+# messaging/services/edit_history.py
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+import logging
+
+from ..models.base import MessageEditHistory
+
+logger = logging.getLogger(__name__)
+
+EDIT_HISTORY_CACHE_TIMEOUT = 3600
+
+
+def edit_history_cache_key(message_id):
+    return f"message_edit_history_{message_id}"
+
+
+class EditHistoryService:
+    """
+    Append-only edit log of every message type, stored in
+    MessageEditHistory and keyed by (content type, message id).
+
+    An edit inserts one row, whatever the length of the history. Rendered
+    histories are cached under `message_edit_history_{id}`, one entry per
+    message model since ids repeat across models; the key is dropped when
+    the message content changes.
+    """
+
+    def record(self, message, previous_content, edited_by):
+        """Append the content a message had before an edit"""
+        return MessageEditHistory.objects.create(
+            content_type=ContentType.objects.get_for_model(message),
+            object_id=message.pk,
+            previous_content=previous_content,
+            edited_by=edited_by,
+        )
+
+    def invalidate(self, message_id):
+        # Again after commit, so a read racing the edit cannot keep stale data
+        key = edit_history_cache_key(message_id)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+
+    def history(self, message):
+        """Rendered edits of a message, newest first"""
+        key = edit_history_cache_key(message.pk)
+        label = message._meta.label_lower
+        cached = cache.get(key) or {}
+        if label in cached:
+            return cached[label]
+
+        records = (
+            MessageEditHistory.objects.filter(
+                content_type=ContentType.objects.get_for_model(message),
+                object_id=message.pk,
+            )
+            .select_related("edited_by")
+            .order_by("-edited_at", "-id")
+        )
+        history = [self.render(record) for record in records]
+
+        cached[label] = history
+        cache.set(key, cached, timeout=EDIT_HISTORY_CACHE_TIMEOUT)
+        return history
+
+    @staticmethod
+    def render(record):
+        return {
+            "previous_content": record.previous_content,
+            "edited_at": record.edited_at.isoformat(),
+            "edited_by": {
+                "id": record.edited_by.id if record.edited_by else None,
+                "username": record.edited_by.username
+                if record.edited_by
+                else "Unknown",
+            },
+        }
+
+
+edit_history_service = EditHistoryService()
@@ -0,0 +1,121 @@
+# messaging/services/group_summary.py
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+import logging
+
+from ..models.group import GroupConversation, GroupMessage
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_LENGTH = 100
+
+
+class GroupSummaryService:
+    """
+    Maintains the summary columns of GroupConversation: participant_count
+    and the last message (id, preview, sender name, time). message_count
+    and last_activity are kept by MessageEventService like for every
+    conversation type.
+
+    New and edited messages add their changes to the conversation UPDATE the
+    message pipeline already runs; deleting the last message or changing
+    the participants costs one more UPDATE.
+    """
+
+    @staticmethod
+    def preview(content):
+        return content[:PREVIEW_LENGTH] + (
+            "..." if len(content) > PREVIEW_LENGTH else ""
+        )
+
+    @staticmethod
+    def sender_name(message):
+        sender = message.sender
+        if sender is None:
+            return ""
+        return sender.get_full_name() or sender.username
+
+    def last_message_fields(self, message):
+        """Summary columns describing `message` as the last one (None: no message)"""
+        if message is None:
+            return {
+                "last_message_id": None,
+                "last_message_preview": "",
+                "last_message_sender_name": "",
+                "last_message_at": None,
+            }
+        return {
+            "last_message_id": message.id,
+            "last_message_preview": self.preview(message.content),
+            "last_message_sender_name": self.sender_name(message),
+            "last_message_at": message.timestamp,
+        }
+
+    def saved_changes(self, message, created):
+        """
+        Extra update() arguments for the conversation of a saved message.
+        Rows are only changed when the message is (or becomes) the last one,
+        so concurrent or out-of-order saves cannot move the summary back.
+        """
+        if created:
+            newer = Q(last_message_at__isnull=True) | Q(
+                last_message_at__lt=message.timestamp
+            )
+            newer |= Q(
+                last_message_at=message.timestamp, last_message_id__lt=message.id
+            )
+            return {
+                field: Case(
+                    When(newer, then=Value(value)),
+                    default=F(field),
+                    output_field=GroupConversation._meta.get_field(field),
+                )
+                for field, value in self.last_message_fields(message).items()
+            }
+        if message.tracker.has_changed("content"):
+            return {
+                "last_message_preview": Case(
+                    When(
+                        last_message_id=message.id,
+                        then=Value(self.preview(message.content)),
+                    ),
+                    default=F("last_message_preview"),
+                    output_field=GroupConversation._meta.get_field(
+                        "last_message_preview"
+                    ),
+                )
+            }
+        return {}
+
+    def message_deleted(self, message):
+        """Fall back to the previous message when the last one is deleted"""
+        conversation = GroupConversation.objects.filter(
+            pk=message.conversation_id, last_message_id=message.id
+        )
+        if not conversation.exists():
+            return
+        latest = (
+            GroupMessage.objects.filter(conversation_id=message.conversation_id)
+            .select_related("sender")
+            .order_by("-timestamp", "-id")
+            .first()
+        )
+        conversation.update(**self.last_message_fields(latest))
+
+    def refresh_participant_count(self, *group_ids):
+        """Recount the participants of groups with one UPDATE"""
+        if not group_ids:
+            return
+        Participant = GroupConversation.participants.through
+        count = (
+            Participant.objects.filter(groupconversation_id=OuterRef("pk"))
+            .values("groupconversation_id")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        GroupConversation.objects.filter(pk__in=group_ids).update(
+            participant_count=Coalesce(Subquery(count), Value(0))
+        )
+
+
+group_summary_service = GroupSummaryService()
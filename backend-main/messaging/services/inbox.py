@@ -0,0 +1,112 @@
+# messaging/services/inbox.py
+from django.db.models import F, OuterRef, Subquery
+import logging
+
+from ..models.one_to_one import OneToOneConversation, OneToOneMessage
+from .read_state import read_state_service
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_LENGTH = 100
+
+
+class OneToOneInbox:
+    """
+    Builds the one-to-one conversation list for a user in a fixed number of
+    queries, independent of how many messages each conversation holds:
+
+    1. the page of conversations, annotated with correlated subqueries for the
+       latest message id/time and the maintained unread counter
+    2. the participants of the page (at most two per conversation)
+    3. the latest message of every conversation on the page, with its sender
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def get_queryset(self):
+        """Conversations of the user with inbox annotations, newest first"""
+        latest_message = OneToOneMessage.objects.filter(
+            conversation=OuterRef("pk")
+        ).order_by("-timestamp", "-id")
+
+        return (
+            OneToOneConversation.objects.filter(participants=self.user)
+            .prefetch_related("participants")
+            .annotate(
+                latest_message_id=Subquery(latest_message.values("id")[:1]),
+                last_message_time=Subquery(latest_message.values("timestamp")[:1]),
+                unread_count=read_state_service.unread_count_subquery(
+                    OneToOneConversation, self.user
+                ),
+            )
+            # Conversations without messages go last
+            .order_by(F("last_message_time").desc(nulls_last=True), "-id")
+        )
+
+    def hydrate(self, conversations):
+        """
+        Attach the latest message and the other participants to each
+        conversation of an evaluated page. Costs a single extra query.
+        """
+        conversations = list(conversations)
+        message_ids = [
+            conversation.latest_message_id
+            for conversation in conversations
+            if getattr(conversation, "latest_message_id", None)
+        ]
+        messages = (
+            OneToOneMessage.objects.select_related("sender").in_bulk(message_ids)
+            if message_ids
+            else {}
+        )
+
+        for conversation in conversations:
+            conversation.latest_message = messages.get(
+                getattr(conversation, "latest_message_id", None)
+            )
+            # participants are prefetched, so this never hits the database
+            conversation.other_participants = [
+                participant
+                for participant in conversation.participants.all()
+                if participant.id != self.user.id
+            ]
+        return conversations
+
+    def enrich(self, conversations, data):
+        """Add the UI-only fields to serialized conversations"""
+        by_id = {conversation.id: conversation for conversation in conversations}
+        for conversation_data in data:
+            conversation = by_id.get(conversation_data["id"])
+            if conversation is None:
+                continue
+
+            conversation_data["other_participants"] = [
+                {
+                    "id": participant.id,
+                    "username": participant.username,
+                    "first_name": participant.first_name,
+                    "last_name": participant.last_name,
+                    "email": participant.email,
+                }
+                for participant in conversation.other_participants
+            ]
+
+            latest_message = conversation.latest_message
+            if latest_message:
+                conversation_data["latest_message"] = {
+                    "id": latest_message.id,
+                    "content": self.preview(latest_message.content),
+                    "timestamp": latest_message.timestamp,
+                    "is_from_current_user": latest_message.sender_id == self.user.id,
+                    "sender_name": latest_message.sender.get_full_name()
+                    or latest_message.sender.username,
+                }
+        return data
+
+    @staticmethod
+    def preview(content):
+        """Truncate message content for list previews"""
+        return content[:PREVIEW_LENGTH] + (
+            "..." if len(content) > PREVIEW_LENGTH else ""
+        )
@@ -0,0 +1,144 @@
+# messaging/services/membership.py
+from django.core.cache import cache
+from django.db import transaction
+import logging
+
+from ..models.chatbot import ChatbotConversation
+from ..models.group import GroupConversation
+from ..models.one_to_one import OneToOneConversation
+
+logger = logging.getLogger(__name__)
+
+MEMBERSHIP_CACHE_TIMEOUT = 3600
+
+# Conversation kind per model; ids are only unique within a kind
+CONVERSATION_KINDS = {
+    OneToOneConversation: "one_to_one",
+    GroupConversation: "group",
+    ChatbotConversation: "chatbot",
+}
+
+# Channel layer group prefix per kind, e.g. dm_12, group_12, bot_12
+GROUP_PREFIXES = {
+    "one_to_one": "dm",
+    "group": "group",
+    "chatbot": "bot",
+}
+
+
+def conversation_group_name(kind, conversation_id):
+    """Websocket group of a conversation; the kind disambiguates colliding ids"""
+    return f"{GROUP_PREFIXES[kind]}_{conversation_id}"
+
+
+def group_name_for(conversation_model, conversation_id):
+    return conversation_group_name(
+        CONVERSATION_KINDS[conversation_model], conversation_id
+    )
+
+
+def membership_version_key(user_id):
+    return f"conversation_membership_version_{user_id}"
+
+
+class ConversationMembershipService:
+    """
+    Per-user index of the conversations a user belongs to, by kind, plus the
+    groups they moderate. Authorization checks (websocket connect, DRF
+    permissions) read it from the cache instead of querying the
+    participants tables; participant and moderator changes bump the user's
+    version so the next check rebuilds it.
+    """
+
+    def memberships(self, user_id):
+        """{"one_to_one": ids, "group": ids, "chatbot": ids, "moderator": ids}"""
+        version = cache.get_or_set(membership_version_key(user_id), 1, timeout=None)
+        key = f"conversation_membership_{user_id}_v{version}"
+        memberships = cache.get(key)
+        if memberships is None:
+            memberships = self._load(user_id)
+            cache.set(key, memberships, timeout=MEMBERSHIP_CACHE_TIMEOUT)
+        return memberships
+
+    def _load(self, user_id):
+        return {
+            "one_to_one": frozenset(
+                OneToOneConversation.objects.filter(
+                    participants__id=user_id
+                ).values_list("id", flat=True)
+            ),
+            "group": frozenset(
+                GroupConversation.objects.filter(participants__id=user_id).values_list(
+                    "id", flat=True
+                )
+            ),
+            "moderator": frozenset(
+                GroupConversation.objects.filter(moderators__id=user_id).values_list(
+                    "id", flat=True
+                )
+            ),
+            "chatbot": frozenset(
+                ChatbotConversation.objects.filter(user_id=user_id).values_list(
+                    "id", flat=True
+                )
+            ),
+        }
+
+    @staticmethod
+    def kind_of(conversation):
+        return CONVERSATION_KINDS.get(type(conversation))
+
+    def is_participant(self, user_id, conversation):
+        kind = self.kind_of(conversation)
+        if kind is None:
+            logger.warning(f"Unknown conversation type {type(conversation).__name__}")
+            return False
+        return conversation.pk in self.memberships(user_id)[kind]
+
+    def is_moderator(self, user_id, conversation):
+        return (
+            self.kind_of(conversation) == "group"
+            and conversation.pk in self.memberships(user_id)["moderator"]
+        )
+
+    def is_member(self, user_id, kind, conversation_id):
+        """Single indexed lookup for a conversation of a known kind"""
+        try:
+            conversation_id = int(conversation_id)
+        except (TypeError, ValueError):
+            return False
+        return conversation_id in self.memberships(user_id).get(kind, ())
+
+    def conversation_kinds(self, user_id, conversation_id):
+        """Kinds of the conversations with this id that the user belongs to"""
+        try:
+            conversation_id = int(conversation_id)
+        except (TypeError, ValueError):
+            return []
+        memberships = self.memberships(user_id)
+        return [
+            kind
+            for kind in CONVERSATION_KINDS.values()
+            if conversation_id in memberships[kind]
+        ]
+
+    def invalidate(self, *user_ids):
+        """
+        Rebuild the users' index on next use. Repeated once the transaction
+        commits so that a concurrent rebuild cannot cache uncommitted state.
+        """
+        self._bump(user_ids)
+        transaction.on_commit(lambda: self._bump(user_ids))
+
+    @staticmethod
+    def _bump(user_ids):
+        for user_id in user_ids:
+            key = membership_version_key(user_id)
+            if not cache.add(key, 2, timeout=None):
+                try:
+                    cache.incr(key)
+                except ValueError:
+                    cache.set(key, 2, timeout=None)
+
+
+membership_service = ConversationMembershipService()
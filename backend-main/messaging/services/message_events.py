@@ -0,0 +1,162 @@
+# messaging/services/message_events.py
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+import logging
+
+from ..models.group import GroupMessage
+from .group_summary import group_summary_service
+from .membership import group_name_for
+
+logger = logging.getLogger(__name__)
+
+
+class MessageEventService:
+    """
+    Single pipeline for the side effects of a message being saved or deleted:
+    one UPDATE of the conversation row and one websocket event, published
+    once the surrounding transaction commits.
+
+    Events are the only websocket broadcast of message changes. Content
+    longer than MAX_CONTENT_LENGTH is cut (clients fetch the full message
+    when `truncated` is set). new_message and message_deleted events are
+    always sent; each conversation may publish at most RATE_LIMIT
+    message_update events per RATE_WINDOW seconds. The first update over the
+    limit is replaced by one `resync` event, after which clients refetch,
+    and the remaining updates of the window are skipped.
+    """
+
+    def __init__(self):
+        event_settings = getattr(settings, "MESSAGE_EVENT_SETTINGS", {})
+        self.max_content_length = event_settings.get("MAX_CONTENT_LENGTH", 4000)
+        self.rate_limit = event_settings.get("RATE_LIMIT", 60)
+        self.rate_window = event_settings.get("RATE_WINDOW", 10)
+
+    def message_saved(self, message, created):
+        """Touch the conversation and publish new or edited messages"""
+        changes = {"last_activity": timezone.now()}
+        if created:
+            changes["message_count"] = F("message_count") + 1
+        if isinstance(message, GroupMessage):
+            changes.update(group_summary_service.saved_changes(message, created))
+        self._conversations(message).update(**changes)
+
+        # The tracker still holds the loaded values during post_save, so
+        # saves that did not touch the content are not re-broadcast
+        if created:
+            self.publish(message, "new_message")
+        elif message.tracker.has_changed("content"):
+            self.publish(message, "message_update")
+
+    def message_deleted(self, message):
+        """Touch the conversation, keep its message counter in step and publish"""
+        self._conversations(message).update(
+            last_activity=timezone.now(),
+            message_count=Greatest(F("message_count") - 1, 0),
+        )
+        if isinstance(message, GroupMessage):
+            group_summary_service.message_deleted(message)
+        self._publish(
+            message,
+            {
+                "type": "conversation_message",
+                "message": {
+                    "event_type": "message_deleted",
+                    "id": str(message.id),
+                    "sender_id": str(message.sender_id) if message.sender_id else None,
+                    "conversation_id": str(message.conversation_id),
+                    "timestamp": timezone.now().isoformat(),
+                },
+            },
+        )
+
+    def build_payload(self, message, event_type):
+        """Websocket event for a message, matching ConversationConsumer"""
+        sender = message.sender
+        content = message.content or ""
+        truncated = len(content) > self.max_content_length
+        return {
+            "type": "conversation_message",  # Match the consumer method name
+            "message": {
+                "event_type": event_type,
+                "id": str(message.id),
+                "content": content[: self.max_content_length],
+                "truncated": truncated,
+                "sender_id": str(sender.id) if sender else None,
+                "sender_name": sender.username if sender else "System",
+                "timestamp": message.timestamp.isoformat(),
+                "conversation_id": str(message.conversation_id),
+                "message_type": getattr(message, "message_type", "text"),
+                "is_edited": getattr(message, "edited", False),
+                "is_bot": getattr(message, "is_bot", False),
+            },
+        }
+
+    def publish(self, message, event_type):
+        """Send the message event to its conversation after commit"""
+        self._publish(message, self.build_payload(message, event_type))
+
+    def _publish(self, message, payload):
+        group_name = group_name_for(
+            message._meta.get_field("conversation").related_model,
+            message.conversation_id,
+        )
+        transaction.on_commit(lambda: self._send(group_name, payload))
+
+    # Events that are always delivered; dropping one would lose a message
+    UNTHROTTLED_EVENTS = ("new_message", "message_deleted")
+
+    def event_count(self, group_name):
+        """Fixed-window event counter per conversation group"""
+        window = int(timezone.now().timestamp()) // self.rate_window
+        key = f"message_events_rate_{group_name}_{window}"
+        cache.add(key, 0, timeout=self.rate_window * 2)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Expired between add and incr; count this event as the first
+            cache.set(key, 1, timeout=self.rate_window * 2)
+            return 1
+
+    def _send(self, group_name, payload):
+        try:
+            channel_layer = get_channel_layer()
+            if not channel_layer:
+                logger.error("Channel layer not available")
+                return
+
+            message = payload["message"]
+            if message["event_type"] not in self.UNTHROTTLED_EVENTS:
+                count = self.event_count(group_name)
+                if count == self.rate_limit + 1:
+                    logger.warning(
+                        f"Event rate limit reached for {group_name}, sending "
+                        f"resync instead of updates for the rest of the "
+                        f"{self.rate_window}s window"
+                    )
+                    payload = {
+                        "type": "resync",
+                        "conversation_id": message["conversation_id"],
+                    }
+                elif count > self.rate_limit:
+                    return
+
+            async_to_sync(channel_layer.group_send)(group_name, payload)
+            logger.debug(
+                f"Sent WebSocket {message['event_type']} for message {message['id']}"
+            )
+        except Exception as e:
+            logger.error(f"Error sending WebSocket message: {str(e)}", exc_info=True)
+
+    @staticmethod
+    def _conversations(message):
+        Conversation = message._meta.get_field("conversation").related_model
+        return Conversation.objects.filter(pk=message.conversation_id)
+
+
+message_event_service = MessageEventService()
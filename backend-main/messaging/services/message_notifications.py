@@ -0,0 +1,145 @@
+# messaging/services/message_notifications.py
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+import logging
+
+from notifications.services import notification_service
+
+from ..models.one_to_one import OneToOneConversation, OneToOneMessage
+from .read_state import read_state_service
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+PREVIEW_LENGTH = 100
+
+
+def get_coalesce_window():
+    """Seconds during which new messages fold into one notification"""
+    return getattr(settings, "MESSAGE_SETTINGS", {}).get(
+        "NOTIFICATION_COALESCE_WINDOW", 30
+    )
+
+
+class MessageNotificationService:
+    """
+    Notifies recipients of new one-to-one messages from Celery, outside the
+    request that sent the message.
+
+    Messages arriving in a conversation while a notification for the same
+    recipient is pending are only counted; when the coalescing window ends a
+    single notification ("N new messages") is sent for the whole burst.
+    """
+
+    def _keys(self, user_id, conversation_id):
+        prefix = f"message_notifications_{user_id}_{conversation_id}"
+        return f"{prefix}_scheduled", f"{prefix}_count"
+
+    def queue(self, message_id):
+        """
+        Count a new message for every recipient. Returns the conversation id
+        and the recipients that need a flush scheduled, i.e. those for whom
+        this message starts a burst.
+        """
+        message = OneToOneMessage.objects.filter(id=message_id).first()
+        if message is None:
+            return None, []
+
+        window = get_coalesce_window()
+        recipient_ids = message.conversation.participants.exclude(
+            id=message.sender_id
+        ).values_list("id", flat=True)
+
+        to_schedule = []
+        for user_id in recipient_ids:
+            scheduled_key, count_key = self._keys(user_id, message.conversation_id)
+            cache.add(count_key, 0, timeout=window * 4)
+            cache.incr(count_key)
+            if cache.add(scheduled_key, True, timeout=window * 2):
+                to_schedule.append(user_id)
+        return message.conversation_id, to_schedule
+
+    def flush(self, user_id, conversation_id):
+        """Send one notification for the messages counted since the last flush"""
+        scheduled_key, count_key = self._keys(user_id, conversation_id)
+        # Messages arriving from now on schedule their own flush
+        cache.delete(scheduled_key)
+        count = cache.get(count_key) or 0
+        if not count:
+            return None
+        cache.decr(count_key, count)
+
+        conversation = OneToOneConversation.objects.filter(
+            id=conversation_id, participants__id=user_id
+        ).first()
+        recipient = User.objects.filter(id=user_id).first()
+        if conversation is None or recipient is None:
+            return None
+
+        # Nothing to announce if the recipient has caught up in the meantime
+        if (
+            not read_state_service.states_for(conversation)
+            .filter(user_id=user_id, unread_count__gt=0)
+            .exists()
+        ):
+            return None
+
+        latest_message = (
+            conversation.messages.exclude(sender_id=user_id)
+            .select_related("sender")
+            .order_by("-timestamp", "-id")
+            .first()
+        )
+        if latest_message is None:
+            return None
+
+        return self._send(recipient, conversation, latest_message, count)
+
+    def _send(self, recipient, conversation, latest_message, count):
+        sender = latest_message.sender
+        sender_name = sender.get_full_name() or sender.username
+        preview = latest_message.content[:PREVIEW_LENGTH] + (
+            "..." if len(latest_message.content) > PREVIEW_LENGTH else ""
+        )
+
+        if count == 1:
+            title = "New Message"
+            message = f"You have a new message: {preview}"
+        else:
+            title = "New Messages"
+            message = f"You have {count} new messages from {sender_name}"
+
+        notification = notification_service.send_notification(
+            user=recipient,
+            notification_type_name="new_message",
+            title=title,
+            message=message,
+            metadata={
+                "conversation_id": str(conversation.id),
+                "message_id": str(latest_message.id),
+                "message_count": count,
+                "sender_id": str(sender.id),
+                "message_preview": preview,
+                "category": "message",
+                "link": f"/conversations/{conversation.id}/",
+                "sender_name": sender_name,
+            },
+            send_email=True,
+            send_in_app=True,
+            priority="high",
+        )
+
+        if notification:
+            logger.info(
+                f"Sent notification for {count} message(s) in conversation "
+                f"{conversation.id} to user {recipient.id}"
+            )
+        else:
+            logger.warning(
+                f"Notification not sent to user {recipient.id} - possibly disabled by user preferences"
+            )
+        return notification
+
+
+message_notification_service = MessageNotificationService()
@@ -0,0 +1,163 @@
+# messaging/services/presence.py
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+import logging
+
+from .membership import conversation_group_name
+
+logger = logging.getLogger(__name__)
+
+
+def _presence_key(user_id, slot):
+    return f"presence_{user_id}_{slot}"
+
+
+def _typing_key(kind, conversation_id, user_id):
+    return f"typing_{kind}_{conversation_id}_{user_id}"
+
+
+class PresenceService:
+    """
+    Online status and typing indicators, kept only in the cache and the
+    channel layer; nothing here touches the database.
+
+    A user is online while at least one of their websockets has sent a
+    heartbeat within PRESENCE_TIMEOUT. Each socket holds its own key, one of
+    MAX_SOCKETS_PER_USER slots claimed atomically with cache.add and expiring
+    on its own, so sockets of the same user never overwrite each other and
+    sockets of a crashed process disappear after the timeout. All slots of a
+    user are read with one get_many.
+
+    Typing is debounced: repeated "typing" signals only extend an expiring
+    key, and the conversation is notified when typing starts or stops.
+    Clients treat a start event as lapsed after `expires_in` seconds.
+    """
+
+    def __init__(self):
+        presence_settings = getattr(settings, "PRESENCE_SETTINGS", {})
+        self.heartbeat_interval = presence_settings.get("HEARTBEAT_INTERVAL", 25)
+        self.presence_timeout = presence_settings.get("PRESENCE_TIMEOUT", 60)
+        self.typing_timeout = presence_settings.get("TYPING_TIMEOUT", 6)
+        self.max_sockets = presence_settings.get("MAX_SOCKETS_PER_USER", 10)
+
+    # Presence
+
+    def _slots(self, user_id):
+        """{key: channel_name or None} of every presence slot of the user"""
+        keys = [_presence_key(user_id, slot) for slot in range(self.max_sockets)]
+        found = cache.get_many(keys)
+        return {key: found.get(key) for key in keys}
+
+    def heartbeat(self, user_id, channel_name):
+        """
+        Register or refresh a socket. Returns True when the user was offline
+        before this call.
+        """
+        slots = self._slots(user_id)
+        for key, channel in slots.items():
+            if channel == channel_name and cache.touch(
+                key, timeout=self.presence_timeout
+            ):
+                return False
+        was_online = any(
+            channel not in (None, channel_name) for channel in slots.values()
+        )
+        for key, channel in slots.items():
+            if channel in (None, channel_name) and cache.add(
+                key, channel_name, timeout=self.presence_timeout
+            ):
+                return not was_online
+        logger.warning(f"No free presence slot for user {user_id}")
+        return not was_online
+
+    def disconnect(self, user_id, channel_name):
+        """Forget a socket. Returns True when the user has no live socket left."""
+        online = False
+        for key, channel in self._slots(user_id).items():
+            if channel == channel_name:
+                cache.delete(key)
+            elif channel is not None:
+                online = True
+        return not online
+
+    def is_online(self, user_id):
+        return any(self._slots(user_id).values())
+
+    def online_users(self, user_ids):
+        """{user_id: online} for several users with one cache round trip"""
+        keys = {
+            _presence_key(user_id, slot): user_id
+            for user_id in user_ids
+            for slot in range(self.max_sockets)
+        }
+        online = dict.fromkeys(user_ids, False)
+        for key in cache.get_many(keys):
+            online[keys[key]] = True
+        return online
+
+    # Typing
+
+    @staticmethod
+    def parse_is_typing(value):
+        """`is_typing` of a REST request or websocket frame as a bool"""
+        if isinstance(value, str):
+            return value.strip().lower() not in ("", "false", "0", "no", "off")
+        return bool(value)
+
+    def set_typing(self, user_id, kind, conversation_id, is_typing=True):
+        """
+        Record a typing signal. Returns True when the state changed (typing
+        started or stopped) and the conversation should be notified.
+        """
+        key = _typing_key(kind, conversation_id, user_id)
+        if not is_typing:
+            return cache.delete(key)
+        if cache.add(key, True, timeout=self.typing_timeout):
+            return True
+        cache.touch(key, timeout=self.typing_timeout)
+        return False
+
+    def typing_event(self, user_id, username, kind, conversation_id, is_typing):
+        return {
+            "type": "typing_indicator",
+            "user_id": user_id,
+            "username": username,
+            "conversation_id": int(conversation_id),
+            "is_typing": is_typing,
+            "expires_in": self.typing_timeout if is_typing else 0,
+        }
+
+    def presence_event(self, user_id, username, online):
+        return {
+            "type": "presence_update",
+            "user_id": user_id,
+            "username": username,
+            "online": online,
+        }
+
+    def broadcast_typing(self, user, kind, conversation_id, is_typing=True):
+        """set_typing for synchronous callers, notifying the group on changes"""
+        if not self.set_typing(user.id, kind, conversation_id, is_typing):
+            return False
+        try:
+            channel_layer = get_channel_layer()
+            if not channel_layer:
+                logger.error("Channel layer not available")
+                return False
+            async_to_sync(channel_layer.group_send)(
+                conversation_group_name(kind, conversation_id),
+                self.typing_event(
+                    user.id, user.username, kind, conversation_id, is_typing
+                ),
+            )
+            return True
+        except Exception as e:
+            logger.error(
+                f"Error broadcasting typing indicator: {str(e)}", exc_info=True
+            )
+            return False
+
+
+presence_service = PresenceService()
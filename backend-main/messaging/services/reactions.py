@@ -0,0 +1,115 @@
+# messaging/services/reactions.py
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.utils import timezone
+import logging
+
+from ..models.reaction import REACTION_TYPES, MessageReaction
+
+logger = logging.getLogger(__name__)
+
+
+class ReactionService:
+    """
+    Reads and writes MessageReaction rows. Every change is one statement
+    (INSERT ... ON CONFLICT DO NOTHING or DELETE), and reactions of a whole
+    page of messages are loaded with one query.
+    """
+
+    valid_reactions = REACTION_TYPES
+
+    def add(self, message, user, reaction_type):
+        """Add a reaction; returns False when the user already reacted so"""
+        if reaction_type not in self.valid_reactions:
+            raise ValueError(f"Invalid reaction type: {reaction_type}")
+
+        content_type = ContentType.objects.get_for_model(message)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {MessageReaction._meta.db_table} "
+                "(content_type_id, object_id, user_id, reaction_type, created_at) "
+                "VALUES (%s, %s, %s, %s, %s) "
+                "ON CONFLICT DO NOTHING RETURNING id",
+                [content_type.id, message.pk, user.id, reaction_type, timezone.now()],
+            )
+            row = cursor.fetchone()
+
+        if row and message.sender_id and message.sender_id != user.id:
+            from ..tasks import send_reaction_notification
+
+            reaction_id = row[0]
+            transaction.on_commit(lambda: send_reaction_notification.delay(reaction_id))
+        return row is not None
+
+    def remove(self, message, user, reaction_type=None):
+        """Remove a user's reaction (all of them without a type); returns the count"""
+        reactions = MessageReaction.objects.filter(
+            content_type=ContentType.objects.get_for_model(message),
+            object_id=message.pk,
+            user_id=user.id,
+        )
+        if reaction_type:
+            reactions = reactions.filter(reaction_type=reaction_type)
+        # No cascades or signals, so Django issues a single DELETE
+        deleted, _ = reactions.delete()
+        return deleted
+
+    def for_messages(self, messages):
+        """
+        {message_id: [{"reaction_type", "user_id", "username", "name"}, ...]}
+        for messages of one model, oldest reaction first.
+        """
+        messages = list(messages)
+        if not messages:
+            return {}
+        rows = (
+            MessageReaction.objects.filter(
+                content_type=ContentType.objects.get_for_model(messages[0]),
+                object_id__in=[message.pk for message in messages],
+            )
+            .order_by("created_at", "id")
+            .values(
+                "object_id",
+                "reaction_type",
+                "user_id",
+                "user__username",
+                "user__first_name",
+                "user__last_name",
+            )
+        )
+        reactions = {}
+        for row in rows:
+            name = f"{row['user__first_name'] or ''} {row['user__last_name'] or ''}"
+            reactions.setdefault(row["object_id"], []).append(
+                {
+                    "reaction_type": row["reaction_type"],
+                    "user_id": str(row["user_id"]),
+                    "username": row["user__username"],
+                    "name": name.strip() or row["user__username"],
+                }
+            )
+        return reactions
+
+    @staticmethod
+    def by_type(reactions):
+        """{reaction_type: [user_id, ...]}, the API's reactions format"""
+        grouped = {}
+        for reaction in reactions:
+            grouped.setdefault(reaction["reaction_type"], []).append(
+                reaction["user_id"]
+            )
+        return grouped
+
+    def summary(self, message):
+        """Reactions of one message, by type, with per-type counts"""
+        reactions = self.by_type(self.for_messages([message]).get(message.pk, []))
+        return {
+            "reactions": reactions,
+            "counts": {
+                reaction_type: len(user_ids)
+                for reaction_type, user_ids in reactions.items()
+            },
+        }
+
+
+reaction_service = ReactionService()
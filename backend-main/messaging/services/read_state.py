@@ -0,0 +1,272 @@
+# messaging/services/read_state.py
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+import logging
+
+from ..models.group import GroupConversation
+from ..models.one_to_one import OneToOneConversation
+from ..models.read_state import ConversationReadState
+from .membership import group_name_for
+
+logger = logging.getLogger(__name__)
+
+# Conversation models that keep per-user read state, keyed by API type name
+CONVERSATION_TYPES = {
+    OneToOneConversation: "one_to_one",
+    GroupConversation: "group",
+}
+
+# Larger receipts only carry the watermark; clients treat it as "read up to"
+MAX_RECEIPT_MESSAGE_IDS = 100
+
+# Read receipts stored by a user's first mark_read in a conversation
+MAX_INITIAL_READ_RECEIPTS = 500
+
+
+class ReadStateService:
+    """Maintains ConversationReadState watermarks and unread counters"""
+
+    def states_for(self, conversation):
+        """Read states of every user in a conversation"""
+        return ConversationReadState.objects.filter(
+            content_type=ContentType.objects.get_for_model(conversation),
+            object_id=conversation.pk,
+        )
+
+    def unread_count_subquery(self, model, user):
+        """Annotation expression returning the user's unread count per conversation"""
+        return Coalesce(
+            Subquery(
+                ConversationReadState.objects.filter(
+                    user=user,
+                    content_type=ContentType.objects.get_for_model(model),
+                    object_id=OuterRef("pk"),
+                ).values("unread_count")[:1],
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+
+    def read_count_subquery(self, message_model):
+        """Annotation expression returning the number of read receipts per message"""
+        read_by = message_model._meta.get_field("read_by")
+        message_field = read_by.m2m_field_name()
+        return Coalesce(
+            Subquery(
+                read_by.remote_field.through.objects.filter(
+                    **{message_field: OuterRef("pk")}
+                )
+                .values(message_field)
+                .annotate(count=Count("*"))
+                .values("count"),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+
+    def watermark(self, user, model, conversation_id):
+        """The user's read watermark and unread counter in one conversation"""
+        state = (
+            ConversationReadState.objects.filter(
+                user=user,
+                content_type=ContentType.objects.get_for_model(model),
+                object_id=conversation_id,
+            )
+            .values("last_read_message_id", "last_read_at", "unread_count")
+            .first()
+        )
+        return state or {
+            "last_read_message_id": None,
+            "last_read_at": None,
+            "unread_count": 0,
+        }
+
+    @transaction.atomic
+    def record_message(self, message):
+        """Bump the unread counter of every recipient of a new message"""
+        conversation = message.conversation
+        content_type = ContentType.objects.get_for_model(conversation)
+
+        recipient_ids = list(
+            conversation.participants.exclude(id=message.sender_id).values_list(
+                "id", flat=True
+            )
+        )
+        if not recipient_ids:
+            return
+
+        ConversationReadState.objects.bulk_create(
+            [
+                ConversationReadState(
+                    user_id=user_id,
+                    content_type=content_type,
+                    object_id=conversation.pk,
+                )
+                for user_id in recipient_ids
+            ],
+            ignore_conflicts=True,
+        )
+        ConversationReadState.objects.filter(
+            content_type=content_type,
+            object_id=conversation.pk,
+            user_id__in=recipient_ids,
+        ).update(unread_count=F("unread_count") + 1)
+
+    @transaction.atomic
+    def mark_read(self, user, conversation, message=None):
+        """
+        Mark the conversation read by `user` up to `message` (default: the
+        latest message).
+
+        Every message between the previous watermark and `message` gets its
+        read receipt in a single bulk insert, the watermark advances and the
+        unread counter is recomputed. The watermark never moves backwards.
+
+        Returns the aggregated read receipt to broadcast, or None when
+        nothing new was read.
+        """
+        if message is None:
+            message = conversation.messages.order_by("-timestamp", "-id").first()
+            if message is None:
+                return None
+
+        state, _ = ConversationReadState.objects.select_for_update().get_or_create(
+            user=user,
+            content_type=ContentType.objects.get_for_model(conversation),
+            object_id=conversation.pk,
+        )
+
+        if state.last_read_at and (state.last_read_at, state.last_read_message_id) >= (
+            message.timestamp,
+            message.id,
+        ):
+            return None
+
+        newly_read = conversation.messages.filter(
+            Q(timestamp__lt=message.timestamp)
+            | Q(timestamp=message.timestamp, id__lte=message.id)
+        ).exclude(sender=user)
+        watermark = (state.last_read_at, state.last_read_message_id)
+        if state.last_read_at is None:
+            # No watermark yet: start after the latest receipt the user has
+            latest_receipt = (
+                conversation.messages.filter(read_by=user)
+                .order_by("-timestamp", "-id")
+                .values_list("timestamp", "id")
+                .first()
+            )
+            watermark = latest_receipt or watermark
+        if watermark[0] is not None:
+            newly_read = newly_read.filter(
+                Q(timestamp__gt=watermark[0])
+                | Q(timestamp=watermark[0], id__gt=watermark[1])
+            )
+            message_ids = list(
+                newly_read.order_by("timestamp", "id").values_list("id", flat=True)
+            )
+        else:
+            # Never read anything: receipts for the latest messages only, the
+            # watermark covers the older history
+            message_ids = list(
+                newly_read.order_by("-timestamp", "-id").values_list("id", flat=True)[
+                    :MAX_INITIAL_READ_RECEIPTS
+                ]
+            )[::-1]
+        self._add_read_receipts(conversation.messages.model, user, message_ids)
+
+        state.last_read_message_id = message.id
+        state.last_read_at = message.timestamp
+        state.unread_count = (
+            conversation.messages.filter(
+                Q(timestamp__gt=message.timestamp)
+                | Q(timestamp=message.timestamp, id__gt=message.id)
+            )
+            .exclude(sender=user)
+            .count()
+        )
+        state.save(
+            update_fields=[
+                "last_read_message_id",
+                "last_read_at",
+                "unread_count",
+                "updated_at",
+            ]
+        )
+
+        return {
+            "user_id": str(user.id),
+            "username": user.username,
+            "conversation_id": str(conversation.pk),
+            "message_id": str(message.id),
+            "message_ids": [str(message_id) for message_id in message_ids]
+            if len(message_ids) <= MAX_RECEIPT_MESSAGE_IDS
+            else [],
+            "read_count": len(message_ids),
+        }
+
+    def _add_read_receipts(self, message_model, user, message_ids):
+        """Insert read_by rows for all messages with one statement"""
+        if not message_ids:
+            return
+
+        read_by = message_model._meta.get_field("read_by")
+        ReadReceipt = read_by.remote_field.through
+        message_field = f"{read_by.m2m_field_name()}_id"
+        user_field = f"{read_by.m2m_reverse_field_name()}_id"
+
+        ReadReceipt.objects.bulk_create(
+            [
+                ReadReceipt(**{message_field: message_id, user_field: user.id})
+                for message_id in message_ids
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+    def broadcast_read_receipt(self, conversation, receipt):
+        """Send one aggregated read_receipt event to the conversation group"""
+        if not receipt:
+            return
+        try:
+            channel_layer = get_channel_layer()
+            if not channel_layer:
+                logger.error("Channel layer not available")
+                return
+            async_to_sync(channel_layer.group_send)(
+                group_name_for(type(conversation), conversation.pk),
+                {"type": "read_receipt", **receipt},
+            )
+        except Exception as e:
+            logger.error(f"Error broadcasting read receipt: {str(e)}", exc_info=True)
+
+    def unread_summary(self, user):
+        """Unread counters of the user across all conversations"""
+        types_by_content_type = {
+            ContentType.objects.get_for_model(model).id: type_name
+            for model, type_name in CONVERSATION_TYPES.items()
+        }
+        states = ConversationReadState.objects.filter(
+            user=user, unread_count__gt=0
+        ).values("content_type_id", "object_id", "unread_count", "last_read_message_id")
+
+        conversations = [
+            {
+                "type": types_by_content_type.get(state["content_type_id"]),
+                "id": state["object_id"],
+                "unread_count": state["unread_count"],
+                "last_read_message_id": state["last_read_message_id"],
+            }
+            for state in states
+            if state["content_type_id"] in types_by_content_type
+        ]
+        return {
+            "total": sum(entry["unread_count"] for entry in conversations),
+            "conversations": conversations,
+        }
+
+
+read_state_service = ReadStateService()
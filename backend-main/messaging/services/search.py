@@ -0,0 +1,133 @@
+# messaging/services/search.py
+import html
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F
+import logging
+
+from ..models.chatbot import ChatbotMessage
+from ..models.group import GroupMessage
+from ..models.one_to_one import OneToOneMessage
+from .membership import membership_service
+
+logger = logging.getLogger(__name__)
+
+# Must match the configuration of the search_vector triggers (migration 0010)
+SEARCH_CONFIG = "english"
+
+MESSAGE_MODELS = {
+    "one_to_one": OneToOneMessage,
+    "group": GroupMessage,
+    "chatbot": ChatbotMessage,
+}
+
+# Ranked results are paged by offset; deep pages are not worth their cost
+MAX_SEARCH_RESULTS = 500
+
+# Private-use markers around matches, turned into <mark> after escaping
+_START_SEL = "\ue000"
+_STOP_SEL = "\ue001"
+
+
+class MessageSearchService:
+    """
+    Full-text message search over the search_vector columns.
+
+    Matching uses the GIN index; only matching rows are ranked, and
+    highlighted snippets are only built for the requested page. Searching
+    all of a user's chats takes the conversation ids from the cached
+    membership index and merges the per-kind top results by rank.
+    """
+
+    def parse_query(self, text):
+        """Web-search syntax: quoted phrases, OR and -excluded words"""
+        return SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+
+    def _ranked(self, kind, conversation_ids, query, limit):
+        model = MESSAGE_MODELS[kind]
+        rows = (
+            model.objects.filter(
+                conversation_id__in=conversation_ids,
+                search_vector=query,
+                deleted=False,
+            )
+            .annotate(
+                rank=SearchRank(F("search_vector"), query),
+                # Postgres evaluates the headline after ORDER BY ... LIMIT
+                snippet=SearchHeadline(
+                    "content",
+                    query,
+                    config=SEARCH_CONFIG,
+                    start_sel=_START_SEL,
+                    stop_sel=_STOP_SEL,
+                    max_fragments=2,
+                    max_words=20,
+                    min_words=8,
+                ),
+            )
+            .order_by("-rank", "-timestamp", "-id")
+            .values(
+                "id",
+                "conversation_id",
+                "sender_id",
+                "sender__username",
+                "timestamp",
+                "message_type",
+                "rank",
+                "snippet",
+            )[:limit]
+        )
+        return [self._result(kind, row) for row in rows]
+
+    @staticmethod
+    def _result(kind, row):
+        snippet = (
+            html.escape(row["snippet"] or "")
+            .replace(_START_SEL, "<mark>")
+            .replace(_STOP_SEL, "</mark>")
+        )
+        return {
+            "kind": kind,
+            "id": row["id"],
+            "conversation_id": row["conversation_id"],
+            "sender_id": row["sender_id"],
+            "sender_name": row["sender__username"],
+            "timestamp": row["timestamp"].isoformat(),
+            "message_type": row["message_type"],
+            "rank": round(row["rank"], 6),
+            "snippet": snippet,
+        }
+
+    def _page(self, results, page, page_size):
+        offset = (page - 1) * page_size
+        return {
+            "results": results[offset : offset + page_size],
+            "page": page,
+            "page_size": page_size,
+            "has_more": len(results) > offset + page_size,
+        }
+
+    def search_conversation(self, kind, conversation_id, text, page, page_size):
+        """Ranked page of matches in one conversation"""
+        limit = page * page_size + 1
+        results = self._ranked(kind, [conversation_id], self.parse_query(text), limit)
+        return self._page(results, page, page_size)
+
+    def search_all(self, user_id, text, page, page_size, kinds=None):
+        """Ranked page of matches across every conversation of the user"""
+        query = self.parse_query(text)
+        memberships = membership_service.memberships(user_id)
+        limit = page * page_size + 1
+
+        results = []
+        for kind in kinds or MESSAGE_MODELS:
+            conversation_ids = memberships.get(kind)
+            if conversation_ids:
+                results.extend(self._ranked(kind, conversation_ids, query, limit))
+
+        results.sort(
+            key=lambda result: (result["rank"], result["timestamp"]), reverse=True
+        )
+        return self._page(results, page, page_size)
+
+
+message_search_service = MessageSearchService()
@@ -0,0 +1,2 @@
+# messaging/signals/__init__.py
+from . import handlers  # noqa: F401
@@ -1,178 +1,175 @@
 # messaging/signals/handlers.py
-from django.db.models.signals import post_save, pre_save
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
 from django.dispatch import receiver
-from django.core.cache import cache
-from django.utils import timezone
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-
-from ..models.base import BaseMessage
-from ..models.one_to_one import OneToOneMessage
-from ..models.group import GroupMessage
-from ..models.chatbot import ChatbotMessage
-from notifications.services import UnifiedNotificationService
+
+from ..middleware import invalidate_user_snapshot
+from ..models.one_to_one import OneToOneConversation, OneToOneMessage
+from ..models.group import GroupConversation, GroupMessage
+from ..models.chatbot import ChatbotConversation, ChatbotMessage
+from ..services.edit_history import edit_history_service
+from ..services.group_summary import group_summary_service
+from ..services.membership import membership_service
+from ..services.message_events import message_event_service
+from ..services.read_state import read_state_service
+from ..tasks import queue_message_notifications, update_chatbot_summary
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@receiver([pre_save], sender=BaseMessage)
+@receiver(pre_save, sender=OneToOneMessage)
+@receiver(pre_save, sender=GroupMessage)
+@receiver(pre_save, sender=ChatbotMessage)
 def handle_message_edit(sender, instance, **kwargs):
     """Handle message edit tracking"""
     try:
-        if instance.pk:  # Only for existing messages
-            old_instance = sender.objects.get(pk=instance.pk)
-
-            # Check if content changed
-            if old_instance.content != instance.content:
-                # Clear cache
-                cache_key = f"message_edit_history_{instance.id}"
-                cache.delete(cache_key)
-
-                # Log edit
-                logger.info(
-                    f"Message {instance.id} edited by {instance.edited_by}"
-                    f" at {instance.edited_at}"
-                )
-
-            # Check if reactions changed
-            if old_instance.reactions != instance.reactions:
-                # Set a flag for post_save handlers to use
-                instance._reactions_changed = True
-
-                # Preserve last_reactor info for notifications if not already set
-                if (
-                    not hasattr(instance, "_last_reactor")
-                    or instance._last_reactor is None
-                ):
-                    instance._last_reactor = getattr(instance, "last_reactor", None)
-
-                logger.debug(f"Reactions changed for message {instance.id}")
+        # The tracker knows the loaded content, no need to re-read the row
+        if instance.pk and instance.tracker.has_changed("content"):
+            # Drop the cached rendered history
+            edit_history_service.invalidate(instance.id)
+
+            # Log edit
+            logger.info(
+                f"Message {instance.id} edited by {instance.edited_by_id}"
+                f" at {instance.edited_at}"
+            )
 
     except Exception as e:
         logger.error(f"Error handling message edit: {str(e)}", exc_info=True)
 
 
-@receiver([post_save], sender=BaseMessage)
-def handle_message_reaction(sender, instance, created, **kwargs):
-    """Handle reaction notifications and caching"""
+@receiver(post_save, sender=OneToOneMessage)
+@receiver(post_save, sender=GroupMessage)
+@receiver(post_save, sender=ChatbotMessage)
+def handle_message_saved(sender, instance, created, **kwargs):
+    """Update the conversation and broadcast the message in one pass"""
     try:
-        # Check if reactions changed using our flag from pre_save
-        if not created and getattr(instance, "_reactions_changed", False):
-            # Get the user who added/changed the reaction
-            reactor = getattr(instance, "_last_reactor", None)
-
-            # Skip if no reactor (happens during reaction removal)
-            if not reactor:
-                return
-
-            # Notify message sender if different from reactor
-            if reactor != instance.sender:
-                notification_service = UnifiedNotificationService()
-                notification_service.send_notification(
-                    user=instance.sender,
-                    notification_type_name="message_reaction",
-                    title="New Reaction",
-                    message=f"{reactor.get_full_name()} reacted to your message",
-                    metadata={
-                        "message_id": str(instance.id),
-                        "conversation_id": str(instance.conversation.id),
-                        "reactor_id": str(reactor.id),
-                        "reaction_type": getattr(
-                            instance, "last_reaction_type", "unknown"
-                        ),
-                        "message_preview": instance.content[:100],
-                    },
-                    send_email=False,
-                    send_in_app=True,
-                    priority="low",
-                )
-
-            # Update reactions cache
-            cache_key = f"message_reactions_{instance.id}"
-            cache.set(cache_key, instance.reactions, timeout=3600)
+        message_event_service.message_saved(instance, created)
+    except Exception as e:
+        logger.error(f"Error handling message event: {str(e)}", exc_info=True)
+
 
+@receiver(post_delete, sender=OneToOneMessage)
+@receiver(post_delete, sender=GroupMessage)
+@receiver(post_delete, sender=ChatbotMessage)
+def handle_message_deleted(sender, instance, **kwargs):
+    try:
+        message_event_service.message_deleted(instance)
     except Exception as e:
-        logger.error(f"Error handling message reaction: {str(e)}", exc_info=True)
+        logger.error(f"Error handling message deletion: {str(e)}", exc_info=True)
 
 
 @receiver(post_save, sender=OneToOneMessage)
 @receiver(post_save, sender=GroupMessage)
-@receiver(post_save, sender=ChatbotMessage)
-def update_conversation_on_message_change(sender, instance, created, **kwargs):
-    conversation = instance.conversation
-    conversation.last_activity = timezone.now()
-    conversation.save()
-
-    # Send WebSocket update only for new messages or edited messages
-    if created or getattr(instance, "edited", False):
+def update_read_state_on_message_create(sender, instance, created, **kwargs):
+    """Count a new message as unread for every other participant"""
+    if created:
         try:
-            channel_layer = get_channel_layer()
-            if not channel_layer:
-                logger.error("Channel layer not available")
-                return
-
-            event_type = "message_create" if created else "message_update"
-
-            message_data = {
-                "type": "conversation_message",  # Match the consumer method name
-                "message": {
-                    "event_type": event_type,
-                    "id": str(instance.id),
-                    "content": instance.content,
-                    "sender_id": str(instance.sender.id) if instance.sender else None,
-                    "sender_name": instance.sender.username
-                    if instance.sender
-                    else "System",
-                    "timestamp": instance.timestamp.isoformat(),
-                    "conversation_id": str(conversation.id),
-                    "message_type": getattr(instance, "message_type", "text"),
-                    "is_edited": getattr(instance, "edited", False),
-                },
-            }
-
-            async_to_sync(channel_layer.group_send)(
-                f"conversation_{conversation.id}", message_data
-            )
-
-            logger.debug(f"Sent WebSocket {event_type} for message {instance.id}")
-
+            read_state_service.record_message(instance)
         except Exception as e:
-            logger.error(f"Error sending WebSocket message: {str(e)}", exc_info=True)
+            logger.error(f"Error updating read state: {str(e)}", exc_info=True)
 
 
 @receiver(post_save, sender=OneToOneMessage)
-@receiver(post_save, sender=GroupMessage)
-def broadcast_message(sender, instance, created, **kwargs):
-    if created:  # Only for new messages
-        try:
-            channel_layer = get_channel_layer()
-            conversation_id = str(instance.conversation.id)
-
-            # Enhanced message data
-            message_data = {
-                "type": "conversation_message",
-                "message": {
-                    "id": str(instance.id),
-                    "content": instance.content,
-                    "sender_id": str(instance.sender.id),
-                    "sender_name": instance.sender.username,
-                    "conversation_id": conversation_id,
-                    "timestamp": instance.timestamp.isoformat(),
-                    "event_type": "new_message",
-                    "read_by": [],  # Initialize empty read receipts
-                    "message_type": getattr(instance, "message_type", "text"),
-                },
-            }
-
-            # Broadcast to the conversation group
-            async_to_sync(channel_layer.group_send)(
-                f"conversation_{conversation_id}", message_data
-            )
+def queue_notification_on_message_create(sender, instance, created, **kwargs):
+    """Hand the recipient notification to Celery once the message is committed"""
+    if created:
+        transaction.on_commit(lambda: _queue_message_notifications(instance.id))
 
-            logger.debug(
-                f"Broadcasting new message {instance.id} to conversation {conversation_id}"
-            )
 
-        except Exception as e:
-            logger.error(f"Error broadcasting message: {str(e)}", exc_info=True)
+def _queue_message_notifications(message_id):
+    try:
+        queue_message_notifications.delay(message_id)
+    except Exception as e:
+        logger.error(f"Error queueing message notification: {str(e)}", exc_info=True)
+
+
+@receiver(post_save, sender=ChatbotMessage)
+def update_summary_on_chatbot_reply(sender, instance, created, **kwargs):
+    """Let the rolling summary catch up after each completed exchange"""
+    if created and instance.is_bot:
+        transaction.on_commit(lambda: _update_chatbot_summary(instance.conversation_id))
+
+
+def _update_chatbot_summary(conversation_id):
+    try:
+        update_chatbot_summary.delay(conversation_id)
+    except Exception as e:
+        logger.error(f"Error queueing chatbot summary update: {str(e)}", exc_info=True)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_websocket_user_snapshot(sender, instance, **kwargs):
+    """Websocket auth must not see a stale username, type or active flag"""
+    invalidate_user_snapshot(instance.pk)
+
+
+@receiver(m2m_changed, sender=OneToOneConversation.participants.through)
+@receiver(m2m_changed, sender=GroupConversation.participants.through)
+@receiver(m2m_changed, sender=GroupConversation.moderators.through)
+def invalidate_membership_on_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Keep the membership index in step with participants and moderators"""
+    if reverse:
+        # Changed from the user side: only that user's index is affected
+        if action in ("post_add", "post_remove", "post_clear"):
+            membership_service.invalidate(instance.pk)
+        return
+
+    if action == "pre_clear":
+        members = (
+            instance.moderators
+            if sender is GroupConversation.moderators.through
+            else instance.participants
+        )
+        instance._cleared_member_ids = list(members.values_list("id", flat=True))
+    elif action == "post_clear":
+        membership_service.invalidate(*getattr(instance, "_cleared_member_ids", []))
+    elif action in ("post_add", "post_remove"):
+        membership_service.invalidate(*pk_set)
+
+
+@receiver(m2m_changed, sender=GroupConversation.participants.through)
+def update_group_participant_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep GroupConversation.participant_count in step with the participants"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            group_summary_service.refresh_participant_count(instance.pk)
+        return
+
+    # Changed from the user side: pk_set holds group ids
+    if action == "pre_clear":
+        instance._cleared_group_ids = list(
+            instance.groupconversation_conversations.values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        group_summary_service.refresh_participant_count(
+            *getattr(instance, "_cleared_group_ids", [])
+        )
+    elif action in ("post_add", "post_remove"):
+        group_summary_service.refresh_participant_count(*pk_set)
+
+
+@receiver(pre_delete, sender=OneToOneConversation)
+@receiver(pre_delete, sender=GroupConversation)
+def invalidate_membership_on_conversation_delete(sender, instance, **kwargs):
+    user_ids = set(instance.participants.values_list("id", flat=True))
+    if isinstance(instance, GroupConversation):
+        user_ids.update(instance.moderators.values_list("id", flat=True))
+    membership_service.invalidate(*user_ids)
+
+
+@receiver(post_save, sender=ChatbotConversation)
+@receiver(post_delete, sender=ChatbotConversation)
+def invalidate_membership_on_chatbot_conversation(sender, instance, **kwargs):
+    membership_service.invalidate(instance.user_id)
@@ -1,7 +1,14 @@
 # messaging/tasks.py
 from celery import shared_task
-from .models.chatbot import ChatbotMessage
+from .models.chatbot import ChatbotConversation, ChatbotMessage
+from .models.reaction import MessageReaction
 from .services.chatbot import chatbot_service
+from .services.chatbot_prompt import prompt_builder
+from .services.exceptions import ChatbotAPIError
+from .services.message_notifications import (
+    get_coalesce_window,
+    message_notification_service,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,58 +19,77 @@ def exponential_backoff(retries):
     return 2**retries * 60  # 1min, 2min, 4min, etc.
 
 
-@shared_task(
-    bind=True, autoretry_for=(Exception,), max_retries=3, countdown=exponential_backoff
-)
+CLIENT_IDEMPOTENCY_PREFIX = "client:"
+
+
+def reply_idempotency_key(message_id):
+    """Key of the bot reply to a user message; one reply per message"""
+    return f"reply-{message_id}"
+
+
+def client_idempotency_key(key):
+    """
+    Stored form of a client Idempotency-Key. The prefix keeps client keys
+    apart from reply keys, which share the unique column.
+    """
+    return f"{CLIENT_IDEMPOTENCY_PREFIX}{key}"
+
+
+@shared_task(bind=True, max_retries=3)
 def process_chatbot_response(self, conversation_id, message_id):
     """
     Process chatbot response asynchronously with error handling and retries.
     Uses exponential backoff for retries.
+
+    The reply is saved under an idempotency key derived from the user
+    message, so retries and redelivered tasks never create a second bot
+    message. Saving it publishes the usual conversation_message event.
     """
     try:
         # Get the user's message and conversation
-        user_message = ChatbotMessage.objects.get(id=message_id)
+        user_message = ChatbotMessage.objects.select_related("sender").get(
+            id=message_id, conversation_id=conversation_id
+        )
         conversation = user_message.conversation
+        reply_key = reply_idempotency_key(user_message.id)
 
-        # Get conversation history (last 10 messages) in chronological order
-        history = list(
-            conversation.messages.filter(timestamp__lt=user_message.timestamp).order_by(
-                "-timestamp"
-            )[:10]
-        )
-        history.reverse()  # Put in chronological order
-
-        # Format history for chatbot service
-        formatted_history = [
-            {
-                "content": msg.content,
-                "is_bot": msg.is_bot,
-                "sender": "Samantha" if msg.is_bot else user_message.sender.username,
-            }
-            for msg in history
-        ]
-
-        # Get chatbot response
+        existing = conversation.messages.filter(
+            idempotency_key=reply_key, is_bot=True
+        ).first()
+        if existing:
+            logger.info(f"Message {message_id} already answered by {existing.id}")
+            return existing.id
+
+        # Summary plus the recent history that fits in the token budget
+        context = prompt_builder.context_for(user_message)
+
+        # Get chatbot response; identical retries are coalesced by its cache
         response = chatbot_service.get_response(
-            message=user_message.content, history=formatted_history
+            message=user_message.content,
+            history=context["history"],
+            summary=context["summary"],
         )
 
         if not response["success"]:
             logger.error(f"Chatbot service error: {response.get('error')}")
-            error_message = response["response"]  # Use provided fallback message
-        else:
-            error_message = None
+            if self.request.retries < self.max_retries:
+                raise ChatbotAPIError(response.get("error"))
 
-        # Create bot response message
-        ChatbotMessage.objects.create(
+        # Create bot response message (fallback text once retries are spent)
+        bot_message, _ = ChatbotMessage.objects.get_or_create(
             conversation=conversation,
-            content=error_message or response["response"],
+            idempotency_key=reply_key,
             is_bot=True,
-            metadata={
-                "error": bool(error_message),
-                "attempt": self.request.retries + 1,
+            defaults={
+                "content": response["response"],
+                "metadata": {
+                    "error": not response["success"],
+                    "attempt": self.request.retries + 1,
+                    "reply_to": user_message.id,
+                },
             },
         )
+        return bot_message.id
 
     except ChatbotMessage.DoesNotExist:
         logger.error(f"Message {message_id} not found")
@@ -71,7 +97,69 @@ def process_chatbot_response(self, conversation_id, message_id):
     except Exception as e:
         logger.error(f"Chatbot processing failed: {str(e)}")
         # Retry with exponential backoff
-        raise self.retry(exc=e)
+        raise self.retry(exc=e, countdown=exponential_backoff(self.request.retries))
+
+
+@shared_task(ignore_result=True)
+def update_chatbot_summary(conversation_id):
+    """Fold turns that left the prompt window into the rolling summary"""
+    conversation = ChatbotConversation.objects.filter(id=conversation_id).first()
+    if conversation is None:
+        return
+    prompt_builder.update_summary(conversation, chatbot_service.summarize)
+
+
+@shared_task(ignore_result=True)
+def queue_message_notifications(message_id):
+    """
+    Count a new one-to-one message towards its recipients' next notification
+    and schedule a flush at the end of the coalescing window for recipients
+    without one pending.
+    """
+    conversation_id, user_ids = message_notification_service.queue(message_id)
+    for user_id in user_ids:
+        flush_message_notifications.apply_async(
+            args=(user_id, conversation_id), countdown=get_coalesce_window()
+        )
+
+
+@shared_task(ignore_result=True)
+def flush_message_notifications(user_id, conversation_id):
+    """Send the single coalesced notification for a burst of messages"""
+    message_notification_service.flush(user_id, conversation_id)
+
+
+@shared_task(ignore_result=True)
+def send_reaction_notification(reaction_id):
+    """Tell the author of a message about a new reaction to it"""
+    from notifications.services import notification_service
+
+    reaction = (
+        MessageReaction.objects.select_related("user", "content_type")
+        .filter(id=reaction_id)
+        .first()
+    )
+    message = reaction.message if reaction else None
+    if message is None:
+        return
+
+    reactor = reaction.user
+    notification_service.send_notification(
+        user=message.sender,
+        notification_type_name="message_reaction",
+        title="New Reaction",
+        message=f"{reactor.get_full_name()} reacted to your message",
+        metadata={
+            "message_id": str(message.id),
+            "conversation_id": str(message.conversation_id),
+            "reactor_id": str(reactor.id),
+            "reaction_type": reaction.reaction_type,
+            "message_preview": message.content[:100],
+        },
+        send_email=False,
+        send_in_app=True,
+        priority="low",
+    )
 
 
 # Removed redundant exponential_backoff function definition
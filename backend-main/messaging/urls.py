@@ -3,6 +3,8 @@ from django.urls import path
 from .views.one_to_one import OneToOneConversationViewSet, OneToOneMessageViewSet
 from .views.group import GroupConversationViewSet, GroupMessageViewSet
 from .views.chatbot import ChatbotConversationViewSet
+from .views.read_state import UnreadSummaryViewSet
+from .views.search import MessageSearchViewSet
 
 # One-to-One Messaging
 one_to_one_conversation_list = OneToOneConversationViewSet.as_view(
@@ -35,6 +37,10 @@ chatbot_conversation_create = ChatbotConversationViewSet.as_view({"post": "creat
 chatbot_conversation_detail = ChatbotConversationViewSet.as_view({"get": "retrieve"})
 chatbot_send_message = ChatbotConversationViewSet.as_view({"post": "send_message"})
 
+# Read State
+unread_summary = UnreadSummaryViewSet.as_view({"get": "list"})
+message_search = MessageSearchViewSet.as_view({"get": "list"})
+
 urlpatterns = [
     # One-to-One Messaging
     path(
@@ -66,11 +72,21 @@ urlpatterns = [
         OneToOneMessageViewSet.as_view({"get": "edit_history"}),
         name="one-to-one-message-edit-history",
     ),
+    path(
+        "one_to_one/<int:pk>/messages/",
+        OneToOneConversationViewSet.as_view({"get": "messages"}),
+        name="one-to-one-conversation-messages",
+    ),
     path(
         "one_to_one/<int:pk>/typing/",
         OneToOneConversationViewSet.as_view({"post": "typing"}),
         name="one-to-one-typing",
     ),
+    path(
+        "one_to_one/<int:pk>/mark_read/",
+        OneToOneConversationViewSet.as_view({"post": "mark_read"}),
+        name="one-to-one-mark-read",
+    ),
     path(
         "one_to_one/<int:pk>/search/",
         OneToOneConversationViewSet.as_view({"get": "search"}),
@@ -106,6 +122,16 @@ urlpatterns = [
         GroupConversationViewSet.as_view({"get": "moderators"}),
         name="group-moderators",
     ),
+    path(
+        "groups/<int:pk>/mark_read/",
+        GroupConversationViewSet.as_view({"post": "mark_read"}),
+        name="group-mark-read",
+    ),
+    path(
+        "groups/<int:pk>/messages/",
+        GroupConversationViewSet.as_view({"get": "messages"}),
+        name="group-conversation-messages",
+    ),
     path(
         "groups/<int:pk>/pin_message/",
         GroupConversationViewSet.as_view({"post": "pin_message"}),
@@ -141,4 +167,7 @@ urlpatterns = [
         chatbot_send_message,
         name="chatbot-send-message",
     ),
+    # Read State
+    path("unread-summary/", unread_summary, name="unread-summary"),
+    path("search/", message_search, name="message-search"),
 ]
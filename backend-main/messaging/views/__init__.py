@@ -2,6 +2,7 @@
 from .chatbot import ChatbotConversationViewSet
 from .group import GroupConversationViewSet, GroupMessageViewSet
 from .one_to_one import OneToOneConversationViewSet, OneToOneMessageViewSet
+from .read_state import UnreadSummaryViewSet
 
 __all__ = [
     "ChatbotConversationViewSet",
@@ -9,4 +10,5 @@ __all__ = [
     "GroupMessageViewSet",
     "OneToOneConversationViewSet",
     "OneToOneMessageViewSet",
+    "UnreadSummaryViewSet",
 ]
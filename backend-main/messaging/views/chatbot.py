@@ -2,7 +2,10 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from drf_spectacular.utils import (
+    OpenApiParameter,
     extend_schema,
     extend_schema_view,
 )  # Used to enhance the auto-generated Swagger docs.
@@ -15,6 +18,13 @@ from ..permissions import IsPatient
 from ..throttling import ChatbotRateThrottle
 from ..pagination import CustomMessagePagination
 from ..services.chatbot import chatbot_service
+from ..services.chatbot_prompt import prompt_builder
+from ..tasks import (
+    CLIENT_IDEMPOTENCY_PREFIX,
+    client_idempotency_key,
+    process_chatbot_response,
+    reply_idempotency_key,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -54,9 +64,27 @@ class ChatbotConversationViewSet(viewsets.ModelViewSet):
         )
 
     @extend_schema(
-        description="Send a message to the chatbot",
+        description=(
+            "Send a message to the chatbot. In async mode the message is saved, "
+            "202 is returned immediately and the reply arrives over the "
+            "conversation websocket as a conversation_message event."
+        ),
         request=ChatbotMessageSerializer,
-        responses={201: ChatbotMessageSerializer},
+        parameters=[
+            OpenApiParameter(
+                "mode",
+                str,
+                enum=["sync", "async"],
+                description="Defaults to CHATBOT_SETTINGS['SEND_MESSAGE_MODE']",
+            ),
+            OpenApiParameter(
+                "Idempotency-Key",
+                str,
+                location=OpenApiParameter.HEADER,
+                description="Resending with the same key returns the original message",
+            ),
+        ],
+        responses={201: ChatbotMessageSerializer, 202: ChatbotMessageSerializer},
     )
     @action(detail=True, methods=["post"])
     def send_message(self, request, pk=None):
@@ -65,6 +93,12 @@ class ChatbotConversationViewSet(viewsets.ModelViewSet):
         """
         conversation = self.get_object()
 
+        mode = request.query_params.get(
+            "mode", settings.CHATBOT_SETTINGS.get("SEND_MESSAGE_MODE", "sync")
+        )
+        if mode == "async":
+            return self._send_message_async(request, conversation)
+
         try:
             # Validate and save user message
             serializer = ChatbotMessageSerializer(data=request.data)
@@ -78,22 +112,15 @@ class ChatbotConversationViewSet(viewsets.ModelViewSet):
             )
             logger.debug(f"Saved user message: {user_message.id}")
 
-            # Get conversation history
-            history = list(
-                conversation.messages.order_by("-timestamp").values(
-                    "sender", "content", "is_bot"
-                )[:5]
-            )
-            history.reverse()
+            # Get conversation summary and history
+            context = prompt_builder.context_for(user_message)
 
             # Get bot response using ChatbotService
             try:
                 bot_response = chatbot_service.get_response(
                     message=serializer.validated_data["content"],
-                    history=[
-                        {"content": msg["content"], "is_bot": msg["is_bot"]}
-                        for msg in history
-                    ],
+                    history=context["history"],
+                    summary=context["summary"],
                 )
 
                 if not bot_response["success"]:
@@ -136,3 +163,74 @@ class ChatbotConversationViewSet(viewsets.ModelViewSet):
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+    def _send_message_async(self, request, conversation):
+        """Save the user message and leave the reply to the chatbot queue"""
+        idempotency_key = request.headers.get("Idempotency-Key") or None
+        max_length = ChatbotMessage._meta.get_field("idempotency_key").max_length - len(
+            CLIENT_IDEMPOTENCY_PREFIX
+        )
+        if idempotency_key and len(idempotency_key) > max_length:
+            return Response(
+                {"error": f"Idempotency-Key must be at most {max_length} characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if idempotency_key:
+            idempotency_key = client_idempotency_key(idempotency_key)
+
+        try:
+            if idempotency_key:
+                existing = conversation.messages.filter(
+                    idempotency_key=idempotency_key, is_bot=False
+                ).first()
+                if existing:
+                    return self._accepted(conversation, existing)
+
+            serializer = ChatbotMessageSerializer(data=request.data)
+            if not serializer.is_valid():
+                logger.error(f"Invalid message data: {serializer.errors}")
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                with transaction.atomic():
+                    user_message = serializer.save(
+                        sender=request.user,
+                        conversation=conversation,
+                        is_bot=False,
+                        idempotency_key=idempotency_key,
+                    )
+                    transaction.on_commit(
+                        lambda: process_chatbot_response.delay(
+                            conversation.id, user_message.id
+                        )
+                    )
+            except IntegrityError:
+                # A concurrent request with the same key won the race
+                existing = conversation.messages.get(
+                    idempotency_key=idempotency_key, is_bot=False
+                )
+                return self._accepted(conversation, existing)
+
+            logger.debug(f"Queued chatbot reply to message {user_message.id}")
+            return self._accepted(conversation, user_message)
+
+        except Exception as e:
+            logger.exception(f"Unexpected error in send_message: {str(e)}")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def _accepted(self, conversation, user_message):
+        bot_message = conversation.messages.filter(
+            idempotency_key=reply_idempotency_key(user_message.id), is_bot=True
+        ).first()
+        return Response(
+            {
+                "user_message": ChatbotMessageSerializer(user_message).data,
+                "bot_response": (
+                    ChatbotMessageSerializer(bot_message).data if bot_message else None
+                ),
+                "status": "completed" if bot_message else "pending",
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
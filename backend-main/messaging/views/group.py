@@ -1,7 +1,6 @@
 # messaging/views/group.py
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.db.models import Prefetch, Count
 from django.contrib.auth import get_user_model
 from django.conf import settings
 import logging
@@ -9,13 +8,19 @@ import logging
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
 from ..models.group import GroupConversation, GroupMessage
-from ..serializers.group import GroupConversationSerializer, GroupMessageSerializer
+from ..serializers.group import (
+    GroupConversationSerializer,
+    GroupMessageSerializer,
+    GroupTimelineMessageSerializer,
+)
 from ..pagination import CustomMessagePagination
+from ..services.membership import membership_service
+from ..services.read_state import read_state_service
 from messaging.permissions import IsParticipantOrModerator
 from messaging.throttling import GroupMessageThrottle
 from ..mixins.edit_history import EditHistoryMixin
@@ -66,12 +71,16 @@ class GroupConversationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not user.is_authenticated:
             return self.queryset.none()
+        # participant_count and the last message are summary columns
         return (
             self.queryset.filter(participants=user)
             .prefetch_related("participants", "moderators")
             .annotate(
-                participant_count=Count("participants"), message_count=Count("messages")
+                unread_count=read_state_service.unread_count_subquery(
+                    GroupConversation, user
+                ),
             )
+            .order_by("-last_activity", "-id")
         )
 
     @transaction.atomic
@@ -222,6 +231,94 @@ class GroupConversationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    @extend_schema(
+        description="Mark the group as read up to a message (default: the latest message). Read receipts are stored in bulk and a single aggregated read_receipt event is broadcast.",
+        summary="Mark Group Read",
+        tags=["Group Conversation"],
+        request={
+            "type": "object",
+            "properties": {"message_id": {"type": "integer"}},
+        },
+    )
+    @action(detail=True, methods=["post"])
+    def mark_read(self, request, pk=None):
+        group = self.get_object()
+        message = None
+        message_id = request.data.get("message_id")
+        if message_id:
+            try:
+                message = group.messages.get(id=message_id)
+            except (GroupMessage.DoesNotExist, ValueError):
+                return Response(
+                    {"error": "Message not found in this group"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+
+        receipt = read_state_service.mark_read(request.user, group, message)
+        read_state_service.broadcast_read_receipt(group, receipt)
+        return Response(
+            {"status": "read", "read_count": receipt["read_count"] if receipt else 0},
+            status=status.HTTP_200_OK,
+        )
+
+    @extend_schema(
+        description=(
+            "The group's messages, newest first, with keyset cursor pagination. "
+            "Entries are compact: read state is a per-message `read_count`, and "
+            "`read_state` holds the requester's own watermark and unread count, "
+            "so a page costs the same whatever the size of the group."
+        ),
+        summary="List Group Messages",
+        tags=["Group Conversation"],
+    )
+    @action(detail=True, methods=["get"])
+    def messages(self, request, pk=None):
+        # One membership check from the cached index, no participant join per row
+        if not membership_service.is_member(request.user.id, "group", pk):
+            raise NotFound("Conversation not found")
+        try:
+            paginator = CustomMessagePagination()
+            paginator.page_size = 20
+            paginator.approximate_count = (
+                GroupConversation.objects.filter(id=pk)
+                .values_list("message_count", flat=True)
+                .first()
+            )
+            messages = paginator.paginate_queryset(
+                GroupMessage.objects.filter(conversation_id=pk)
+                .select_related("sender")
+                .only(
+                    "id",
+                    "conversation_id",
+                    "sender__id",
+                    "sender__username",
+                    "content",
+                    "message_type",
+                    "timestamp",
+                    "edited",
+                    "edited_at",
+                    "deleted",
+                )
+                .annotate(
+                    read_count=read_state_service.read_count_subquery(GroupMessage)
+                ),
+                request,
+                view=self,
+            )
+            serializer = GroupTimelineMessageSerializer(messages, many=True)
+
+            response = paginator.get_paginated_response(serializer.data)
+            response.data["read_state"] = read_state_service.watermark(
+                request.user, GroupConversation, pk
+            )
+            return response
+        except Exception as e:
+            logger.error(f"Error listing group timeline: {str(e)}", exc_info=True)
+            return Response(
+                {"error": f"Failed to list messages: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
     @action(detail=True, methods=["post"])
     def pin_message(self, request, pk=None):
         group = self.get_object()
@@ -283,20 +380,32 @@ class GroupMessageViewSet(EditHistoryMixin, ReactionMixin, viewsets.ModelViewSet
         # Get conversation filter from query params for list view
         conversation_id = self.request.query_params.get("conversation")
 
-        queryset = (
-            GroupMessage.objects.filter(conversation__participants=user)
-            .select_related("sender", "conversation")
-            .prefetch_related(
-                Prefetch("conversation__participants"), Prefetch("read_by")
-            )
-        )
+        queryset = GroupMessage.objects.select_related("sender", "conversation")
 
-        # Filter by conversation ID if provided in query params
-        if conversation_id:
+        # Listing one group: check membership once instead of joining the
+        # participants into the message query
+        if conversation_id and self.action == "list":
+            if not membership_service.is_member(user.id, "group", conversation_id):
+                return queryset.none()
             queryset = queryset.filter(conversation_id=conversation_id)
+        else:
+            queryset = queryset.filter(conversation__participants=user)
 
         return queryset.order_by("-timestamp")
 
+    def get_approximate_count(self, queryset):
+        """Page total from the group's maintained message counter"""
+        conversation_id = self.request.query_params.get("conversation")
+        if not conversation_id:
+            return None
+        return (
+            GroupConversation.objects.filter(
+                id=conversation_id, participants=self.request.user
+            )
+            .values_list("message_count", flat=True)
+            .first()
+        )
+
     def create(self, request, *args, **kwargs):
         """Create a new group message"""
         try:
@@ -367,13 +476,8 @@ class GroupMessageViewSet(EditHistoryMixin, ReactionMixin, viewsets.ModelViewSet
     def list(self, request, *args, **kwargs):
         """List group messages with proper pagination"""
         try:
-            # Get conversation filter from query params
-            conversation_id = request.query_params.get("conversation")
-
-            # Filter queryset by conversation if provided
+            # get_queryset already applies the conversation filter
             queryset = self.filter_queryset(self.get_queryset())
-            if conversation_id:
-                queryset = queryset.filter(conversation_id=conversation_id)
 
             # Apply pagination
             page = self.paginate_queryset(queryset)
@@ -4,8 +4,7 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.db import IntegrityError, transaction
 from django.core.exceptions import ValidationError as DjangoValidationError
-from rest_framework.exceptions import ValidationError
-from django.db.models import Count, Max, Q, Prefetch
+from rest_framework.exceptions import NotFound, ValidationError
 from django.utils import timezone
 from django.conf import settings
 from ..mixins.edit_history import EditHistoryMixin
@@ -17,10 +16,17 @@ from ..mixins.reactions import ReactionMixin
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
 from ..models.one_to_one import OneToOneConversation, OneToOneMessage
+from ..pagination import CustomMessagePagination, page_number_params
 from ..serializers.one_to_one import (
     OneToOneConversationSerializer,
     OneToOneMessageSerializer,
 )
+from ..services.inbox import OneToOneInbox
+from ..services.membership import membership_service
+from ..services.presence import presence_service
+from ..services.read_state import read_state_service
+from ..services.search import MAX_SEARCH_RESULTS, message_search_service
+from ..throttling import TypingIndicatorThrottle
 
 # New corrected import
 # Removed Firebase import
@@ -53,33 +59,22 @@ class OneToOneConversationViewSet(viewsets.ModelViewSet):
     serializer_class = OneToOneConversationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_throttles(self):
+        if self.action == "typing":
+            return [TypingIndicatorThrottle()]
+        return super().get_throttles()
+
     def get_queryset(self):
         """
-        Get conversations that the current user is part of,
-        with annotations for latest message info and unread count.
+        Get conversations that the current user is part of. Only the list
+        carries the inbox annotations (latest message and unread count).
         """
-        user = self.request.user
-
-        # Prefetch recent messages for each conversation to avoid N+1 queries.
-        message_prefetch = Prefetch(
-            "messages",
-            queryset=OneToOneMessage.objects.order_by("-timestamp"),
-            to_attr="all_messages",
-        )
-
-        # Get all conversations with additional useful data.
-        return (
-            self.queryset.filter(participants=user)
-            .prefetch_related("participants", message_prefetch)
-            .annotate(
-                last_message_time=Max("messages__timestamp"),
-                unread_count=Count(
-                    "messages",
-                    filter=~Q(messages__read_by=user) & ~Q(messages__sender=user),
-                ),
-            )
-            .order_by("-last_message_time")
-        )
+        if self.action == "list":
+            return OneToOneInbox(self.request.user).get_queryset()
+        queryset = OneToOneConversation.objects.filter(participants=self.request.user)
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related("participants")
+        return queryset
 
     @extend_schema(
         description="Enhanced list response that returns conversation data enriched with latest message preview and unread message counts. Supports pagination.",
@@ -89,14 +84,17 @@ class OneToOneConversationViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         """Enhanced list response with additional data."""
         try:
+            inbox = OneToOneInbox(request.user)
             queryset = self.filter_queryset(self.get_queryset())
             page = self.paginate_queryset(queryset)
             if page is not None:
+                page = inbox.hydrate(page)
                 serializer = self.get_serializer(page, many=True)
-                response_data = self.enrich_conversation_data(serializer.data)
+                response_data = inbox.enrich(page, serializer.data)
                 return self.get_paginated_response(response_data)
-            serializer = self.get_serializer(queryset, many=True)
-            response_data = self.enrich_conversation_data(serializer.data)
+            conversations = inbox.hydrate(queryset)
+            serializer = self.get_serializer(conversations, many=True)
+            response_data = inbox.enrich(conversations, serializer.data)
             return Response(response_data)
         except Exception as e:
             return Response(
@@ -116,8 +114,12 @@ class OneToOneConversationViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(instance)
             response_data = serializer.data
 
-            # Add other participant information
-            other_participants = instance.participants.exclude(id=request.user.id)
+            # Add other participant information (participants are prefetched)
+            other_participants = [
+                participant
+                for participant in instance.participants.all()
+                if participant.id != request.user.id
+            ]
             response_data["other_participants"] = [
                 {
                     "id": participant.id,
@@ -130,19 +132,20 @@ class OneToOneConversationViewSet(viewsets.ModelViewSet):
             ]
 
             # Get recent messages (limit to last 20) and convert to list
-            messages = list(instance.messages.all().order_by("-timestamp")[:20])
+            messages = list(
+                instance.messages.select_related("sender")
+                .prefetch_related("read_by")
+                .order_by("-timestamp", "-id")[:20]
+            )
             message_serializer = OneToOneMessageSerializer(messages, many=True)
             response_data["messages"] = message_serializer.data
 
-            # Mark messages as read using Python filtering on the list
-            unread_messages = [
-                message
-                for message in messages
-                if message.sender != request.user
-                and request.user not in message.read_by.all()
-            ]
-            for message in unread_messages:
-                message.read_by.add(request.user)
+            # Mark everything up to the newest message as read in bulk
+            if messages:
+                receipt = read_state_service.mark_read(
+                    request.user, instance, messages[0]
+                )
+                read_state_service.broadcast_read_receipt(instance, receipt)
 
             return Response(response_data)
         except Exception as e:
@@ -152,7 +155,7 @@ class OneToOneConversationViewSet(viewsets.ModelViewSet):
             )
 
     @extend_schema(
-        description="Retrieve messages for a specific conversation with support for cursor-based pagination using before and after parameters.",
+        description="Retrieve messages for a specific conversation, newest first, with keyset cursor pagination. Pass the opaque next_cursor/previous_cursor of a page as the cursor parameter to load older/newer messages.",
         summary="List Conversation Messages",
         tags=["One-to-One Conversation"],
     )
@@ -160,29 +163,28 @@ class OneToOneConversationViewSet(viewsets.ModelViewSet):
     def messages(self, request, pk=None):
         try:
             conversation = self.get_object()
-            page_size = int(request.query_params.get("page_size", 20))
-            before_id = request.query_params.get("before_id")
-            after_id = request.query_params.get("after_id")
-
-            messages = conversation.messages.all()
-            if before_id:
-                before_message = OneToOneMessage.objects.get(id=before_id)
-                messages = messages.filter(timestamp__lt=before_message.timestamp)
-            if after_id:
-                after_message = OneToOneMessage.objects.get(id=after_id)
-                messages = messages.filter(timestamp__gt=after_message.timestamp)
-            messages = messages.order_by("-timestamp")[:page_size]
+            paginator = CustomMessagePagination()
+            paginator.page_size = 20
+            paginator.approximate_count = conversation.message_count
+            messages = paginator.paginate_queryset(
+                conversation.messages.select_related("sender").prefetch_related(
+                    "read_by"
+                ),
+                request,
+                view=self,
+            )
             serializer = OneToOneMessageSerializer(messages, many=True)
 
-            unread_messages = messages.exclude(sender=request.user).exclude(
-                read_by=request.user
-            )
-            for message in unread_messages:
-                message.read_by.add(request.user)
+            # Mark everything up to the newest message of the page as read
+            if messages:
+                receipt = read_state_service.mark_read(
+                    request.user, conversation, messages[0]
+                )
+                read_state_service.broadcast_read_receipt(conversation, receipt)
 
-            return Response(
-                {"results": serializer.data, "has_more": messages.count() == page_size}
-            )
+            return paginator.get_paginated_response(serializer.data)
+        except NotFound:
+            raise
         except Exception as e:
             return Response(
                 {"detail": f"An error occurred: {str(e)}"},
@@ -190,67 +192,89 @@ class OneToOneConversationViewSet(viewsets.ModelViewSet):
             )
 
     @extend_schema(
-        description="Set the conversation status as 'typing' for the authenticated user.",
+        description="Mark the conversation as read up to a message (default: the latest message). Read receipts are stored in bulk and a single aggregated read_receipt event is broadcast.",
+        summary="Mark Conversation Read",
+        tags=["One-to-One Conversation"],
+        request={
+            "type": "object",
+            "properties": {"message_id": {"type": "integer"}},
+        },
+    )
+    @action(detail=True, methods=["post"])
+    def mark_read(self, request, pk=None):
+        conversation = self.get_object()
+        message = None
+        message_id = request.data.get("message_id")
+        if message_id:
+            try:
+                message = conversation.messages.get(id=message_id)
+            except (OneToOneMessage.DoesNotExist, ValueError):
+                return Response(
+                    {"error": "Message not found in this conversation"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+
+        receipt = read_state_service.mark_read(request.user, conversation, message)
+        read_state_service.broadcast_read_receipt(conversation, receipt)
+        return Response(
+            {"status": "read", "read_count": receipt["read_count"] if receipt else 0},
+            status=status.HTTP_200_OK,
+        )
+
+    @extend_schema(
+        description=(
+            "Set the typing status of the authenticated user in the conversation "
+            "(`is_typing`, default true). The status is kept in the cache and "
+            "expires on its own; other participants receive a websocket event "
+            "when it changes. Websocket clients can send a `typing` frame instead."
+        ),
         summary="Set Typing Status",
         tags=["One-to-One Conversation"],
     )
     @action(detail=True, methods=["post"])
     def typing(self, request, pk=None):
-        conversation = self.get_object()
-        conversation.is_typing = True
-        conversation.save()
-        return Response({"status": "typing"}, status=status.HTTP_200_OK)
+        # Membership comes from the cached index; the hot path stays off the database
+        if not membership_service.is_member(request.user.id, "one_to_one", pk):
+            raise NotFound("Conversation not found")
+        is_typing = presence_service.parse_is_typing(
+            request.data.get("is_typing", True)
+        )
+        presence_service.broadcast_typing(request.user, "one_to_one", pk, is_typing)
+        return Response(
+            {"status": "typing" if is_typing else "idle"}, status=status.HTTP_200_OK
+        )
 
     @extend_schema(
-        description="Search for messages within the conversation that contain a specified query string.",
+        description=(
+            "Full-text search of the conversation's messages. `query` accepts "
+            "web-search syntax (quoted phrases, OR, -word). Results are ranked by "
+            "relevance and paginated with `page` and `page_size`; each result has "
+            "an HTML-escaped `snippet` with matches wrapped in <mark>."
+        ),
         summary="Search Conversation Messages",
         tags=["One-to-One Conversation"],
     )
     @action(detail=True, methods=["get"])
     def search(self, request, pk=None):
-        query = request.query_params.get("query")
+        query = request.query_params.get("query", "").strip()
         if not query:
             return Response(
                 {"error": "Query parameter is required"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        messages = OneToOneMessage.objects.filter(
-            content__icontains=query, conversation=pk
-        )
-        serializer = OneToOneMessageSerializer(messages, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if not membership_service.is_member(request.user.id, "one_to_one", pk):
+            raise NotFound("Conversation not found")
 
-    def enrich_conversation_data(self, data):
-        """Add additional information to conversation data for the UI."""
-        user = self.request.user
-        for conversation_data in data:
-            conversation_id = conversation_data["id"]
-            conversation = OneToOneConversation.objects.get(id=conversation_id)
-            other_participants = conversation.participants.exclude(id=user.id)
-            conversation_data["other_participants"] = [
-                {
-                    "id": participant.id,
-                    "username": participant.username,
-                    "first_name": participant.first_name,
-                    "last_name": participant.last_name,
-                    "email": participant.email,
-                }
-                for participant in other_participants
-            ]
-            # Slice the prefetched messages in Python
-            latest_messages = getattr(conversation, "all_messages", [])[:5]
-            if latest_messages:
-                latest_message = latest_messages[0]
-                conversation_data["latest_message"] = {
-                    "id": latest_message.id,
-                    "content": latest_message.content[:100]
-                    + ("..." if len(latest_message.content) > 100 else ""),
-                    "timestamp": latest_message.timestamp,
-                    "is_from_current_user": latest_message.sender_id == user.id,
-                    "sender_name": latest_message.sender.get_full_name()
-                    or latest_message.sender.username,
-                }
-        return data
+        page, page_size = page_number_params(request)
+        if page * page_size > MAX_SEARCH_RESULTS:
+            return Response(
+                {"error": f"Only the first {MAX_SEARCH_RESULTS} results can be paged"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = message_search_service.search_conversation(
+            "one_to_one", int(pk), query, page, page_size
+        )
+        return Response({"query": query, **results}, status=status.HTTP_200_OK)
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -332,9 +356,34 @@ class OneToOneMessageViewSet(EditHistoryMixin, ReactionMixin, viewsets.ModelView
     queryset = OneToOneMessage.objects.all()
     serializer_class = OneToOneMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CustomMessagePagination
 
     def get_queryset(self):
-        return self.queryset.filter(conversation__participants=self.request.user)
+        queryset = (
+            self.queryset.filter(conversation__participants=self.request.user)
+            .select_related("sender")
+            .prefetch_related("read_by")
+        )
+
+        # Filter by conversation ID if provided in query params
+        conversation_id = self.request.query_params.get("conversation")
+        if conversation_id:
+            queryset = queryset.filter(conversation_id=conversation_id)
+
+        return queryset
+
+    def get_approximate_count(self, queryset):
+        """Page total from the conversation's maintained message counter"""
+        conversation_id = self.request.query_params.get("conversation")
+        if not conversation_id:
+            return None
+        return (
+            OneToOneConversation.objects.filter(
+                id=conversation_id, participants=self.request.user
+            )
+            .values_list("message_count", flat=True)
+            .first()
+        )
 
     def create(self, request, *args, **kwargs):
         try:
@@ -371,68 +420,11 @@ class OneToOneMessageViewSet(EditHistoryMixin, ReactionMixin, viewsets.ModelView
 
     def perform_create(self, serializer):
         """
-        Set the current user as the sender of the message and notify
-        the other participant via unified notification.
+        Set the current user as the sender of the message. The recipient is
+        notified from Celery once the message is committed.
         """
         try:
-            # Save the message with the current user as sender
-            instance = serializer.save(sender=self.request.user)
-            conversation = instance.conversation
-
-            # Identify the recipient (non-sender participant)
-            recipient = conversation.participants.exclude(
-                id=self.request.user.id
-            ).first()
-
-            if recipient:
-                try:
-                    from notifications.services import UnifiedNotificationService
-
-                    notification_service = UnifiedNotificationService()
-
-                    # Add debug logging
-                    logger.debug(
-                        f"Attempting to send notification to recipient: {recipient.id}"
-                    )
-
-                    notification = notification_service.send_notification(
-                        user=recipient,
-                        notification_type_name="new_message",
-                        title="New Message",
-                        message=f"You have a new message: {instance.content[:100]}{'...' if len(instance.content) > 100 else ''}",
-                        metadata={
-                            "conversation_id": str(conversation.id),
-                            "message_id": str(instance.id),
-                            "sender_id": str(self.request.user.id),
-                            "message_preview": instance.content[:100]
-                            + ("..." if len(instance.content) > 100 else ""),
-                            "category": "message",
-                            "link": f"/conversations/{conversation.id}/",
-                            "sender_name": self.request.user.get_full_name()
-                            or self.request.user.username,
-                        },
-                        send_email=True,
-                        send_in_app=True,
-                        priority="high",
-                        content_object=instance,
-                    )
-
-                    if notification:
-                        logger.info(
-                            f"Sent notification for message {instance.id} to user {recipient.id}"
-                        )
-                    else:
-                        logger.warning(
-                            f"Notification not sent for message {instance.id} - possibly disabled by user preferences"
-                        )
-
-                except Exception as e:
-                    logger.error(
-                        f"Failed to send notification for message {instance.id}: {str(e)}",
-                        exc_info=True,
-                    )
-
-            return instance
+            return serializer.save(sender=self.request.user)
 
         except IntegrityError as e:
             logger.error(f"Message creation failed: {str(e)}")
@@ -523,43 +515,3 @@ class OneToOneMessageViewSet(EditHistoryMixin, ReactionMixin, viewsets.ModelView
                 {"error": f"Failed to delete message: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
-
-    @action(detail=True, methods=["get"])
-    def edit_history(self, request, pk=None):
-        """
-        Get message edit history
-        """
-        try:
-            instance = self.get_object()
-
-            # Check if user can view history
-            if not (
-                instance.sender == request.user
-                or request.user.is_staff
-                or instance.conversation.participants.filter(
-                    id=request.user.id
-                ).exists()
-            ):
-                return Response(
-                    {"error": "You don't have permission to view edit history"},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            return Response(
-                {
-                    "current": {
-                        "content": instance.content,
-                        "edited_at": instance.edited_at,
-                        "edited_by": instance.edited_by.id
-                        if instance.edited_by
-                        else None,
-                    },
-                    "history": instance.edit_history,
-                }
-            )
-
-        except Exception as e:
-            return Response(
-                {"error": f"Failed to retrieve edit history: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
@@ -0,0 +1,53 @@
+# messaging/views/read_state.py
+from rest_framework import viewsets, permissions, status
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema
+import logging
+
+from ..services.read_state import read_state_service
+
+logger = logging.getLogger(__name__)
+
+
+class UnreadSummaryViewSet(viewsets.ViewSet):
+    """Unread counters of the authenticated user, served from maintained read state"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        description="Return the total number of unread messages and the unread count of every conversation with unread messages. Served from per-user read state without aggregating messages.",
+        summary="Unread Summary",
+        tags=["Messaging"],
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "total": {"type": "integer"},
+                    "conversations": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "type": {"type": "string", "example": "one_to_one"},
+                                "id": {"type": "integer"},
+                                "unread_count": {"type": "integer"},
+                                "last_read_message_id": {
+                                    "type": "integer",
+                                    "nullable": True,
+                                },
+                            },
+                        },
+                    },
+                },
+            }
+        },
+    )
+    def list(self, request):
+        try:
+            return Response(read_state_service.unread_summary(request.user))
+        except Exception as e:
+            logger.error(f"Error fetching unread summary: {str(e)}", exc_info=True)
+            return Response(
+                {"error": "Failed to fetch unread summary"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
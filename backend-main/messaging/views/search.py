@@ -0,0 +1,76 @@
+# messaging/views/search.py
+from rest_framework import viewsets, permissions, status
+from rest_framework.response import Response
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+import logging
+
+from ..pagination import page_number_params
+from ..services.search import (
+    MAX_SEARCH_RESULTS,
+    MESSAGE_MODELS,
+    message_search_service,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MessageSearchViewSet(viewsets.ViewSet):
+    """Full-text search across all conversations of the authenticated user"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        description=(
+            "Search the messages of every conversation the user takes part in "
+            "(one-to-one, group and chatbot). `query` accepts web-search syntax "
+            "(quoted phrases, OR, -word); `kind` restricts the search to one "
+            "conversation type. Results are ranked by relevance and paginated "
+            "with `page` and `page_size`; each result has an HTML-escaped "
+            "`snippet` with matches wrapped in <mark>."
+        ),
+        summary="Search All Conversations",
+        tags=["Messaging"],
+        parameters=[
+            OpenApiParameter("query", str, required=True),
+            OpenApiParameter("kind", str, enum=list(MESSAGE_MODELS)),
+            OpenApiParameter("page", int),
+            OpenApiParameter("page_size", int),
+        ],
+    )
+    def list(self, request):
+        query = request.query_params.get("query", "").strip()
+        if not query:
+            return Response(
+                {"error": "Query parameter is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        kind = request.query_params.get("kind")
+        if kind and kind not in MESSAGE_MODELS:
+            return Response(
+                {"error": f"kind must be one of {', '.join(MESSAGE_MODELS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        page, page_size = page_number_params(request)
+        if page * page_size > MAX_SEARCH_RESULTS:
+            return Response(
+                {"error": f"Only the first {MAX_SEARCH_RESULTS} results can be paged"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            results = message_search_service.search_all(
+                request.user.id,
+                query,
+                page,
+                page_size,
+                kinds=[kind] if kind else None,
+            )
+            return Response({"query": query, **results})
+        except Exception as e:
+            logger.error(f"Error searching messages: {str(e)}", exc_info=True)
+            return Response(
+                {"error": "Failed to search messages"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
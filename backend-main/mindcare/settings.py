@@ -171,6 +171,7 @@ REST_AUTH = {
     "USE_JWT": True,
     "JWT_AUTH_COOKIE": "auth",
     "JWT_AUTH_REFRESH_COOKIE": "refresh-auth",
+    "JWT_TOKEN_CLAIMS_SERIALIZER": "auth.serializers.CustomTokenObtainPairSerializer",
 }
 
 ACCOUNT_ADAPTER = "auth.registration.custom_adapter.CustomAccountAdapter"
@@ -354,7 +355,7 @@ SPECTACULAR_SETTINGS = {
     "POSTPROCESSING_HOOKS": [],
 }
 
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
+OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
 
 # Allow your React Native/Web app
 CORS_ALLOWED_ORIGINS = [
@@ -423,6 +424,8 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
     "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
+    # Adds username/user_type claims used by websocket auth
+    "TOKEN_OBTAIN_SERIALIZER": "auth.serializers.CustomTokenObtainPairSerializer",
 }
 
 # Channel Layers Configuration for WebSocket
@@ -559,6 +562,7 @@ MESSAGE_SETTINGS = {
     "MAX_EDIT_HISTORY": 10,  # Maximum number of previous versions to keep
     "ALLOW_MESSAGE_DELETION": True,
     "KEEP_DELETED_MESSAGES": True,  # If False, will hard delete instead of soft delete
+    "NOTIFICATION_COALESCE_WINDOW": 30,  # Seconds of messages folded into one notification
 }
 
 # Chatbot Settings
@@ -567,11 +571,65 @@ GEMINI_API_URL = (
     "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent"
 )
 CHATBOT_SETTINGS = {
+    # "gemini", "ollama" (local model at OLLAMA_API_URL) or a provider class path
+    "PROVIDER": os.getenv("CHATBOT_PROVIDER", "gemini"),
+    "LOCAL_MODEL": os.getenv("CHATBOT_LOCAL_MODEL", "llama2"),
+    # Optional OpenAI-compatible /v1/completions endpoint taking prompt lists
+    "BATCH_API_URL": os.getenv("CHATBOT_BATCH_API_URL"),
+    "BATCH_WINDOW_MS": 20,  # Concurrent local requests wait this long to batch
+    "MAX_BATCH_SIZE": 8,
     "MAX_RETRIES": 3,
     "RESPONSE_TIMEOUT": 30,
-    "MAX_HISTORY_MESSAGES": 5,
+    # Prompt assembly: recent turns are packed by estimated tokens, older
+    # turns are folded into a rolling summary in batches
+    "HISTORY_TOKEN_BUDGET": 1500,
+    "HISTORY_FETCH_LIMIT": 40,
+    "SUMMARY_TOKEN_BUDGET": 300,
+    "SUMMARY_BATCH_MESSAGES": 8,
     "MIN_MESSAGE_LENGTH": 2,
     "MAX_MESSAGE_LENGTH": 1000,
+    "API_URL": os.getenv(
+        "CHATBOT_API_URL",
+        "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
+    ),
+    "STREAM_API_URL": os.getenv(
+        "CHATBOT_STREAM_API_URL",
+        "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:streamGenerateContent?alt=sse",
+    ),
+    "STREAM_RESPONSES": True,  # Websocket replies arrive as chatbot_delta frames
+    "STREAM_IDLE_TIMEOUT": 30,  # Seconds without data before a stream fails
+    "MAX_CONCURRENT_REQUESTS": 10,  # Per process, shared keep-alive pool
+    "RETRY_BACKOFF_BASE": 0.5,  # Seconds, doubled per attempt with full jitter
+    "RETRY_BACKOFF_MAX": 8.0,
+    "RESPONSE_CACHE_TIMEOUT": 3600,  # Seconds a reply is reused for the same prompt
+    "RESPONSE_CACHE_LOCAL_SIZE": 256,  # Replies kept in each process
+    "RESPONSE_CACHE_LOCAL_TIMEOUT": 300,
+    # "async" answers send_message with 202 and replies from the chatbot queue
+    "SEND_MESSAGE_MODE": "sync",
+}
+
+# Websocket presence and typing indicators (cache only, no database writes)
+PRESENCE_SETTINGS = {
+    "HEARTBEAT_INTERVAL": 25,  # Seconds between client heartbeats
+    "PRESENCE_TIMEOUT": 60,  # A socket without heartbeats is offline after this
+    "TYPING_TIMEOUT": 6,  # A typing indicator lapses without a new signal
+    "MAX_SOCKETS_PER_USER": 10,  # Presence slots; extra sockets are not tracked
+}
+
+# Websocket events for message changes (see MessageEventService)
+MESSAGE_EVENT_SETTINGS = {
+    "MAX_CONTENT_LENGTH": 4000,  # Longer content is sent truncated
+    "RATE_LIMIT": 60,  # message_update events per conversation per window
+    "RATE_WINDOW": 10,  # Seconds
+}
+
+# Per-socket outbound queues of the websocket consumers (messaging.outbound)
+WEBSOCKET_OUTBOUND_SETTINGS = {
+    "BATCH_WINDOW_MS": 25,  # Events arriving within this window go out together
+    "MAX_BATCH_SIZE": 50,  # Frames per batch
+    "MAX_QUEUE_SIZE": 200,  # Per socket; typing/presence/receipts dropped first
+    "PUBLISH_INTERVAL": 10,  # Seconds between queue metric snapshots
+    "MAX_PROCESSES": 256,  # Metric slots, one per running websocket process
 }
 
 # Throttling Configuration
@@ -2,10 +2,12 @@
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 import logging
 
+from messaging.outbound import OutboundQueueMixin
+
 logger = logging.getLogger(__name__)
 
 
-class NotificationConsumer(AsyncJsonWebsocketConsumer):
+class NotificationConsumer(OutboundQueueMixin, AsyncJsonWebsocketConsumer):
     async def connect(self):
         if self.scope["user"].is_anonymous:
             logger.warning(
@@ -19,6 +21,7 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
         try:
             await self.channel_layer.group_add(self.group_name, self.channel_name)
             await self.accept()
+            self.init_outbound_queue()
             logger.info(
                 f"User {self.scope['user'].username} connected to notifications"
             )
@@ -28,6 +31,7 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
 
     async def disconnect(self, close_code):
         try:
+            await self.close_outbound_queue()
             if hasattr(self, "group_name"):
                 await self.channel_layer.group_discard(
                     self.group_name, self.channel_name
@@ -44,7 +48,7 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
 
     async def notification_message(self, event):
         try:
-            await self.send_json(event["message"])
+            self.enqueue(event["message"])
         except Exception as e:
             logger.error(f"Error sending notification message: {str(e)}")
             await self.close()
@@ -1,32 +1,96 @@
 # notifications/services.py
 from .models import Notification, NotificationType
 from users.models import UserPreferences
+from django.core.cache import cache
 import logging
+import threading
+import time
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
 logger = logging.getLogger(__name__)
 
+# Notification types almost never change; each process keeps them this long
+NOTIFICATION_TYPE_CACHE_TTL = 300
+PREFERENCES_CACHE_TIMEOUT = 3600
+
+
+def preferences_version_key(user_id):
+    return f"notification_preferences_version_{user_id}"
+
+
+def invalidate_notification_preferences(user_id):
+    """
+    Bump the user's preferences cache version. Entries cached under the old
+    version are never read again and simply expire.
+    """
+    key = preferences_version_key(user_id)
+    if not cache.add(key, 2, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, timeout=None)
+
 
 class UnifiedNotificationService:
-    def __init__(self):
-        self.type_cache = {}
+    # Process-wide {name: (expires_at, NotificationType)}
+    type_cache = {}
+    type_cache_lock = threading.Lock()
 
     def get_or_create_notification_type(self, type_name):
         """Get or create a notification type with default settings."""
+        cached = self.type_cache.get(type_name)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
         try:
             notification_type = NotificationType.objects.get(name=type_name)
-            logger.info(f"Found existing notification type: {type_name}")
+            logger.debug(f"Found existing notification type: {type_name}")
         except NotificationType.DoesNotExist:
-            notification_type = NotificationType.objects.create(
+            notification_type, _ = NotificationType.objects.get_or_create(
                 name=type_name,
-                description=f"Notification type for {type_name}",
-                default_enabled=True,
-                is_global=True,
+                defaults={
+                    "description": f"Notification type for {type_name}",
+                    "default_enabled": True,
+                    "is_global": True,
+                },
             )
             logger.info(f"Created new notification type: {type_name}")
+
+        with self.type_cache_lock:
+            self.type_cache[type_name] = (
+                time.monotonic() + NOTIFICATION_TYPE_CACHE_TTL,
+                notification_type,
+            )
         return notification_type
 
+    @classmethod
+    def forget_notification_type(cls, type_name):
+        with cls.type_cache_lock:
+            cls.type_cache.pop(type_name, None)
+
+    def get_notification_preferences(self, user):
+        """
+        The user's notification switches and disabled type ids, served from a
+        versioned cache entry that preference changes invalidate.
+        """
+        version = cache.get_or_set(preferences_version_key(user.id), 1, timeout=None)
+        key = f"notification_preferences_{user.id}_v{version}"
+        preferences = cache.get(key)
+        if preferences is None:
+            user_preferences = UserPreferences.objects.get_or_create(user=user)[0]
+            preferences = {
+                "email_notifications": user_preferences.email_notifications,
+                "in_app_notifications": user_preferences.in_app_notifications,
+                "disabled_type_ids": list(
+                    user_preferences.disabled_notification_types.values_list(
+                        "id", flat=True
+                    )
+                ),
+            }
+            cache.set(key, preferences, timeout=PREFERENCES_CACHE_TIMEOUT)
+        return preferences
+
     def send_notification(self, user, notification_type_name, title, message, **kwargs):
         try:
             # Ensure notification type exists
@@ -35,7 +99,7 @@ class UnifiedNotificationService:
             )
 
             # Check user preferences
-            preferences = UserPreferences.objects.get_or_create(user=user)[0]
+            preferences = self.get_notification_preferences(user)
             if not self._check_notification_allowed(preferences, notification_type):
                 logger.debug(
                     f"Notification {notification_type_name} not allowed for {user}"
@@ -64,33 +128,24 @@ class UnifiedNotificationService:
 
         except Exception as e:
             logger.error(f"Error sending notification: {str(e)}", exc_info=True)
-            if kwargs.get("send_in_app", True):
-                self._send_in_app_notification(user, notification)
-
-            return notification
-
-        except Exception as e:
-            logger.error(f"Error sending notification: {str(e)}")
             return None
 
     def _check_notification_allowed(self, preferences, notification_type):
         # Check global enable/disable first
-        if not preferences.in_app_notifications:
+        if not preferences["in_app_notifications"]:
             return False
 
         # Check type-specific settings
         if notification_type.is_global:
             return (
                 notification_type.default_enabled
-                and not preferences.disabled_notification_types.filter(
-                    id=notification_type.id
-                ).exists()
+                and notification_type.id not in preferences["disabled_type_ids"]
             )
         else:
             return notification_type.default_enabled
 
     def _send_email_notification(self, user, notification, preferences):
-        if preferences.email_notifications:
+        if preferences["email_notifications"]:
             # Implement actual email sending logic here
             logger.info(f"Sent email notification to {user.email}")
 
@@ -116,3 +171,6 @@ class UnifiedNotificationService:
         except Exception as e:
             logger.error(f"Error sending WebSocket notification: {str(e)}")
             return False
+
+
+notification_service = UnifiedNotificationService()
@@ -1,9 +1,9 @@
 # notifications/signals.py
-from django.db.models.signals import post_migrate, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 from django.dispatch import receiver
-from .models import NotificationType, Notification
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from users.models import UserPreferences
+from .models import NotificationType
+from .services import UnifiedNotificationService, invalidate_notification_preferences
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,25 +36,39 @@ def create_default_notification_types(sender, **kwargs):
                 logger.error(f"Error creating notification type {name}: {str(e)}")
 
 
-@receiver(post_save, sender=Notification)
-def send_notification_websocket(sender, instance, created, **kwargs):
-    """Send WebSocket notification when a new notification is created."""
-    if created:
-        try:
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                f"user_{instance.user.id}_notifications",
-                {
-                    "type": "notification.message",
-                    "message": {
-                        "id": str(instance.id),
-                        "type": instance.notification_type.name,
-                        "title": instance.title,
-                        "message": instance.message,
-                        "timestamp": instance.created_at.isoformat(),
-                        "priority": instance.priority,
-                    },
-                },
-            )
-        except Exception as e:
-            logger.error(f"Error sending WebSocket notification: {str(e)}")
+@receiver(post_save, sender=NotificationType)
+@receiver(post_delete, sender=NotificationType)
+def forget_cached_notification_type(sender, instance, **kwargs):
+    """Drop this process's cached copy; other processes catch up on TTL expiry"""
+    UnifiedNotificationService.forget_notification_type(instance.name)
+
+
+@receiver(post_save, sender=UserPreferences)
+@receiver(post_delete, sender=UserPreferences)
+def invalidate_preferences_on_change(sender, instance, **kwargs):
+    invalidate_notification_preferences(instance.user_id)
+
+
+@receiver(m2m_changed, sender=UserPreferences.disabled_notification_types.through)
+def invalidate_preferences_on_disabled_types_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_notification_preferences(instance.user_id)
+        return
+
+    # Changed from the NotificationType side: find the affected users
+    if action == "pre_clear":
+        instance._cleared_preference_user_ids = list(
+            instance.userpreferences_set.values_list("user_id", flat=True)
+        )
+    elif action == "post_clear":
+        user_ids = getattr(instance, "_cleared_preference_user_ids", [])
+        for user_id in user_ids:
+            invalidate_notification_preferences(user_id)
+    elif action in ("post_add", "post_remove"):
+        for user_id in UserPreferences.objects.filter(pk__in=pk_set).values_list(
+            "user_id", flat=True
+        ):
+            invalidate_notification_preferences(user_id)
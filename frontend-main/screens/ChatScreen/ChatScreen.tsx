@@ -82,7 +82,7 @@ const ChatScreen: React.FC<ChatScreenProps> = ({ route, navigation }) => {
 
   const wsHook =
     title !== 'New Chat' && validConversationId !== ''
-      ? useWebSocket(validConversationId, handleWebSocketMessage)
+      ? useWebSocket(conversationType, validConversationId, handleWebSocketMessage, loadMessages)
       : { sendMessage: () => {}, connectionStatus: 'disconnected' };
 
   const { sendMessage, connectionStatus } = wsHook;
@@ -16,16 +16,29 @@ interface WebSocketHook {
   retrySendMessage: (message: WebSocketMessage) => void;
 }
 
+export type ConversationType = 'one_to_one' | 'group' | 'chatbot';
+
+// Typed routes; the same id can belong to a DM and a group
+const WS_ROUTE_PREFIXES: Record<ConversationType, string> = {
+  one_to_one: 'dm',
+  group: 'group',
+  chatbot: 'bot',
+};
+
 // This is your dedicated connectWebSocket utility.
 export const connectWebSocket = (
+  conversationType: ConversationType,
   conversationId: string,
   token: string,
   userId: string,
   onMessageReceived: (message: any) => void,
   onTypingIndicator?: (data: any) => void,
-  onReadReceipt?: (data: any) => void
+  onReadReceipt?: (data: any) => void,
+  onPresence?: (data: any) => void,
+  onResync?: (data: any) => void
 ): WebSocket => {
-  const socket = new WebSocket(`${WS_BASE_URL}/ws/messaging/${conversationId}/?token=${token}`);
+  const prefix = WS_ROUTE_PREFIXES[conversationType];
+  const socket = new WebSocket(`${WS_BASE_URL}/ws/messaging/${prefix}/${conversationId}/?token=${token}`);
 
   socket.onopen = () => {
     console.log('[WS] Connection established for conversation', conversationId);
@@ -59,9 +72,17 @@ export const connectWebSocket = (
            conversation: data.conversation,
          });
          break;
+       case 'typing':
        case 'typing_indicator':
          onTypingIndicator?.(data);
          break;
+       case 'presence':
+         onPresence?.(data);
+         break;
+       case 'resync':
+         // The server dropped events for this socket; refetch to catch up
+         onResync?.(data);
+         break;
        case 'read_receipt':
          onReadReceipt?.(data);
          break;
@@ -86,8 +107,10 @@ export const connectWebSocket = (
 
 // The hook now uses connectWebSocket and does not override its events.
 export const useWebSocket = (
+  conversationType: ConversationType,
   conversationId: string,
   onMessageReceived: (data: any) => void,
+  onResync?: () => void,
 ): WebSocketHook => {
   const [error, setError] = useState<string | null>(null);
   const ws = useRef<WebSocket | null>(null);
@@ -95,6 +118,7 @@ export const useWebSocket = (
   const maxReconnectAttempts = 5;
   const reconnectDelay = 2000; 
   const onMessageReceivedRef = useRef(onMessageReceived);
+  const onResyncRef = useRef(onResync);
   const connectionStatusRef = useRef<'connecting' | 'connected' | 'disconnected'>('disconnected');
 
   // Update the message callback ref on change.
@@ -102,6 +126,10 @@ export const useWebSocket = (
     onMessageReceivedRef.current = onMessageReceived;
   }, [onMessageReceived]);
 
+  useEffect(() => {
+    onResyncRef.current = onResync;
+  }, [onResync]);
+
   const connect = useCallback(() => {
     if (!conversationId) {
       console.warn('Missing conversation ID');
@@ -123,8 +151,10 @@ export const useWebSocket = (
     connectionStatusRef.current = 'connecting';
 
     ws.current = connectWebSocket(
+      conversationType,
       conversationId,
       token,
+      userId,
       (msg) => {
         console.log('[WS Hook] onMessageReceived invoked with:', msg);
 
@@ -135,6 +165,13 @@ export const useWebSocket = (
       },
       (data) => {
         console.log('[WS Hook] Read receipt:', data);
+      },
+      (data) => {
+        console.log('[WS Hook] Presence:', data);
+      },
+      (data) => {
+        console.log('[WS Hook] Resync requested:', data);
+        onResyncRef.current?.();
       }
     );
 
@@ -149,7 +186,7 @@ export const useWebSocket = (
       connectionStatusRef.current = 'connected';
       reconnectAttempts.current = 0;
     };
-  }, [conversationId]);
+  }, [conversationType, conversationId]);
 
   // Connect on mount and when conversationId changes.
   useEffect(() => {